@@ -0,0 +1,284 @@
+"""
+Fila com prioridades na frente do pool de processos de OCR.
+
+O ProcessPoolExecutor atende em ordem de chegada: um documento urgente enviado
+pela interface esperaria atrás de milhares de imagens de um lote noturno. O
+agendador segura as tarefas num heap e só deixa `capacidade` (= nº de workers)
+em execução no pool; cada vaga que abre vai para a tarefa mais prioritária.
+
+Envelhecimento: cada `envelhecimento` segundos de espera valem um nível de
+prioridade, então o lote continua andando mesmo com pedidos interativos
+chegando o tempo todo. Como todas as tarefas envelhecem no mesmo ritmo, a
+ordem é fixa na chegada (chave = prioridade * envelhecimento + instante).
+
+Vigia: uma tarefa que passa de `tempo_limite` segundos no pool trava um
+worker; o agendador derruba os processos (`matar_executor`) e o pool é
+recriado. Falhas de infraestrutura (tempo esgotado, worker morto, falta de
+memória) voltam para a fila até `tentativas` vezes, com espera crescente
+(1s, 2s, 4s...). Esgotadas as tentativas, o Future falha com a última
+exceção e o atributo `tentativas`.
+
+Quando um worker morre, todas as tarefas que estavam no pool falham juntas e
+não dá para saber qual foi a culpada: elas são tentadas de novo uma de cada
+vez (sozinhas no pool), então só o arquivo que derruba o worker esgota as
+tentativas. As que o próprio vigia derrubou junto com a travada voltam para
+a fila sem gastar tentativa.
+
+API:
+  AgendadorPrioridades(obter_executor, capacidade, envelhecimento=30.0, tempo_limite=None,
+                       tentativas=3, matar_executor=None)
+  .submit(fn, *args, prioridade=PRIORIDADE_LOTE) -> Future
+  .metricas() -> {'interativa': {...}, 'lote': {...}}   (fila, em execução, espera média/p95/máx)
+  eh_falha_persistente(erro) -> True para os erros que justificam quarentena
+"""
+import collections
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+
+PRIORIDADE_INTERATIVA = 0
+PRIORIDADE_LOTE = 1
+NOMES_PRIORIDADE = {PRIORIDADE_INTERATIVA: 'interativa', PRIORIDADE_LOTE: 'lote'}
+
+# Segundos de espera que equivalem a subir um nível de prioridade
+ENVELHECIMENTO_PADRAO = 30.0
+TENTATIVAS_PADRAO = 3
+# Espera antes da 2ª tentativa; dobra a cada nova tentativa
+ESPERA_NOVA_TENTATIVA = 1.0
+# Intervalo entre as checagens do vigia
+INTERVALO_VIGIA = 1.0
+
+
+class TempoEsgotado(TimeoutError):
+    """A tarefa passou do tempo limite e o worker foi derrubado."""
+
+
+# Falhas que não dependem do conteúdo da tarefa: vale tentar de novo
+RETENTAVEIS = (TimeoutError, BrokenProcessPool, MemoryError)
+
+
+def eh_falha_persistente(erro):
+    """Erro que sobrou depois de todas as tentativas (trava, derruba ou estoura a memória do worker)."""
+    return isinstance(erro, RETENTAVEIS)
+
+
+class _Estatisticas:
+    def __init__(self):
+        self.na_fila = 0
+        self.em_execucao = 0
+        self.despachadas = 0
+        self.novas_tentativas = 0
+        self.tempo_esgotado = 0
+        self.esperas = collections.deque(maxlen=1000)
+
+    def resumo(self):
+        esperas = sorted(self.esperas)
+        return {
+            'na_fila': self.na_fila,
+            'em_execucao': self.em_execucao,
+            'despachadas': self.despachadas,
+            'novas_tentativas': self.novas_tentativas,
+            'tempo_esgotado': self.tempo_esgotado,
+            'espera_media': round(sum(esperas) / len(esperas), 3) if esperas else 0.0,
+            'espera_p95': round(esperas[min(len(esperas) - 1, int(0.95 * len(esperas)))], 3) if esperas else 0.0,
+            'espera_max': round(esperas[-1], 3) if esperas else 0.0,
+        }
+
+
+class _Tarefa:
+    __slots__ = ('chave', 'prioridade', 'chegada', 'futuro', 'fn', 'args', 'tentativa', 'isolada')
+
+    def __init__(self, chave, prioridade, chegada, futuro, fn, args):
+        self.chave = chave
+        self.prioridade = prioridade
+        self.chegada = chegada
+        self.futuro = futuro
+        self.fn = fn
+        self.args = args
+        self.tentativa = 1
+        # Estava no pool quando um worker morreu: a próxima tentativa roda sozinha
+        self.isolada = False
+
+
+class AgendadorPrioridades:
+    """
+    Executor com fila de prioridades que repassa as tarefas a outro executor.
+
+    `obter_executor(recriar=False)` devolve o executor de verdade; é chamado
+    com recriar=True quando ele quebrou (um worker morreu). `matar_executor()`
+    derruba os processos na hora (usado pelo vigia; sem ele não há vigia).
+    """
+
+    def __init__(self, obter_executor, capacidade, envelhecimento=ENVELHECIMENTO_PADRAO, tempo_limite=None,
+                 tentativas=TENTATIVAS_PADRAO, matar_executor=None):
+        self._obter_executor = obter_executor
+        self._matar_executor = matar_executor
+        self.capacidade = max(1, int(capacidade))
+        # Sem envelhecimento (0): prioridade estrita
+        self.envelhecimento = envelhecimento if envelhecimento and envelhecimento > 0 else 1e9
+        self.tempo_limite = tempo_limite if tempo_limite and tempo_limite > 0 else None
+        self.tentativas = max(1, int(tentativas))
+        self._heap = []
+        # Tarefas esperando o backoff: (disponível_em, seq, tarefa)
+        self._adiadas = []
+        self._sequencia = itertools.count()
+        self._condicao = threading.Condition()
+        self._em_execucao = 0
+        # Future do executor -> (tarefa, instante em que entrou no pool)
+        self._no_pool = {}
+        self._esgotadas = set()
+        # Derrubadas pelo vigia junto com uma tarefa travada (não foram culpa delas)
+        self._inocentes = set()
+        self._isoladas_em_execucao = 0
+        self._estatisticas = collections.defaultdict(_Estatisticas)
+        self._thread = None
+
+    def submit(self, fn, *args, prioridade=PRIORIDADE_LOTE):
+        futuro = Future()
+        chegada = time.monotonic()
+        tarefa = _Tarefa(prioridade * self.envelhecimento + chegada, prioridade, chegada, futuro, fn, args)
+        with self._condicao:
+            heapq.heappush(self._heap, (tarefa.chave, next(self._sequencia), tarefa))
+            self._estatisticas[prioridade].na_fila += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._despachar, name="agendador-ocr", daemon=True)
+                self._thread.start()
+            self._condicao.notify()
+        return futuro
+
+    def _despachar(self):
+        # Thread própria: o submit ao pool nunca roda dentro dos callbacks do próprio pool
+        while True:
+            matar = False
+            with self._condicao:
+                while True:
+                    agora = time.monotonic()
+                    while self._adiadas and self._adiadas[0][0] <= agora:
+                        _, _, tarefa = heapq.heappop(self._adiadas)
+                        heapq.heappush(self._heap, (tarefa.chave, next(self._sequencia), tarefa))
+                    matar = self._vigiar(agora)
+                    if matar or self._pode_despachar():
+                        break
+                    self._condicao.wait(self._proximo_evento(agora))
+                if not matar:
+                    _, _, tarefa = heapq.heappop(self._heap)
+                    estatisticas = self._estatisticas[tarefa.prioridade]
+                    estatisticas.na_fila -= 1
+                    if tarefa.tentativa == 1 and not tarefa.futuro.set_running_or_notify_cancel():
+                        continue
+                    self._em_execucao += 1
+                    self._isoladas_em_execucao += tarefa.isolada
+                    estatisticas.em_execucao += 1
+                    estatisticas.despachadas += 1
+                    if tarefa.tentativa == 1:
+                        estatisticas.esperas.append(agora - tarefa.chegada)
+
+            if matar:
+                # Fora do lock: os Futures do pool derrubado caem em _concluir
+                try:
+                    self._matar_executor()
+                except Exception as e:
+                    print(f"⚠️ Vigia: não foi possível derrubar os workers: {e}")
+                continue
+
+            try:
+                try:
+                    interno = self._obter_executor().submit(tarefa.fn, *tarefa.args)
+                except BrokenProcessPool:
+                    interno = self._obter_executor(recriar=True).submit(tarefa.fn, *tarefa.args)
+            except Exception as e:
+                self._concluir(tarefa, None, e)
+                continue
+            with self._condicao:
+                self._no_pool[interno] = (tarefa, time.monotonic())
+            interno.add_done_callback(lambda f, tarefa=tarefa: self._concluir(tarefa, f))
+
+    def _pode_despachar(self):
+        if not self._heap or self._em_execucao >= self.capacidade or self._isoladas_em_execucao:
+            return False
+        # Uma tarefa isolada espera o pool esvaziar
+        return not self._heap[0][2].isolada or self._em_execucao == 0
+
+    def _vigiar(self, agora):
+        """Marca as tarefas que passaram do limite; True se é preciso derrubar os workers."""
+        if self.tempo_limite is None or self._matar_executor is None:
+            return False
+        vencidas = [interno for interno, (_, inicio) in self._no_pool.items()
+                    if agora - inicio > self.tempo_limite and interno not in self._esgotadas]
+        for interno in vencidas:
+            tarefa = self._no_pool[interno][0]
+            self._esgotadas.add(interno)
+            self._estatisticas[tarefa.prioridade].tempo_esgotado += 1
+            print(f"⏰ Vigia: tarefa passou de {self.tempo_limite:g}s; reiniciando os workers")
+        if vencidas:
+            self._inocentes.update(interno for interno in self._no_pool if interno not in self._esgotadas)
+        return bool(vencidas)
+
+    def _proximo_evento(self, agora):
+        """Quanto o despachante pode dormir: até a próxima tarefa adiada ou a próxima checagem do vigia."""
+        espera = None
+        if self._adiadas:
+            espera = max(0.0, self._adiadas[0][0] - agora)
+        if self._no_pool and self.tempo_limite is not None and self._matar_executor is not None:
+            espera = INTERVALO_VIGIA if espera is None else min(espera, INTERVALO_VIGIA)
+        return espera
+
+    def _concluir(self, tarefa, interno, erro=None):
+        with self._condicao:
+            self._em_execucao -= 1
+            self._isoladas_em_execucao -= tarefa.isolada
+            self._estatisticas[tarefa.prioridade].em_execucao -= 1
+            esgotada = interno in self._esgotadas
+            inocente = interno in self._inocentes
+            self._no_pool.pop(interno, None)
+            self._esgotadas.discard(interno)
+            self._inocentes.discard(interno)
+            if erro is None:
+                try:
+                    erro = interno.exception()
+                except BaseException as e:
+                    # Cancelada porque o pool foi encerrado
+                    erro = e
+            if esgotada:
+                erro = TempoEsgotado(f"excedeu {self.tempo_limite:g}s")
+
+            # Derrubada junto com a travada: qualquer erro (pool quebrado, cancelada) não é dela
+            if inocente and erro is not None:
+                heapq.heappush(self._heap, (tarefa.chave, next(self._sequencia), tarefa))
+                self._estatisticas[tarefa.prioridade].na_fila += 1
+                self._condicao.notify()
+                return
+            if isinstance(erro, RETENTAVEIS) and tarefa.tentativa < self.tentativas:
+                disponivel = time.monotonic() + ESPERA_NOVA_TENTATIVA * 2 ** (tarefa.tentativa - 1)
+                tarefa.tentativa += 1
+                tarefa.isolada = isinstance(erro, BrokenProcessPool)
+                heapq.heappush(self._adiadas, (disponivel, next(self._sequencia), tarefa))
+                estatisticas = self._estatisticas[tarefa.prioridade]
+                estatisticas.na_fila += 1
+                estatisticas.novas_tentativas += 1
+                self._condicao.notify()
+                return
+            self._condicao.notify()
+
+        tarefa.futuro.tentativas = tarefa.tentativa
+        if erro is None:
+            tarefa.futuro.set_result(interno.result())
+        else:
+            tarefa.futuro.set_exception(erro)
+
+    def metricas(self):
+        """Profundidade da fila e tempo de espera (últimas 1000 tarefas) por prioridade."""
+        with self._condicao:
+            return {NOMES_PRIORIDADE.get(prioridade, str(prioridade)): estatisticas.resumo()
+                    for prioridade, estatisticas in sorted(self._estatisticas.items())}
+
+    def resumo(self):
+        """Uma linha com a espera média de cada prioridade (vazia se nada passou pelo agendador)."""
+        partes = [f"{nome}: {dados['despachadas']} tarefa(s), espera média {dados['espera_media']:.2f}s "
+                  f"(p95 {dados['espera_p95']:.2f}s)"
+                  for nome, dados in self.metricas().items() if dados['despachadas']]
+        return ("⏱️  Fila por prioridade — " + "; ".join(partes)) if partes else ""
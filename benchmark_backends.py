@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+benchmark_backends.py
+Mede a latência por imagem de cada backend de OCR (tesserocr x pytesseract).
+
+Uso:
+  python benchmark_backends.py [pasta_ou_imagens ...] [--repeticoes N] [--json]
+
+Sem argumentos usa a pasta 'imagens' do projeto (criando a imagem de teste se
+estiver vazia). Todas as imagens passam pelo mesmo pré-processamento antes da
+medição, então o tempo reportado é só o do reconhecimento.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from ocr_funcoes import preprocessar_imagem, listar_imagens, criar_imagem_teste
+from ocr_backends import obter_backend, backends_disponiveis, CONFIG_PADRAO
+from benchmark_ocr import percentil
+
+
+def _coletar_imagens(entradas):
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos += [os.path.join(entrada, nome) for nome in sorted(listar_imagens(entrada))]
+        elif os.path.isfile(entrada):
+            caminhos.append(entrada)
+    return caminhos
+
+
+def medir_backend(nome, imagens, repeticoes, config=CONFIG_PADRAO):
+    """Retorna dict com tempo de inicialização e estatísticas de latência (ms) do backend."""
+    backend = obter_backend(nome)
+    if backend.nome != nome:
+        return None
+
+    inicio = time.perf_counter()
+    backend.aquecer(config)
+    inicializacao = (time.perf_counter() - inicio) * 1000
+
+    latencias = []
+    for _ in range(repeticoes):
+        for imagem in imagens:
+            inicio = time.perf_counter()
+            backend.reconhecer(imagem, config)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    return {
+        'backend': nome,
+        'imagens': len(imagens),
+        'chamadas': len(latencias),
+        'inicializacao_ms': round(inicializacao, 2),
+        'media_ms': round(statistics.mean(latencias), 2),
+        'mediana_ms': round(statistics.median(latencias), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'min_ms': round(min(latencias), 2),
+        'max_ms': round(max(latencias), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara a latência por imagem dos backends de OCR")
+    parser.add_argument('entradas', nargs='*', help="Pastas ou arquivos de imagem")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Quantas vezes cada imagem é reconhecida")
+    parser.add_argument('--config', default=CONFIG_PADRAO, help="Config do Tesseract")
+    parser.add_argument('--json', action='store_true', help="Emite o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    entradas = args.entradas
+    if not entradas:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        imagens_dir = os.path.join(project_root, "imagens")
+        if not os.path.isdir(imagens_dir) or not listar_imagens(imagens_dir):
+            criar_imagem_teste()
+        entradas = [imagens_dir]
+
+    caminhos = _coletar_imagens(entradas)
+    imagens = [img for img in (preprocessar_imagem(c) for c in caminhos) if img is not None]
+    if not imagens:
+        print("❌ Nenhuma imagem válida para o benchmark")
+        return 1
+
+    resultados = []
+    for nome in ['tesserocr', 'pytesseract']:
+        if nome not in backends_disponiveis():
+            if not args.json:
+                print(f"⚠️ Backend '{nome}' indisponível, ignorado")
+            continue
+        resultado = medir_backend(nome, imagens, args.repeticoes, args.config)
+        if resultado:
+            resultados.append(resultado)
+
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+        return 0
+
+    print("\n" + "=" * 78)
+    print(f"{'Backend':<13} {'Init (ms)':>10} {'Média':>10} {'Mediana':>10} {'p95':>10} {'Mín':>10} {'Máx':>10}")
+    print("-" * 78)
+    for r in resultados:
+        print(f"{r['backend']:<13} {r['inicializacao_ms']:>10.1f} {r['media_ms']:>10.1f} {r['mediana_ms']:>10.1f} "
+              f"{r['p95_ms']:>10.1f} {r['min_ms']:>10.1f} {r['max_ms']:>10.1f}")
+    print("=" * 78)
+    print(f"{len(imagens)} imagem(ns) x {args.repeticoes} repetição(ões), config: {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
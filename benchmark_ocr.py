@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+benchmark_ocr.py
+Roda o corpus sintético (corpus_sintetico.py) pelo pipeline de produção
+(processamento_lote.processar_em_fluxo) e mede cada etapa: decodificação,
+triagem, pré-processamento e OCR (lidos de metadados['tempo_etapas'] de cada
+página), extração de dados e gravação (arquivos _texto.txt + histórico).
+Reporta latência por etapa, vazão (páginas/s), pico de memória (RSS) e taxa
+de erro de caracteres (CER) contra o texto verdadeiro.
+
+O pipeline roda com uma cópia do config.json sem cache de OCR, sem
+deduplicação e sem quarentena: toda página passa pelo OCR e o corpus não é
+alterado. O pré-processamento também é detalhado por etapa do perfil em uso;
+com --perfil dá para comparar perfis (latência x CER) sobre o mesmo corpus.
+Com --workers > 1 o OCR vai para o pool de processos (mede a vazão real; as
+latências por etapa passam a disputar CPU entre si).
+
+Uso:
+  python benchmark_ocr.py [corpus] [--quantidade N] [--semente S] [--perfil P] [--workers N] [--saida execucao.json]
+  python benchmark_ocr.py --comparar antes.json depois.json [--json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from corpus_sintetico import gerar_corpus
+from ocr_backends import obter_backend
+from ocr_funcoes import confianca_de, observacao_historico
+from pagina_branca import eh_branca
+from preprocessamento import perfis
+from processador_dados import ProcessadorDados
+from processamento_lote import processar_em_fluxo, salvar_resultado
+
+try:
+    from cdigo.history import GerenciadorDocumentos
+    from cdigo.config import load_config, save_config
+except Exception:
+    from history import GerenciadorDocumentos
+    from config import load_config, save_config
+
+
+ETAPAS = ['decodificacao', 'triagem', 'preprocessamento', 'ocr', 'extracao', 'gravacao']
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) de `valores` pelo vizinho mais próximo."""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def _status_kb(campo):
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1])
+    return 0
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo (MB); 0 onde não for possível medir."""
+    if os.path.exists('/proc/self/status'):
+        return round(_status_kb('VmHWM') / 1024, 1)
+    if resource is not None:
+        uso = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta em KB, macOS em bytes
+        return round(uso / (1024 * 1024) if sys.platform == 'darwin' else uso / 1024, 1)
+    return 0.0
+
+
+def _normalizar(texto):
+    # Compara só o conteúdo: espaços e quebras de linha viram um espaço
+    return ' '.join((texto or '').split())
+
+
+def distancia_edicao(a, b):
+    """Distância de Levenshtein (inserção, remoção e troca custam 1)."""
+    if len(a) < len(b):
+        a, b = b, a
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        atual = [i]
+        for j, cb in enumerate(b, 1):
+            atual.append(min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        anterior = atual
+    return anterior[-1]
+
+
+def cer(reconhecido, verdadeiro):
+    """Taxa de erro de caracteres: edições necessárias / tamanho do texto verdadeiro."""
+    reconhecido, verdadeiro = _normalizar(reconhecido), _normalizar(verdadeiro)
+    if not verdadeiro:
+        return 0.0 if not reconhecido else 1.0
+    return distancia_edicao(reconhecido, verdadeiro) / len(verdadeiro)
+
+
+@contextmanager
+def _config_isolada(pasta, perfil=None):
+    """
+    Aponta o config.json (deste processo e dos workers que ele criar) para uma
+    cópia em `pasta`, sem cache, deduplicação nem quarentena e, se dado, com
+    `perfil` como perfil de pré-processamento.
+    """
+    cfg = dict(load_config() or {}, cache_ocr=False, deduplicacao=False, quarentena=False)
+    if perfil:
+        cfg['perfil_preprocessamento'] = perfil
+    anteriores = {var: os.environ.get(var) for var in ('XDG_CONFIG_HOME', 'APPDATA')}
+    os.environ['XDG_CONFIG_HOME'] = os.environ['APPDATA'] = pasta
+    try:
+        save_config(cfg)
+        yield
+    finally:
+        for var, valor in anteriores.items():
+            if valor is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = valor
+
+
+def _estatisticas(tempos):
+    return {
+        etapa: {
+            'media_ms': round(statistics.mean(valores), 2),
+            'mediana_ms': round(statistics.median(valores), 2),
+            'p95_ms': round(percentil(valores, 95), 2),
+            'total_s': round(sum(valores) / 1000, 3),
+        } for etapa, valores in tempos.items() if valores
+    }
+
+
+def executar(corpus_dir, manifesto, perfil=None, workers=1):
+    """
+    Processa o corpus e retorna o relatório da execução (dict serializável em
+    JSON). `perfil` escolhe o perfil de pré-processamento (padrão: o do
+    config.json); `workers` é repassado a processar_em_fluxo.
+    """
+    backend = obter_backend()
+    backend.aquecer()
+    tempos = {etapa: [] for etapa in ETAPAS}
+    tempos_preprocessamento = {}
+    nome_perfil = None
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as saida, _config_isolada(os.path.join(saida, 'config'), perfil):
+        gerenciador = GerenciadorDocumentos(saida)
+        nomes = [doc['arquivo'] for doc in manifesto['documentos']]
+        inicio_total = time.perf_counter()
+
+        for resultado in processar_em_fluxo(nomes, corpus_dir, tipo_documento="benchmark", workers=workers):
+            for pagina in resultado.get('paginas') or [resultado]:
+                metadados = pagina.get('metadados') or {}
+                for etapa, duracao in (metadados.get('tempo_etapas') or {}).items():
+                    tempos.setdefault(etapa, []).append(duracao * 1000)
+                for etapa, duracao in (metadados.get('tempo_preprocessamento') or {}).items():
+                    tempos_preprocessamento.setdefault(etapa, []).append(duracao * 1000)
+                nome_perfil = metadados.get('perfil') or nome_perfil
+                inicio = time.perf_counter()
+                ProcessadorDados.estruturar_dados(pagina.get('texto') or '')
+                tempos['extracao'].append((time.perf_counter() - inicio) * 1000)
+
+            # O mesmo que o gravador de processar_em_fluxo faz com resultados_dir e gerenciador
+            inicio = time.perf_counter()
+            if resultado['texto'] or eh_branca(resultado):
+                salvar_resultado(resultado, saida)
+                gerenciador.adicionar_documento(resultado['arquivo'], "benchmark", confianca_de(resultado),
+                                                observacao_historico(resultado))
+            tempos['gravacao'].append((time.perf_counter() - inicio) * 1000)
+            resultados[resultado['arquivo']] = resultado
+
+        duracao_total = time.perf_counter() - inicio_total
+
+    documentos = []
+    total_paginas = 0
+    for doc in manifesto['documentos']:
+        resultado = resultados.get(doc['arquivo']) or {}
+        erros_pagina = []
+        for indice, pagina in enumerate(resultado.get('paginas') or [resultado]):
+            metadados = pagina.get('metadados') or {}
+            verdadeiro = doc['paginas'][indice] if indice < len(doc['paginas']) else ''
+            erros_pagina.append({'cer': cer(pagina.get('texto'), verdadeiro), 'nivel': metadados.get('nivel'),
+                                 'confianca': metadados.get('confianca', 0.0)})
+        total_paginas += len(erros_pagina)
+        documentos.append({
+            'arquivo': doc['arquivo'],
+            'parametros': doc.get('parametros', {}),
+            'cer': round(statistics.mean(p['cer'] for p in erros_pagina), 4) if erros_pagina else None,
+            'paginas': erros_pagina,
+        })
+
+    cers = [d['cer'] for d in documentos if d['cer'] is not None]
+    return {
+        'meta': {
+            'data': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'maquina': platform.node(),
+            'python': platform.python_version(),
+            'backend': backend.nome,
+            'tesseract': backend.versao(),
+            'semente': manifesto.get('semente'),
+            'documentos': len(documentos),
+            'paginas': total_paginas,
+            'perfil': nome_perfil,
+            'workers': workers,
+        },
+        'etapas': _estatisticas(tempos),
+        'etapas_preprocessamento': _estatisticas(tempos_preprocessamento),
+        'duracao_s': round(duracao_total, 3),
+        'paginas_por_s': round(total_paginas / duracao_total, 3) if duracao_total else 0.0,
+        'pico_rss_mb': pico_rss_mb(),
+        'cer_medio': round(statistics.mean(cers), 4) if cers else None,
+        'documentos': documentos,
+    }
+
+
+def _delta(antes, depois):
+    if antes is None or depois is None:
+        return None
+    return {
+        'antes': antes,
+        'depois': depois,
+        'diferenca': round(depois - antes, 4),
+        'variacao_pct': round((depois - antes) / antes * 100, 1) if antes else None,
+    }
+
+
+def comparar(antes, depois):
+    """Diferença entre dois relatórios de executar() (depois - antes)."""
+    return {
+        'etapas': {
+            etapa: _delta(antes['etapas'].get(etapa, {}).get('mediana_ms'),
+                          depois['etapas'].get(etapa, {}).get('mediana_ms'))
+            for etapa in ETAPAS
+        },
+        'etapas_preprocessamento': {
+            etapa: _delta(antes.get('etapas_preprocessamento', {}).get(etapa, {}).get('mediana_ms'),
+                          depois.get('etapas_preprocessamento', {}).get(etapa, {}).get('mediana_ms'))
+            for etapa in dict.fromkeys(list(antes.get('etapas_preprocessamento', {}))
+                                       + list(depois.get('etapas_preprocessamento', {})))
+        },
+        'perfis': (antes['meta'].get('perfil'), depois['meta'].get('perfil')),
+        'paginas_por_s': _delta(antes.get('paginas_por_s'), depois.get('paginas_por_s')),
+        'pico_rss_mb': _delta(antes.get('pico_rss_mb'), depois.get('pico_rss_mb')),
+        'cer_medio': _delta(antes.get('cer_medio'), depois.get('cer_medio')),
+        'mesmo_corpus': (antes['meta'].get('semente'), antes['meta'].get('paginas'))
+                        == (depois['meta'].get('semente'), depois['meta'].get('paginas')),
+    }
+
+
+def _imprimir_relatorio(relatorio):
+    meta = relatorio['meta']
+    print("\n" + "=" * 66)
+    print(f"{'Etapa':<18} {'Média (ms)':>11} {'Mediana':>11} {'p95':>11} {'Total (s)':>11}")
+    print("-" * 66)
+    for etapa in ETAPAS:
+        e = relatorio['etapas'].get(etapa)
+        if e:
+            print(f"{etapa:<18} {e['media_ms']:>11.1f} {e['mediana_ms']:>11.1f} {e['p95_ms']:>11.1f} {e['total_s']:>11.2f}")
+        if etapa == 'preprocessamento':
+            for nome, e in relatorio.get('etapas_preprocessamento', {}).items():
+                rotulo = f"  ↳ {nome}"
+                print(f"{rotulo:<18} {e['media_ms']:>11.1f} {e['mediana_ms']:>11.1f} {e['p95_ms']:>11.1f} {e['total_s']:>11.2f}")
+    print("=" * 66)
+    if meta.get('perfil'):
+        print(f"Perfil de pré-processamento: {meta['perfil']}")
+    print(f"{meta['documentos']} documento(s), {meta['paginas']} página(s) em {relatorio['duracao_s']:.1f}s "
+          f"({relatorio['paginas_por_s']:.2f} pág/s), backend {meta['backend']} {meta['tesseract']}")
+    cer_medio = relatorio['cer_medio']
+    texto_cer = f"{cer_medio * 100:.2f}%" if cer_medio is not None else "-"
+    print(f"Pico de memória: {relatorio['pico_rss_mb']:.0f} MB | CER médio: {texto_cer}")
+
+
+def _imprimir_comparacao(diferencas):
+    def linha(nome, d, unidade, menor_melhor=True):
+        if not d:
+            print(f"{nome:<18} {'-':>11}")
+            return
+        melhorou = (d['diferenca'] < 0) == menor_melhor if d['diferenca'] else None
+        marca = '' if melhorou is None else ('✅' if melhorou else '⚠️')
+        pct = f"{d['variacao_pct']:+.1f}%" if d['variacao_pct'] is not None else '-'
+        print(f"{nome:<18} {d['antes']:>11.2f} {d['depois']:>11.2f} {pct:>9} {unidade:<6} {marca}")
+
+    print("\n" + "=" * 66)
+    print(f"{'Métrica':<18} {'Antes':>11} {'Depois':>11} {'Variação':>9}")
+    print("-" * 66)
+    for etapa in ETAPAS:
+        linha(etapa, diferencas['etapas'][etapa], 'ms')
+        if etapa == 'preprocessamento':
+            for nome, d in diferencas.get('etapas_preprocessamento', {}).items():
+                linha(f"  ↳ {nome}", d, 'ms')
+    linha('páginas/s', diferencas['paginas_por_s'], '', menor_melhor=False)
+    linha('pico RSS', diferencas['pico_rss_mb'], 'MB')
+    linha('CER', diferencas['cer_medio'], '')
+    print("=" * 66)
+    antes, depois = diferencas.get('perfis', (None, None))
+    if antes != depois:
+        print(f"Perfis de pré-processamento: {antes} -> {depois}")
+    if not diferencas['mesmo_corpus']:
+        print("⚠️ As execuções usaram corpora diferentes (semente ou nº de páginas)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da cadeia de OCR sobre um corpus sintético")
+    parser.add_argument('corpus', nargs='?', default=None, help="Pasta do corpus (gerado se não tiver manifesto.json)")
+    parser.add_argument('--quantidade', type=int, default=20, help="Documentos ao gerar o corpus")
+    parser.add_argument('--semente', type=int, default=42, help="Semente ao gerar o corpus")
+    parser.add_argument('--perfil', help="Perfil de pré-processamento (padrão: o do config.json)")
+    parser.add_argument('--workers', type=int, default=1, help="Processos de OCR do pipeline (padrão: 1)")
+    parser.add_argument('--saida', help="Grava o relatório JSON neste arquivo")
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'), help="Compara dois relatórios JSON")
+    parser.add_argument('--json', action='store_true', help="Emite o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        relatorios = []
+        for caminho in args.comparar:
+            with open(caminho, encoding='utf-8') as f:
+                relatorios.append(json.load(f))
+        diferencas = comparar(*relatorios)
+        if args.json:
+            print(json.dumps(diferencas, ensure_ascii=False, indent=2))
+        else:
+            _imprimir_comparacao(diferencas)
+        return 0
+
+    if args.perfil and args.perfil not in perfis():
+        print(f"❌ Perfil de pré-processamento desconhecido: {args.perfil} (disponíveis: {', '.join(perfis())})")
+        return 2
+
+    corpus_dir = args.corpus
+    if not corpus_dir:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        corpus_dir = os.path.join(project_root, "corpus_benchmark")
+    caminho_manifesto = os.path.join(corpus_dir, "manifesto.json")
+    if os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding='utf-8') as f:
+            manifesto = json.load(f)
+    else:
+        manifesto = gerar_corpus(corpus_dir, args.quantidade, args.semente)
+
+    relatorio = executar(corpus_dir, manifesto, args.perfil, args.workers)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    if args.json:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    else:
+        _imprimir_relatorio(relatorio)
+        if args.saida:
+            print(f"📁 Relatório salvo em: {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
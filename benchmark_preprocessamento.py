@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+benchmark_preprocessamento.py
+Compara o pré-processamento antigo (ocr_funcoes.preprocessar_imagem, via PIL)
+com o novo (preprocessamento.preprocessar_array, em NumPy).
+
+Para cada imagem mede o tempo (ms por megapixel) e o pico de memória (MB por
+megapixel). O pico é medido num processo separado por medição, pelo VmHWM
+(Linux) ou maxrss do sistema operacional; onde não há o módulo `resource`
+(Windows) usa tracemalloc, que só enxerga alocações feitas pelo Python/NumPy.
+
+Uso:
+  python benchmark_preprocessamento.py [pasta_ou_imagens ...] [--repeticoes N] [--json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from ocr_funcoes import listar_imagens, criar_imagem_teste
+
+
+FUNCOES = {
+    'pil (atual)': ('ocr_funcoes', 'preprocessar_imagem'),
+    'numpy': ('preprocessamento', 'preprocessar_array'),
+}
+
+
+def _carregar_funcao(nome):
+    modulo, funcao = FUNCOES[nome]
+    return getattr(__import__(modulo), funcao)
+
+
+def _status_kb(campo):
+    with open('/proc/self/status') as f:
+        for linha in f:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1])
+    return 0
+
+
+def _maxrss_bytes():
+    uso = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return uso if sys.platform == 'darwin' else uso * 1024
+
+
+def _medir_pico(nome, caminho, fila):
+    funcao = _carregar_funcao(nome)
+    if os.path.exists('/proc/self/clear_refs'):
+        # Linux: zera o pico (VmHWM) para não herdar o do processo pai
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        base = _status_kb('VmRSS')
+        funcao(caminho)
+        fila.put((_status_kb('VmHWM') - base) * 1024)
+    elif resource is not None:
+        base = _maxrss_bytes()
+        funcao(caminho)
+        fila.put(_maxrss_bytes() - base)
+    else:
+        import tracemalloc
+        tracemalloc.start()
+        funcao(caminho)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        fila.put(pico)
+
+
+def pico_memoria(nome, caminho):
+    """Pico de memória (bytes) de uma chamada, medido num processo novo."""
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_medir_pico, args=(nome, caminho, fila))
+    processo.start()
+    pico = fila.get()
+    processo.join()
+    return pico
+
+
+def megapixels(caminho):
+    from PIL import Image
+    with Image.open(caminho) as img:
+        return img.width * img.height / 1e6
+
+
+def medir(nome, caminho, repeticoes):
+    funcao = _carregar_funcao(nome)
+    funcao(caminho)  # aquecimento (cache de disco, imports)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(caminho)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    mp = megapixels(caminho)
+    return {
+        'funcao': nome,
+        'imagem': os.path.basename(caminho),
+        'megapixels': round(mp, 2),
+        'ms_por_mp': round(statistics.median(tempos) / mp, 2),
+        'mb_pico_por_mp': round(pico_memoria(nome, caminho) / 1e6 / mp, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark do pré-processamento (PIL x NumPy)")
+    parser.add_argument('entradas', nargs='*', help="Pastas ou arquivos de imagem")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help="Emite o resultado em JSON")
+    args = parser.parse_args(argv)
+
+    entradas = args.entradas
+    if not entradas:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        imagens_dir = os.path.join(project_root, "imagens")
+        if not os.path.isdir(imagens_dir) or not listar_imagens(imagens_dir):
+            criar_imagem_teste()
+        entradas = [imagens_dir]
+
+    caminhos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos += [os.path.join(entrada, n) for n in sorted(listar_imagens(entrada))
+                         if not n.lower().endswith('.pdf')]
+        elif os.path.isfile(entrada):
+            caminhos.append(entrada)
+
+    if not caminhos:
+        print("❌ Nenhuma imagem para o benchmark")
+        return 1
+
+    resultados = [medir(nome, caminho, args.repeticoes) for caminho in caminhos for nome in FUNCOES]
+
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+        return 0
+
+    print("\n" + "=" * 72)
+    print(f"{'Imagem':<28} {'Função':<12} {'MP':>6} {'ms/MP':>10} {'MB pico/MP':>12}")
+    print("-" * 72)
+    for r in resultados:
+        print(f"{r['imagem'][:28]:<28} {r['funcao']:<12} {r['megapixels']:>6.1f} {r['ms_por_mp']:>10.1f} {r['mb_pico_por_mp']:>12.1f}")
+    print("=" * 72)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
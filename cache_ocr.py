@@ -0,0 +1,299 @@
+"""
+Cache persistente de resultados de OCR endereçado pelo conteúdo da imagem.
+
+A chave é o hash dos bytes do arquivo combinado com a config do Tesseract, a
+versão da cadeia de pré-processamento e a versão do Tesseract; mudar qualquer
+um deles invalida naturalmente as entradas antigas. As entradas ficam num
+SQLite com orçamento de tamanho e despejo LRU.
+
+Consultas não escrevem no banco: acertos/falhas e o último acesso ficam em
+memória e são gravados em lote (a cada DESCARGA_INTERVALO segundos, junto com
+o próximo guardar() ou ao sair do processo), e o último acesso só é renovado
+quando tem mais de ACESSO_RECENTE segundos. O tamanho total é mantido por
+gatilhos numa linha de `contadores`, sem somar a tabela a cada gravação.
+
+API:
+  obter_cache() -> CacheOCR ou None (desativado em config.json)
+  hash_arquivo(caminho) -> str
+  hash_dados(caminho, st, dados) -> str (conteúdo já lido; memorizado como o de hash_arquivo)
+  resumo_desde(estatisticas_antes) -> str com acertos/falhas do lote
+  CacheOCR(caminho, limite_bytes).obter(chave) / .guardar(chave, texto, metadados) / .estatisticas()
+  CacheOCR.descarregar() -> grava os contadores e acessos pendentes
+"""
+import os
+import json
+import atexit
+import time
+import hashlib
+import sqlite3
+import threading
+
+try:
+    from cdigo.config import load_config, _appdata_config_path
+except Exception:
+    from config import load_config, _appdata_config_path
+
+
+LIMITE_PADRAO_MB = 512
+DESCARGA_INTERVALO = 5.0     # segundos entre gravações dos contadores/acessos pendentes
+ACESSO_RECENTE = 3600.0      # último acesso mais novo que isso não é renovado (LRU aproximado)
+
+_cache = None
+_cache_carregado = False
+_lock_cache = threading.Lock()
+_hashes = {}
+
+
+def hash_arquivo(caminho, bloco=1 << 20):
+    """
+    SHA-256 do conteúdo do arquivo, lido em blocos (memória constante).
+    Memorizado por (caminho, tamanho, mtime): as páginas de um mesmo TIFF/PDF
+    não refazem o hash do arquivo inteiro.
+    """
+    st = os.stat(caminho)
+    identidade = (os.path.abspath(caminho), st.st_size, st.st_mtime_ns)
+    if identidade in _hashes:
+        return _hashes[identidade]
+
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for parte in iter(lambda: f.read(bloco), b''):
+            h.update(parte)
+    return _memorizar(identidade, h.hexdigest())
+
+
+def hash_dados(caminho, st, dados):
+    """
+    SHA-256 de `dados`, o conteúdo de `caminho` já lido (ou mapeado) por quem
+    chama, com `st` do mesmo arquivo aberto. Fica memorizado: um hash_arquivo
+    posterior (ex.: o manifesto) não lê o arquivo de novo.
+    """
+    identidade = (os.path.abspath(caminho), st.st_size, st.st_mtime_ns)
+    if identidade in _hashes:
+        return _hashes[identidade]
+    return _memorizar(identidade, hashlib.sha256(dados).hexdigest())
+
+
+def _memorizar(identidade, digest):
+    if len(_hashes) >= 256:
+        _hashes.clear()
+    _hashes[identidade] = digest
+    return digest
+
+
+def montar_chave(hash_conteudo, config, versao_preprocessamento, versao_tesseract):
+    """Combina o hash da imagem com tudo o que altera o resultado do OCR."""
+    assinatura = f"{hash_conteudo}|{config}|pre{versao_preprocessamento}|tess{versao_tesseract}"
+    return hashlib.sha256(assinatura.encode('utf-8')).hexdigest()
+
+
+class CacheOCR:
+    """Cache SQLite com orçamento de tamanho (LRU) e contadores de acerto/falha."""
+
+    def __init__(self, caminho, limite_bytes=LIMITE_PADRAO_MB * 1024 * 1024):
+        self.caminho = caminho
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self._pendentes = {'acertos': 0, 'falhas': 0}
+        self._acessos = {}
+        self._ultima_descarga = time.monotonic()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        # Vários processos do pool usam o mesmo arquivo: WAL + timeout generoso
+        self._conn = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._criar_tabelas()
+        # Os workers do pool também saem por aqui: o que ficou em memória vai para o banco
+        atexit.register(self.descarregar)
+
+    def _criar_tabelas(self):
+        # IMMEDIATE: a linha 'tamanho' e os gatilhos nascem juntos, sem outro processo no meio
+        self._conn.execute('BEGIN IMMEDIATE')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS resultados (
+                    chave TEXT PRIMARY KEY,
+                    texto TEXT,
+                    metadados TEXT,
+                    tamanho INTEGER,
+                    ultimo_acesso REAL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON resultados (ultimo_acesso)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS contadores (
+                    nome TEXT PRIMARY KEY,
+                    valor INTEGER
+                )
+            ''')
+            self._conn.execute("INSERT OR IGNORE INTO contadores VALUES ('acertos', 0), ('falhas', 0)")
+            # Bancos antigos: a soma é feita uma única vez; daí em diante os gatilhos mantêm o total
+            self._conn.execute(
+                "INSERT OR IGNORE INTO contadores SELECT 'tamanho', COALESCE(SUM(tamanho), 0) FROM resultados"
+            )
+            self._conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS resultados_inserir AFTER INSERT ON resultados BEGIN
+                    UPDATE contadores SET valor = valor + NEW.tamanho WHERE nome = 'tamanho';
+                END
+            ''')
+            self._conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS resultados_remover AFTER DELETE ON resultados BEGIN
+                    UPDATE contadores SET valor = valor - OLD.tamanho WHERE nome = 'tamanho';
+                END
+            ''')
+            self._conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS resultados_tamanho AFTER UPDATE OF tamanho ON resultados BEGIN
+                    UPDATE contadores SET valor = valor + NEW.tamanho - OLD.tamanho WHERE nome = 'tamanho';
+                END
+            ''')
+
+    def obter(self, chave):
+        """Retorna {'texto', 'metadados'} se a chave estiver no cache, senão None."""
+        with self._lock:
+            # Só leitura: não disputa o lock de escrita do SQLite com os outros processos
+            linha = self._conn.execute(
+                'SELECT texto, metadados, ultimo_acesso FROM resultados WHERE chave = ?', (chave,)
+            ).fetchone()
+            agora = time.time()
+            if linha is None:
+                self.falhas += 1
+                self._pendentes['falhas'] += 1
+            else:
+                self.acertos += 1
+                self._pendentes['acertos'] += 1
+                if agora - (linha[2] or 0) > ACESSO_RECENTE:
+                    self._acessos[chave] = agora
+            if time.monotonic() - self._ultima_descarga >= DESCARGA_INTERVALO:
+                self._descarregar()
+        if linha is None:
+            return None
+        return {'texto': linha[0], 'metadados': json.loads(linha[1] or '{}')}
+
+    def guardar(self, chave, texto, metadados=None):
+        meta_json = json.dumps(metadados or {}, ensure_ascii=False)
+        tamanho = len(chave) + len((texto or '').encode('utf-8')) + len(meta_json.encode('utf-8'))
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'INSERT INTO resultados VALUES (?, ?, ?, ?, ?) ON CONFLICT (chave) DO UPDATE SET '
+                    'texto = excluded.texto, metadados = excluded.metadados, '
+                    'tamanho = excluded.tamanho, ultimo_acesso = excluded.ultimo_acesso',
+                    (chave, texto, meta_json, tamanho, time.time())
+                )
+                # Já há uma transação de escrita aberta: os pendentes vão de carona
+                self._gravar_pendentes()
+                self._despejar()
+            self._zerar_pendentes()
+
+    def descarregar(self):
+        """Grava no banco os contadores e acessos que ainda estão só em memória."""
+        with self._lock:
+            try:
+                self._descarregar()
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache de OCR: contadores não gravados: {e}")
+
+    def _descarregar(self):
+        with self._conn:
+            self._gravar_pendentes()
+        self._zerar_pendentes()
+
+    def _gravar_pendentes(self):
+        self._conn.executemany(
+            'UPDATE contadores SET valor = valor + ? WHERE nome = ?',
+            [(valor, nome) for nome, valor in self._pendentes.items() if valor]
+        )
+        self._conn.executemany(
+            'UPDATE resultados SET ultimo_acesso = MAX(ultimo_acesso, ?) WHERE chave = ?',
+            [(momento, chave) for chave, momento in self._acessos.items()]
+        )
+
+    def _zerar_pendentes(self):
+        self._pendentes = dict.fromkeys(self._pendentes, 0)
+        self._acessos = {}
+        self._ultima_descarga = time.monotonic()
+
+    def _despejar(self):
+        total = self._conn.execute("SELECT valor FROM contadores WHERE nome = 'tamanho'").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        # Remove as entradas menos usadas recentemente até caber no orçamento
+        excesso = total - self.limite_bytes
+        removidos = 0
+        chaves = []
+        for chave, tamanho in self._conn.execute('SELECT chave, tamanho FROM resultados ORDER BY ultimo_acesso'):
+            chaves.append((chave,))
+            removidos += tamanho
+            if removidos >= excesso:
+                break
+        self._conn.executemany('DELETE FROM resultados WHERE chave = ?', chaves)
+
+    def estatisticas(self):
+        """
+        Contadores acumulados (todos os processos) e ocupação do cache. Os
+        pendentes deste processo são gravados antes; os dos outros processos
+        entram na próxima descarga deles.
+        """
+        with self._lock:
+            self._descarregar()
+            contadores = dict(self._conn.execute('SELECT nome, valor FROM contadores').fetchall())
+            entradas = self._conn.execute('SELECT COUNT(*) FROM resultados').fetchone()[0]
+        return {
+            'acertos': contadores.get('acertos', 0),
+            'falhas': contadores.get('falhas', 0),
+            'entradas': entradas,
+            'tamanho_bytes': contadores.get('tamanho', 0),
+            'limite_bytes': self.limite_bytes,
+        }
+
+    def limpar(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM resultados')
+            self._conn.execute('UPDATE contadores SET valor = 0')
+            self._zerar_pendentes()
+        self.acertos = 0
+        self.falhas = 0
+
+
+def obter_cache():
+    """
+    Cache do processo atual, configurado pelo config.json:
+      'cache_ocr' (bool, padrão True), 'cache_limite_mb', 'cache_caminho'.
+    Retorna None se o cache estiver desativado ou não puder ser aberto.
+    """
+    global _cache, _cache_carregado
+    if _cache_carregado:
+        return _cache
+    # As threads de decodificação do pipeline chegam aqui juntas: uma abre, as outras esperam
+    with _lock_cache:
+        if not _cache_carregado:
+            _cache = _abrir_cache()
+            _cache_carregado = True
+    return _cache
+
+
+def _abrir_cache():
+    cfg = load_config() or {}
+    if not cfg.get('cache_ocr', True):
+        return None
+
+    caminho = cfg.get('cache_caminho') or os.path.join(os.path.dirname(_appdata_config_path()), 'cache_ocr.db')
+    try:
+        limite = int(float(cfg.get('cache_limite_mb', LIMITE_PADRAO_MB)) * 1024 * 1024)
+        return CacheOCR(caminho, limite)
+    except Exception as e:
+        print(f"⚠️ Cache de OCR indisponível: {e}")
+        return None
+
+
+def resumo_desde(antes):
+    """Texto com acertos/falhas do cache desde a foto `antes` de estatisticas()."""
+    cache = obter_cache()
+    if cache is None or antes is None:
+        return ""
+    depois = cache.estatisticas()
+    acertos = depois['acertos'] - antes['acertos']
+    falhas = depois['falhas'] - antes['falhas']
+    return f"♻️ Cache: {acertos} acerto(s), {falhas} falha(s)"
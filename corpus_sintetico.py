@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+corpus_sintetico.py
+Gera um corpus de documentos sintéticos com o texto verdadeiro (ground truth),
+para medir velocidade e qualidade do OCR de forma repetível.
+
+A mesma semente gera sempre o mesmo corpus. Cada documento varia fonte,
+tamanho da letra, ruído, desfoque, rotação, resolução e número de páginas
+(documentos com mais de uma página são gravados como TIFF multipágina).
+
+Arquivos gerados na pasta de destino:
+  doc_000.png / doc_001.tif ...   imagens
+  doc_000.gt.txt ...              texto verdadeiro (páginas separadas por \\f)
+  manifesto.json                  parâmetros e texto de cada documento
+
+Uso:
+  python corpus_sintetico.py [destino] [--quantidade N] [--semente S]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from ocr_funcoes import carregar_fonte, desenhar_documento, FONTES_SISTEMA
+
+
+FONTES = FONTES_SISTEMA + [
+    r"C:\\Windows\\Fonts\\times.ttf", r"C:\\Windows\\Fonts\\cour.ttf", r"C:\\Windows\\Fonts\\verdana.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSerif-Regular.ttf",
+]
+
+NOMES = ["Maria", "Joao", "Ana", "Carlos", "Fernanda", "Paulo", "Juliana", "Rafael", "Beatriz", "Lucas"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Pereira", "Costa", "Rodrigues", "Almeida", "Lima", "Gomes"]
+CIDADES = ["Cuiaba-MT", "Barra do Bugres-MT", "Sao Paulo-SP", "Curitiba-PR", "Recife-PE", "Goiania-GO"]
+PALAVRAS = ("documento registro processo sistema declaracao contrato pagamento valor servico prazo "
+            "cliente empresa endereco cidade estado numero conta parcela total data assinatura "
+            "responsavel emissao validade original copia protocolo pedido entrega").split()
+
+FAIXAS = {
+    'tamanho_fonte': (18, 44),
+    'ruido': (0.0, 25.0),       # desvio padrão do ruído gaussiano (níveis de cinza)
+    'desfoque': (0.0, 1.6),     # raio do GaussianBlur (px)
+    'rotacao': (-3.0, 3.0),     # graus
+    'escala': (0.5, 1.25),      # resolução final relativa a 1600x1000
+}
+
+
+def fontes_disponiveis():
+    """Caminhos de FONTES que existem nesta máquina (pode ser vazio: usa a fonte padrão do PIL)."""
+    return [f for f in FONTES if os.path.isfile(f)]
+
+
+def _cpf(rng):
+    d = [rng.randint(0, 9) for _ in range(11)]
+    return f"{d[0]}{d[1]}{d[2]}.{d[3]}{d[4]}{d[5]}.{d[6]}{d[7]}{d[8]}-{d[9]}{d[10]}"
+
+
+def _texto_pagina(rng, numero):
+    nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+    linhas = []
+    if numero == 0:
+        linhas += [
+            "DOCUMENTO DE IDENTIFICACAO",
+            f"Nome: {nome}",
+            f"CPF: {_cpf(rng)}",
+            f"RG: {rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}-{rng.randint(0, 9)}",
+            f"Data de Nascimento: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2005)}",
+            f"Cidade: {rng.choice(CIDADES)}",
+            "",
+        ]
+    for _ in range(rng.randint(4, 9)):
+        linhas.append(' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(4, 8))))
+    return '\n'.join(linhas)
+
+
+def _degradar(img, params, rng_np):
+    """Aplica desfoque, rotação, resolução e ruído; retorna página em cinza (modo L)."""
+    cinza = img.convert('L')
+    if params['desfoque'] > 0.05:
+        cinza = cinza.filter(ImageFilter.GaussianBlur(params['desfoque']))
+    if abs(params['rotacao']) > 0.01:
+        cinza = cinza.rotate(params['rotacao'], resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if params['escala'] != 1.0:
+        largura, altura = cinza.size
+        cinza = cinza.resize((max(1, int(largura * params['escala'])), max(1, int(altura * params['escala']))),
+                             Image.LANCZOS)
+    if params['ruido'] > 0:
+        array = np.asarray(cinza, dtype=np.float32)
+        array = array + rng_np.normal(0, params['ruido'], array.shape)
+        cinza = Image.fromarray(np.clip(array, 0, 255).astype(np.uint8))
+    return cinza
+
+
+def gerar_documento(rng, rng_np, fontes):
+    paginas = rng.choice([1, 1, 1, 2, 3])
+    params = {nome: round(rng.uniform(*faixa), 2) for nome, faixa in FAIXAS.items()}
+    params['tamanho_fonte'] = int(params['tamanho_fonte'])
+    params['fonte'] = rng.choice(fontes) if fontes else None
+    params['paginas'] = paginas
+
+    fonte = carregar_fonte(params['tamanho_fonte'], [params['fonte']] if params['fonte'] else [])
+    textos = [_texto_pagina(rng, numero) for numero in range(paginas)]
+    imagens = [_degradar(desenhar_documento(texto, fonte), params, rng_np) for texto in textos]
+    return params, textos, imagens
+
+
+def gerar_corpus(destino, quantidade=20, semente=42):
+    """Gera o corpus em `destino` e retorna o manifesto (também gravado em manifesto.json)."""
+    os.makedirs(destino, exist_ok=True)
+    rng = random.Random(semente)
+    rng_np = np.random.default_rng(semente)
+    fontes = fontes_disponiveis()
+
+    documentos = []
+    for indice in range(quantidade):
+        params, textos, imagens = gerar_documento(rng, rng_np, fontes)
+        base = f"doc_{indice:03d}"
+        dpi = int(round(300 * params['escala']))
+        if len(imagens) > 1:
+            arquivo = base + ".tif"
+            imagens[0].save(os.path.join(destino, arquivo), save_all=True, append_images=imagens[1:],
+                            compression='tiff_lzw', dpi=(dpi, dpi))
+        else:
+            arquivo = base + ".png"
+            imagens[0].save(os.path.join(destino, arquivo), dpi=(dpi, dpi))
+
+        with open(os.path.join(destino, base + ".gt.txt"), "w", encoding="utf-8") as f:
+            f.write('\f'.join(textos))
+        documentos.append({'arquivo': arquivo, 'parametros': params, 'paginas': textos})
+
+    manifesto = {'semente': semente, 'quantidade': quantidade, 'documentos': documentos}
+    with open(os.path.join(destino, "manifesto.json"), "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    return manifesto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um corpus sintético de documentos com texto verdadeiro")
+    parser.add_argument('destino', nargs='?', default=None, help="Pasta de saída (padrão: <projeto>/corpus_benchmark)")
+    parser.add_argument('--quantidade', type=int, default=20)
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    destino = args.destino
+    if not destino:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        destino = os.path.join(project_root, "corpus_benchmark")
+
+    manifesto = gerar_corpus(destino, args.quantidade, args.semente)
+    paginas = sum(len(doc['paginas']) for doc in manifesto['documentos'])
+    print(f"✅ Corpus gerado em {destino}: {args.quantidade} documento(s), {paginas} página(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,6 +31,10 @@ class GerenciadorBancoDados:
         conn = sqlite3.connect(self.nome_banco)
         cursor = conn.cursor()
         
+        # Um ResultadoOCR (retorno de processar_imagem) já traz a confiança do OCR
+        if not precisao:
+            precisao = getattr(texto_extraido, 'confianca', 0.0)
+        
         # Detectar tipo de documento automaticamente
         tipo_doc = self.detectar_tipo_documento(texto_extraido)
         
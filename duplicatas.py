@@ -0,0 +1,320 @@
+"""
+Detecção de digitalizações quase idênticas (hash perceptual).
+
+É comum a mesma página chegar duas vezes: cópia em JPEG e em PNG, outra
+exposição, a mesma captura reduzida ou com ruído. Antes do OCR calculamos um
+dHash de 256 bits sobre a imagem em cinza reduzida; se uma imagem já
+processada, com a mesma assinatura de processamento (níveis, pré-processamento
+e motor), estiver a até 'distancia_duplicata' bits e passar nas conferências
+abaixo, o resultado dela é reaproveitado e o histórico registra
+"duplicata de <arquivo>".
+
+O dHash de uma página inteira vê o leiaute, não as letras: duas folhas do
+mesmo formulário com nomes diferentes ficam a poucos bits uma da outra. Por
+isso um candidato só é aceito se a miniatura de 128 px de largura também
+bater bloco a bloco (diferenca_local, insensível a brilho e contraste). Um
+novo escaneamento da folha física, deslocado ou girado alguns pixels, não
+passa nessa conferência e vai para o OCR normalmente: reaproveitar o texto
+de outro documento seria muito pior do que repetir uma passada do Tesseract.
+
+A miniatura não enxerga um dígito trocado (páginas que diferem num dígito
+por linha ficam com o mesmo hash e bem abaixo do limite local), então o
+candidato que passar por ela ainda é conferido na resolução de trabalho
+contra o arquivo original, relido do disco: as duas páginas são alinhadas,
+binarizadas e comparadas com tolerância de 1 px (diferenca_pagina). Se o
+original sumiu ou mudou desde o registro, não há como conferir e a imagem
+vai para o OCR. Ainda assim o reaproveitamento vem desligado: texto de outro
+arquivo no lugar do certo é corrupção silenciosa, e só deve ser ligado onde
+cópias repetidas são comuns e o custo de uma delas é conhecido.
+
+O índice fica em SQLite (duplicatas.db, ao lado do cache de OCR), com as
+'dedup_limite' imagens mais recentes; os hashes ficam também em memória e a
+busca é uma varredura por contagem de bits. Só imagens de uma página entram
+no índice (as páginas de TIFF/PDF continuam só com o cache de OCR).
+
+Config: 'deduplicacao' (padrão False), 'distancia_duplicata' (padrão 10 de 256 bits).
+
+API:
+  assinatura_visual(cinza, caminho=None) -> {'hash', 'proporcao', 'miniatura', 'caminho'}
+  distancia(a, b) -> nº de bits diferentes entre dois hashes
+  diferenca_pagina(a, b) -> fração de pixels divergentes na pior janela (0 = mesma página)
+  obter_indice() -> IndiceDuplicatas ou None (desativado em config.json)
+  IndiceDuplicatas(caminho).procurar(visual, assinatura, cinza) -> {'arquivo', 'texto', 'metadados', 'distancia'} ou None
+  IndiceDuplicatas.registrar(visual, assinatura, arquivo, resultado)
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+import cv2
+import numpy as np
+
+try:
+    from cdigo.config import load_config, _appdata_config_path
+except Exception:
+    from config import load_config, _appdata_config_path
+
+from preprocessamento import carregar_cinza
+
+
+LADO_HASH = 16                # grade do dHash: 16x16 = 256 bits
+LARGURA_MINIATURA = 128
+DISTANCIA_PADRAO = 10
+LIMITE_PADRAO = 20000
+# Maior diferença média (em desvios-padrão) aceita num bloco 8x8 da miniatura.
+# Cópias da mesma captura ficam abaixo de 0,15; um campo com outro texto passa de 0,8.
+DIFERENCA_MAXIMA = 0.3
+# Maior fração de pixels divergentes numa janela de ~1/200 da largura (um
+# caractere) entre as páginas binarizadas. Cópias (JPEG, metade da resolução,
+# ruído) ficam abaixo de 0,01; um dígito trocado em texto de 17 px passa de 0,05.
+DIFERENCA_PAGINA_MAXIMA = 0.03
+DESLOCAMENTO_MAXIMO = 8
+TOLERANCIA_PROPORCAO = 0.02
+CANDIDATOS_CONFERIDOS = 5
+
+_indice = None
+_indice_carregado = False
+_lock_indice = threading.Lock()
+
+
+def assinatura_visual(cinza, caminho=None):
+    """
+    dHash (int de 256 bits), proporção largura/altura e miniatura de uma
+    imagem em cinza, mais o `caminho` do arquivo (para a conferência das
+    próximas cópias contra ele).
+    """
+    altura, largura = cinza.shape[:2]
+    altura_miniatura = max(1, int(round(LARGURA_MINIATURA * altura / largura)))
+    miniatura = cv2.resize(cinza, (LARGURA_MINIATURA, altura_miniatura), interpolation=cv2.INTER_AREA)
+    grade = cv2.resize(miniatura, (LADO_HASH + 1, LADO_HASH), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = np.packbits(grade[:, 1:] > grade[:, :-1])
+    return {
+        'hash': int.from_bytes(bits.tobytes(), 'big'),
+        'proporcao': largura / altura,
+        'miniatura': miniatura,
+        'caminho': os.path.abspath(caminho) if caminho else None,
+    }
+
+
+def distancia(a, b):
+    """Distância de Hamming entre dois hashes."""
+    return (a ^ b).bit_count()
+
+
+def _normalizar(miniatura):
+    m = miniatura.astype(np.float32)
+    return (m - m.mean()) / (m.std() + 1e-6)
+
+
+def diferenca_local(a, b):
+    """
+    Maior diferença média num bloco 8x8 entre duas miniaturas, depois de
+    normalizar brilho e contraste de cada uma. Uma diferença concentrada (um
+    nome, um valor) aparece mesmo que o resto da página seja igual.
+    """
+    if a.shape != b.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    diferenca = np.abs(_normalizar(a) - _normalizar(b))
+    return float(cv2.blur(diferenca, (8, 8)).max())
+
+
+def _binarizar(cinza):
+    _, binaria = cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return binaria
+
+
+def diferenca_pagina(a, b):
+    """
+    Maior fração de pixels divergentes numa janela do tamanho de um caractere
+    entre duas páginas em cinza, na largura da menor delas: alinhadas por
+    correlação de fase (até DESLOCAMENTO_MAXIMO px), binarizadas (Otsu) e com
+    1 px de tolerância, para que recompressão e reamostragem não contem.
+    """
+    largura = min(a.shape[1], b.shape[1])
+    if a.shape[1] != largura:
+        a = cv2.resize(a, (largura, max(1, round(a.shape[0] * largura / a.shape[1]))), interpolation=cv2.INTER_AREA)
+    if b.shape != a.shape:
+        b = cv2.resize(b, (a.shape[1], a.shape[0]), interpolation=cv2.INTER_AREA)
+    (dx, dy), _ = cv2.phaseCorrelate(a.astype(np.float32), b.astype(np.float32))
+    if max(abs(dx), abs(dy)) <= DESLOCAMENTO_MAXIMO:
+        b = cv2.warpAffine(b, np.float32([[1, 0, -dx], [0, 1, -dy]]), (a.shape[1], a.shape[0]),
+                           borderMode=cv2.BORDER_REPLICATE)
+    tinta_a, tinta_b = _binarizar(a), _binarizar(b)
+    vizinhanca = np.ones((3, 3), np.uint8)
+    so_a = cv2.bitwise_and(tinta_a, cv2.bitwise_not(cv2.dilate(tinta_b, vizinhanca)))
+    so_b = cv2.bitwise_and(tinta_b, cv2.bitwise_not(cv2.dilate(tinta_a, vizinhanca)))
+    divergentes = cv2.bitwise_or(so_a, so_b).astype(np.float32) / 255
+    janela = max(5, largura // 200)
+    return float(cv2.blur(divergentes, (janela, janela)).max())
+
+
+def _carregar_original(caminho, tamanho, mtime_ns):
+    """Cinza do arquivo registrado, ou None se ele sumiu ou mudou desde o registro."""
+    if not caminho:
+        return None
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    if st.st_size != tamanho or st.st_mtime_ns != mtime_ns:
+        return None
+    return carregar_cinza(caminho)
+
+
+class IndiceDuplicatas:
+    """Índice SQLite de imagens já reconhecidas, com os hashes também em memória."""
+
+    def __init__(self, caminho, distancia_maxima=DISTANCIA_PADRAO, limite=LIMITE_PADRAO):
+        self.caminho = caminho
+        self.distancia_maxima = distancia_maxima
+        self.limite = limite
+        self._lock = threading.Lock()
+        self._hashes = {}       # assinatura de processamento -> [(hash, proporcao, id)]
+        self._ultimo_id = 0
+        self._inseridos = 0
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        # Os processos do pool também consultam e registram: WAL + timeout generoso
+        self._conn = sqlite3.connect(caminho, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS imagens (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    hash TEXT,
+                    proporcao REAL,
+                    assinatura TEXT,
+                    arquivo TEXT,
+                    miniatura BLOB,
+                    texto TEXT,
+                    metadados TEXT,
+                    criado_em REAL
+                )
+            ''')
+            # Índices criados antes da conferência na resolução de trabalho não têm a origem
+            colunas = {linha[1] for linha in self._conn.execute('PRAGMA table_info(imagens)')}
+            for coluna, tipo in (('caminho', 'TEXT'), ('tamanho', 'INTEGER'), ('mtime_ns', 'INTEGER')):
+                if coluna not in colunas:
+                    self._conn.execute(f'ALTER TABLE imagens ADD COLUMN {coluna} {tipo}')
+
+    def _atualizar(self):
+        """Traz para a memória o que foi registrado depois da última leitura (inclusive por outros processos)."""
+        for id_, hash_hex, proporcao, assinatura in self._conn.execute(
+                'SELECT id, hash, proporcao, assinatura FROM imagens WHERE id > ? ORDER BY id', (self._ultimo_id,)):
+            self._hashes.setdefault(assinatura, []).append((int(hash_hex, 16), proporcao, id_))
+            self._ultimo_id = id_
+
+    def procurar(self, visual, assinatura, cinza):
+        """
+        Imagem já processada quase idêntica a `visual`, ou None. `cinza` é a
+        página atual, conferida contra o original do candidato (diferenca_pagina).
+        """
+        with self._lock:
+            self._atualizar()
+            candidatos = []
+            for hash_, proporcao, id_ in self._hashes.get(assinatura, ()):
+                if abs(proporcao - visual['proporcao']) > TOLERANCIA_PROPORCAO * proporcao:
+                    continue
+                bits = distancia(hash_, visual['hash'])
+                if bits <= self.distancia_maxima:
+                    candidatos.append((bits, -id_))
+            linhas = []
+            for bits, id_negativo in sorted(candidatos)[:CANDIDATOS_CONFERIDOS]:
+                linha = self._conn.execute(
+                    'SELECT arquivo, miniatura, texto, metadados, caminho, tamanho, mtime_ns FROM imagens WHERE id = ?',
+                    (-id_negativo,)
+                ).fetchone()
+                if linha is not None:
+                    linhas.append((bits, linha))
+
+        # A conferência relê o original do disco: fora do lock
+        for bits, (arquivo, png, texto, metadados, caminho, tamanho, mtime_ns) in linhas:
+            miniatura = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if miniatura is None or diferenca_local(visual['miniatura'], miniatura) > DIFERENCA_MAXIMA:
+                continue
+            original = _carregar_original(caminho, tamanho, mtime_ns)
+            if original is None or diferenca_pagina(cinza, original) > DIFERENCA_PAGINA_MAXIMA:
+                continue
+            return {'arquivo': arquivo, 'texto': texto, 'metadados': json.loads(metadados or '{}'),
+                    'distancia': bits}
+        return None
+
+    def registrar(self, visual, assinatura, arquivo, resultado):
+        """
+        Guarda o resultado do OCR de `arquivo` para as próximas cópias. Sem o
+        caminho do original (ou com ele inacessível) não há como conferir as
+        cópias depois, então nada é registrado.
+        """
+        try:
+            st = os.stat(visual['caminho']) if visual.get('caminho') else None
+        except OSError:
+            st = None
+        if st is None:
+            return
+        ok, png = cv2.imencode('.png', visual['miniatura'])
+        if not ok:
+            return
+        meta_json = json.dumps(resultado.get('metadados') or {}, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO imagens (hash, proporcao, assinatura, arquivo, miniatura, texto, metadados, criado_em, '
+                'caminho, tamanho, mtime_ns) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (format(visual['hash'], 'x'), visual['proporcao'], assinatura, arquivo, png.tobytes(),
+                 resultado.get('texto'), meta_json, time.time(), visual['caminho'], st.st_size, st.st_mtime_ns)
+            )
+            self._inseridos += 1
+            if self._inseridos % 500 == 0:
+                self._podar()
+
+    def _podar(self):
+        """Mantém só as `limite` imagens mais recentes."""
+        linha = self._conn.execute(
+            'SELECT id FROM imagens ORDER BY id DESC LIMIT 1 OFFSET ?', (self.limite,)
+        ).fetchone()
+        if linha is None:
+            return
+        self._conn.execute('DELETE FROM imagens WHERE id <= ?', (linha[0],))
+        for assinatura, hashes in self._hashes.items():
+            self._hashes[assinatura] = [h for h in hashes if h[2] > linha[0]]
+
+    def tamanho(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM imagens').fetchone()[0]
+
+    def limpar(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM imagens')
+            self._hashes.clear()
+
+
+def obter_indice():
+    """
+    Índice do processo atual, configurado pelo config.json:
+      'deduplicacao' (bool, padrão False), 'distancia_duplicata', 'dedup_limite'.
+    Retorna None se a deduplicação estiver desligada ou o índice não puder ser aberto.
+    """
+    global _indice, _indice_carregado
+    if _indice_carregado:
+        return _indice
+    # As threads de decodificação do pipeline chegam aqui juntas: uma abre, as outras esperam
+    with _lock_indice:
+        if not _indice_carregado:
+            _indice = _abrir_indice()
+            _indice_carregado = True
+    return _indice
+
+
+def _abrir_indice():
+    cfg = load_config() or {}
+    if not cfg.get('deduplicacao', False):
+        return None
+
+    caminho = os.path.join(os.path.dirname(_appdata_config_path()), 'duplicatas.db')
+    try:
+        return IndiceDuplicatas(caminho, int(cfg.get('distancia_duplicata', DISTANCIA_PADRAO)),
+                                int(cfg.get('dedup_limite', LIMITE_PADRAO)))
+    except Exception as e:
+        print(f"⚠️ Deduplicação indisponível: {e}")
+        return None
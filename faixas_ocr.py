@@ -0,0 +1,268 @@
+"""
+OCR em faixas para varreduras de formato muito grande.
+
+Uma planta A0 ou um rolo de alimentação contínua passava minutos numa única
+chamada do Tesseract, num único núcleo (e podia estourar o
+'tempo_limite_imagem'). Acima de 'ocr_em_faixas_megapixels' a imagem já
+pré-processada é dividida em faixas horizontais de cerca de 'altura_faixa'
+px, reconhecidas em paralelo no pool de processos (cada faixa é uma tarefa
+do agendador, com o próprio tempo limite).
+
+Cada corte é procurado perto da posição ideal (um quarto da altura da faixa
+para cada lado) no perfil de tinta das linhas: vale a maior sequência de
+linhas sem tinta, e a faixa termina no meio dela. Sem nenhum vão ali
+(desenhos, texto corrido sem entrelinha), o corte vai para a linha com menos
+tinta e as duas faixas se sobrepõem 'sobreposicao_faixa' px; o OCR de cada
+uma devolve as palavras com as caixas e cada linha de texto fica só com a
+faixa em que cai o centro dela, então nada sai duplicado nem cortado ao meio.
+Faixas sem tinta nenhuma não vão para o OCR.
+
+O texto é remontado de cima para baixo, faixa a faixa, com as linhas e os
+parágrafos que o Tesseract encontrou em cada uma (ocr_backends.texto_de_palavras);
+cada faixa começa um parágrafo novo. Em páginas de várias colunas a ordem de
+leitura vale dentro da faixa: as colunas se alternam de uma faixa para a outra.
+
+O ganho de tempo é limitado pelo número de faixas e de workers: com N
+núcleos e pelo menos N faixas, o tempo de parede cai perto de N vezes.
+Dentro de um worker do pool (lote de várias imagens) as faixas rodam em
+sequência: ali o paralelismo já vem das outras imagens.
+
+Config: 'ocr_em_faixas_megapixels' (padrão 20; 0 desliga), 'altura_faixa'
+(padrão 1500) e 'sobreposicao_faixa' (padrão 120). Com o texto normalizado
+para ~22 px (preprocessamento.normalizar_resolucao), 1500 px são ~35 linhas
+e 120 px cobrem duas linhas e meia.
+
+API:
+  parametros() -> {'megapixels', 'altura', 'sobreposicao'} (None se desligado)
+  assinatura() -> str ('' com os parâmetros padrão; entra na chave do cache)
+  planejar_faixas(imagem) -> [(topo, base, de, ate), ...] ou [] se a imagem não precisar de faixas
+  reconhecer_faixa(recorte, topo, de, ate) -> dict (roda no worker)
+  juntar_faixas(resultados) -> dict no formato de niveis_ocr.reconhecer_adaptativo, com 'faixas'
+  submeter_faixas(executor, imagem, faixas, prioridade) -> Future com o resultado de juntar_faixas
+  reconhecer_em_faixas(imagem, faixas) -> dict de juntar_faixas
+"""
+import math
+import threading
+import multiprocessing
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from ocr_backends import obter_backend, texto_de_palavras
+from niveis_ocr import reconhecer_adaptativo, parametros as parametros_niveis
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+MEGAPIXELS_FAIXAS = 20.0
+ALTURA_FAIXA = 1500
+SOBREPOSICAO_FAIXA = 120
+# Vão mínimo (linhas sem tinta) para cortar sem sobreposição
+_VAO_MINIMO = 3
+# O limiar de tinta (Otsu) sai de uma cópia reduzida com este lado máximo
+_LADO_LIMIAR = 2000
+
+_parametros = None
+_parametros_carregados = False
+
+
+def parametros():
+    """Limiar e tamanhos do config.json; None se o OCR em faixas estiver desligado."""
+    global _parametros, _parametros_carregados
+    if not _parametros_carregados:
+        _parametros = _ler_parametros()
+        _parametros_carregados = True
+    return _parametros
+
+
+def _ler_parametros():
+    cfg = load_config() or {}
+    try:
+        p = {
+            'megapixels': float(cfg.get('ocr_em_faixas_megapixels', MEGAPIXELS_FAIXAS)),
+            'altura': int(cfg.get('altura_faixa', ALTURA_FAIXA)),
+            'sobreposicao': int(cfg.get('sobreposicao_faixa', SOBREPOSICAO_FAIXA)),
+        }
+    except (TypeError, ValueError):
+        print("⚠️ Parâmetros do OCR em faixas inválidos; usando os padrões")
+        p = {'megapixels': MEGAPIXELS_FAIXAS, 'altura': ALTURA_FAIXA, 'sobreposicao': SOBREPOSICAO_FAIXA}
+    if p['megapixels'] <= 0:
+        return None
+    p['altura'] = max(200, p['altura'])
+    p['sobreposicao'] = max(0, p['sobreposicao'])
+    return p
+
+
+def assinatura():
+    # Os parâmetros padrão não entram: imagens pequenas continuam com a chave de antes
+    p = parametros()
+    if p is None:
+        return "-semfaixas"
+    if (p['megapixels'], p['altura'], p['sobreposicao']) == (MEGAPIXELS_FAIXAS, ALTURA_FAIXA, SOBREPOSICAO_FAIXA):
+        return ""
+    return f"-faixas{p['megapixels']:g}mp-{p['altura']}+{p['sobreposicao']}"
+
+
+def _tinta_por_linha(imagem):
+    altura, largura = imagem.shape[:2]
+    reducao = min(1.0, _LADO_LIMIAR / max(altura, largura))
+    amostra = cv2.resize(imagem, (max(1, int(largura * reducao)), max(1, int(altura * reducao))),
+                         interpolation=cv2.INTER_AREA)
+    limiar, _ = cv2.threshold(amostra, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return np.count_nonzero(imagem < limiar, axis=1)
+
+
+def _maior_vao(vazias):
+    """(início, comprimento) da maior sequência de True em `vazias`."""
+    bordas = np.diff(np.concatenate(([0], vazias.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordas == 1)
+    fins = np.flatnonzero(bordas == -1)
+    if not len(inicios):
+        return 0, 0
+    maior = int(np.argmax(fins - inicios))
+    return int(inicios[maior]), int(fins[maior] - inicios[maior])
+
+
+def planejar_faixas(imagem):
+    """
+    Faixas (topo, base, de, ate) em que `imagem` deve ser reconhecida:
+    [topo, base) é o recorte mandado ao OCR e [de, ate) as linhas que ficam
+    com ele (iguais ao recorte quando o corte caiu num vão). Retorna [] para
+    imagens abaixo do limiar ou que caberiam numa faixa só.
+    """
+    p = parametros()
+    if p is None or imagem.shape[0] * imagem.shape[1] / 1e6 < p['megapixels']:
+        return []
+    altura = imagem.shape[0]
+    partes = math.ceil(altura / p['altura'])
+    if partes < 2:
+        return []
+
+    tinta = _tinta_por_linha(imagem)
+    tolerancia = max(1, imagem.shape[1] // 1000)
+    janela = p['altura'] // 4
+    cortes = []
+    anterior = 0
+    for k in range(1, partes):
+        ideal = k * altura // partes
+        a, b = max(anterior + janela, ideal - janela), min(altura - janela, ideal + janela)
+        if b <= a:
+            continue
+        inicio, comprimento = _maior_vao(tinta[a:b] <= tolerancia)
+        if comprimento >= _VAO_MINIMO:
+            cortes.append((a + inicio + comprimento // 2, 0))
+        else:
+            cortes.append((a + int(np.argmin(tinta[a:b])), p['sobreposicao']))
+        anterior = cortes[-1][0]
+
+    faixas = []
+    de, margem_topo = 0, 0
+    for ate, margem_base in cortes + [(altura, 0)]:
+        # Faixa sem tinta: nada a reconhecer
+        if np.count_nonzero(tinta[de:ate] > tolerancia) >= 2:
+            faixas.append((max(0, de - margem_topo), min(altura, ate + margem_base), de, ate))
+        de, margem_topo = ate, margem_base
+    return faixas if len(faixas) > 1 else []
+
+
+def reconhecer_faixa(recorte, topo, de, ate):
+    """
+    OCR adaptativo de uma faixa (roda no worker). Devolve só as palavras das
+    linhas cujo centro cai em [de, ate), com `y` já nas coordenadas da imagem
+    inteira, mais nível, config e tempos do reconhecimento.
+    """
+    backend = obter_backend()
+    ocr = reconhecer_adaptativo(backend, recorte, palavras=True)
+    linhas = {}
+    for palavra in ocr['palavras']:
+        linhas.setdefault((palavra['bloco'], palavra['paragrafo'], palavra['linha']), []).append(palavra)
+
+    palavras = []
+    for linha in linhas.values():
+        centro = topo + (min(p['y'] for p in linha) + max(p['y'] + p['altura'] for p in linha)) / 2
+        if de <= centro < ate:
+            palavras.extend(dict(p, y=p['y'] + topo) for p in linha)
+    return {
+        'palavras': palavras,
+        'nivel': ocr['nivel'],
+        'config': ocr['config'],
+        'tempo_niveis': ocr['tempo_niveis'],
+        'backend': backend.nome,
+    }
+
+
+def juntar_faixas(resultados):
+    """
+    Junta os resultados de reconhecer_faixa (de cima para baixo) num dict no
+    formato de reconhecer_adaptativo. 'nivel' é o mais caro que alguma faixa
+    precisou e 'tempo_niveis' soma o tempo de todas (CPU, não parede).
+    """
+    palavras = []
+    for indice, resultado in enumerate(resultados):
+        # Blocos de faixas diferentes nunca se misturam na remontagem
+        palavras.extend(dict(p, bloco=(indice, p['bloco'])) for p in resultado['palavras'])
+    confiancas = [p['confianca'] for p in palavras]
+
+    ordem = [nivel['nome'] for nivel in parametros_niveis()[0]]
+    mais_caro = max(resultados, key=lambda r: ordem.index(r['nivel']) if r['nivel'] in ordem else -1)
+    tempos = {}
+    for resultado in resultados:
+        for nome, tempo in resultado['tempo_niveis'].items():
+            tempos[nome] = round(tempos.get(nome, 0.0) + tempo, 4)
+    return {
+        'texto': texto_de_palavras(palavras).strip(),
+        'confiancas': confiancas,
+        'confianca': sum(confiancas) / len(confiancas) if confiancas else 0.0,
+        'nivel': mais_caro['nivel'],
+        'config': mais_caro['config'],
+        'tempo_niveis': tempos,
+        'backend': mais_caro['backend'],
+        'faixas': len(resultados),
+    }
+
+
+def submeter_faixas(executor, imagem, faixas, prioridade):
+    """
+    Manda cada faixa ao `executor` (agendador ou execução local) como uma
+    tarefa e retorna um Future que recebe juntar_faixas quando todas
+    terminarem (ou a exceção da primeira que falhou).
+    """
+    if not faixas:
+        raise ValueError("nenhuma faixa para reconhecer")
+    combinado = Future()
+    futuros = [executor.submit(reconhecer_faixa, imagem[topo:base], topo, de, ate, prioridade=prioridade)
+               for topo, base, de, ate in faixas]
+    restantes = [len(futuros)]
+    lock = threading.Lock()
+
+    def terminou(_):
+        with lock:
+            restantes[0] -= 1
+            if restantes[0]:
+                return
+        try:
+            combinado.set_result(juntar_faixas([futuro.result() for futuro in futuros]))
+        except Exception as e:
+            combinado.set_exception(e)
+
+    for futuro in futuros:
+        futuro.add_done_callback(terminou)
+    return combinado
+
+
+def reconhecer_em_faixas(imagem, faixas):
+    """OCR de `imagem` nas `faixas` de planejar_faixas: no pool, se houver mais de um worker."""
+    # Import tardio: processamento_lote importa ocr_funcoes, que importa este módulo
+    from processamento_lote import numero_workers, obter_agendador
+    from agendador_ocr import PRIORIDADE_INTERATIVA
+
+    workers = numero_workers()
+    # Num worker do pool não dá para usar o próprio pool: faixas em sequência
+    if workers <= 1 or multiprocessing.parent_process() is not None:
+        return juntar_faixas([reconhecer_faixa(imagem[topo:base], topo, de, ate) for topo, base, de, ate in faixas])
+    # Uma imagem pedida sozinha: passa na frente de lotes em andamento
+    return submeter_faixas(obter_agendador(workers), imagem, faixas, PRIORIDADE_INTERATIVA).result()
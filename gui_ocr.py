@@ -4,7 +4,10 @@ import os
 import threading
 import sys
 from datetime import datetime
-from ocr_funcoes import processar_imagem, criar_imagem_teste, listar_imagens
+from ocr_funcoes import processar_imagem, criar_imagem_teste, listar_imagens, confianca_de, observacao_historico
+from trabalhos import JornalTrabalhos, preparar_trabalho, executar_trabalho
+from manifesto import ManifestoOCR
+from pagina_branca import eh_branca
 
 try:
     from cdigo.config import load_config, save_config
@@ -501,8 +504,12 @@ class OCRguiModerna:
                     caminho_salvar = os.path.join(self.resultados_dir, nome_salvar)
                     with open(caminho_salvar, "w", encoding="utf-8") as f:
                         f.write(resultado)
-                    self.gerenciador.adicionar_documento(imagem, "genérico")
+                    self.gerenciador.adicionar_documento(imagem, "genérico", confianca_de(resultado),
+                                                         observacao_historico(resultado))
                     self.texto_resultado.insert("end", f"✅ OK\n\n")
+                elif eh_branca(resultado):
+                    self.gerenciador.adicionar_documento(imagem, "genérico", 0, observacao_historico(resultado))
+                    self.texto_resultado.insert("end", f"📄 Página em branco\n\n")
                 else:
                     self.texto_resultado.insert("end", f"❌ FALHA\n\n")
             self.mostrar_historico()
@@ -525,20 +532,24 @@ class OCRguiModerna:
             if not imagens:
                 messagebox.showwarning("Aviso", "Nenhuma imagem encontrada!")
                 return
+            manifesto = ManifestoOCR(self.imagens_dir)
+            imagens = manifesto.pendentes(imagens, self.resultados_dir)
             self.texto_resultado.delete("1.0", "end")
-            for img in imagens:
-                self.texto_resultado.insert("end", f"🔄 {img}...\n")
-                self.root.update()
-                resultado = processar_imagem(img, self.imagens_dir)
-                if resultado:
-                    nome_salvar = img.split('.')[0] + "_texto.txt"
-                    caminho_salvar = os.path.join(self.resultados_dir, nome_salvar)
-                    with open(caminho_salvar, "w", encoding="utf-8") as f:
-                        f.write(resultado)
-                    self.gerenciador.adicionar_documento(img, "genérico")
-                    self.texto_resultado.insert("end", f"✅ OK\n")
-                else:
-                    self.texto_resultado.insert("end", f"❌ FALHA\n")
+            # Mesmo caminho do painel: diário de trabalhos (retomável) e histórico via executar_trabalho
+            jornal = JornalTrabalhos()
+            try:
+                if imagens or jornal.inacabado(self.imagens_dir) is not None:
+                    trabalho_id = preparar_trabalho(jornal, imagens, self.imagens_dir, self.resultados_dir)
+                    for resultado in executar_trabalho(jornal, trabalho_id, self.gerenciador, manifesto=manifesto):
+                        img = resultado['arquivo']
+                        if resultado['texto'] or eh_branca(resultado):
+                            self.texto_resultado.insert("end", f"✅ {img}\n")
+                        else:
+                            self.texto_resultado.insert("end", f"❌ {img}: {resultado['erro']}\n")
+                        self.root.update()
+            finally:
+                jornal.fechar()
+                manifesto.fechar()
             self.mostrar_historico()
             messagebox.showinfo("Sucesso", "⚡ Processamento concluído!")
         except Exception as e:
@@ -642,13 +653,14 @@ class OCRguiModerna:
             return
         
         # Cabeçalho
-        header = f"{'ID':<5} {'Arquivo':<30} {'Tipo':<15} {'Data':<20}\n"
-        header += "-" * 70 + "\n"
+        header = f"{'ID':<5} {'Arquivo':<30} {'Tipo':<15} {'Data':<20} Observação\n"
+        header += "-" * 90 + "\n"
         self.texto_historico.insert("end", header)
         
         for doc in documentos:
             if len(doc) >= 4:
-                line = f"{doc[0]:<5} {doc[1]:<30} {doc[2]:<15} {doc[3]:<20}\n"
+                observacao = doc[5] if len(doc) > 5 else ""
+                line = f"{doc[0]:<5} {doc[1]:<30} {doc[2]:<15} {doc[3]:<20} {observacao}\n"
                 self.texto_historico.insert("end", line)
     
     def filtrar_historico(self):
@@ -670,17 +682,20 @@ class OCRguiModerna:
             self.texto_historico.insert("end", f"❌ Nenhum documento do tipo '{tipo}'\n")
             return
         
-        header = f"{'ID':<5} {'Arquivo':<30} {'Tipo':<15} {'Data':<20}\n"
-        header += "-" * 70 + "\n"
+        header = f"{'ID':<5} {'Arquivo':<30} {'Tipo':<15} {'Data':<20} Observação\n"
+        header += "-" * 90 + "\n"
         self.texto_historico.insert("end", header)
         
         for doc in documentos:
             if len(doc) >= 4:
-                line = f"{doc[0]:<5} {doc[1]:<30} {doc[2]:<15} {doc[3]:<20}\n"
+                observacao = doc[5] if len(doc) > 5 else ""
+                line = f"{doc[0]:<5} {doc[1]:<30} {doc[2]:<15} {doc[3]:<20} {observacao}\n"
                 self.texto_historico.insert("end", line)
 
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     root = ctk.CTk()
     app = OCRguiModerna(root)
     root.mainloop()
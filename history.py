@@ -4,14 +4,20 @@ Fornece: GerenciadorDocumentos, exportar_para_csv, gerar_relatorio_estatisticas,
 """
 import os
 import csv
+import threading
 from datetime import datetime
 
 
+CABECALHO = ['ID', 'Arquivo', 'Tipo', 'Data Processamento', 'Precisão', 'Observação']
+
+
 class GerenciadorDocumentos:
     """Gerencia o histórico de documentos processados"""
     def __init__(self, resultados_dir):
         self.resultados_dir = resultados_dir
         self.arquivo_historico = os.path.join(resultados_dir, "historico_documentos.csv")
+        # O painel pode gravar de duas threads ao mesmo tempo (selecionadas e lote)
+        self._lock = threading.Lock()
         self._criar_arquivo_historico()
 
     def _criar_arquivo_historico(self):
@@ -19,18 +25,51 @@ class GerenciadorDocumentos:
             os.makedirs(os.path.dirname(self.arquivo_historico), exist_ok=True)
             with open(self.arquivo_historico, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(['ID', 'Arquivo', 'Tipo', 'Data Processamento', 'Precisão'])
+                writer.writerow(CABECALHO)
+        else:
+            self._atualizar_cabecalho()
+
+    def _atualizar_cabecalho(self):
+        """Históricos antigos não têm a coluna Observação: só o cabeçalho é reescrito."""
+        try:
+            with open(self.arquivo_historico, 'r', newline='', encoding='utf-8') as f:
+                cabecalho = next(csv.reader(f), None)
+                if not cabecalho or cabecalho == CABECALHO or cabecalho != CABECALHO[:len(cabecalho)]:
+                    return
+                resto = f.read()
+            with open(self.arquivo_historico, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(CABECALHO)
+                f.write(resto)
+        except Exception as e:
+            print(f"⚠️ Não foi possível atualizar o cabeçalho do histórico: {e}")
 
-    def adicionar_documento(self, nome_arquivo, tipo_documento="genérico", precisao=0):
+    def adicionar_documento(self, nome_arquivo, tipo_documento="genérico", precisao=0, observacao=""):
+        """`observacao`: ex. "duplicata de X" quando o texto foi reaproveitado de outra imagem."""
         try:
-            with open(self.arquivo_historico, 'a', newline='', encoding='utf-8') as f:
+            with self._lock, open(self.arquivo_historico, 'a', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
                 doc_id = len(self.buscar_documentos()) + 1
                 data = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-                writer.writerow([doc_id, nome_arquivo, tipo_documento, data, precisao])
+                writer.writerow([doc_id, nome_arquivo, tipo_documento, data, precisao, observacao])
         except Exception as e:
             print(f"❌ Erro ao salvar histórico: {e}")
 
+    def registrados_desde(self, momentos):
+        """
+        Arquivos de `momentos` ({nome: timestamp}) que têm linha no histórico
+        gravada naquele instante ou depois (a coluna de data tem resolução de segundos).
+        """
+        encontrados = set()
+        for row in self.buscar_documentos():
+            if len(row) > 3 and row[1] in momentos:
+                try:
+                    data = datetime.strptime(row[3], "%d/%m/%Y %H:%M:%S")
+                except ValueError:
+                    continue
+                if data.timestamp() >= int(momentos[row[1]]):
+                    encontrados.add(row[1])
+        return encontrados
+
     def buscar_documentos(self, tipo=None):
         documentos = []
         try:
@@ -68,7 +107,7 @@ def exportar_para_csv(gerenciador, dest_dir: str = None):
     try:
         with open(arquivo_export, 'w', newline='', encoding='utf-8') as arquivo:
             writer = csv.writer(arquivo)
-            writer.writerow(['ID', 'Arquivo', 'Tipo', 'Data Processamento', 'Precisão'])
+            writer.writerow(CABECALHO)
             for doc in documentos:
                 writer.writerow(doc)
         print(f"✅ Dados exportados para: {arquivo_export}")
@@ -139,7 +178,8 @@ def menu_avancado(gerenciador):
                 print(f"\nDocumentos do tipo '{tipo}':")
                 for doc in documentos:
                     if len(doc) > 3:
-                        print(f"   - {doc[1]} (Processado em: {doc[3]})")
+                        observacao = f" - {doc[5]}" if len(doc) > 5 and doc[5] else ""
+                        print(f"   - {doc[1]} (Processado em: {doc[3]}){observacao}")
             else:
                 print(f"Nenhum documento do tipo '{tipo}' encontrado.")
             input("\nPressione Enter para continuar...")
@@ -0,0 +1,210 @@
+"""
+Leitura única dos arquivos de imagem.
+
+Uma imagem chegava a ser lida várias vezes: os.path.exists/getsize, o hash
+do cache de OCR (o arquivo inteiro), o cabeçalho (PIL), o cv2.imread e, se o
+cv2 falhasse, o PIL com verify() e uma segunda abertura. Em compartilhamentos
+de rede cada uma dessas leituras custa caro.
+
+abrir_imagem() abre o arquivo uma vez (o tamanho vem do fstat do próprio
+descritor) e lê o conteúdo uma vez, quando alguém precisa dele, num buffer
+usado por todos: hash do cache, cabeçalho, validação e decodificação
+(cv2.imdecode, inclusive nos modos reduzidos). Varreduras grandes sem
+compressão (BMP, TIFF 'raw') a partir de 'leitura_mmap_mb' MB são mapeadas
+em memória (mmap) em vez de copiadas: as páginas vêm do disco conforme a
+decodificação pede e ficam no cache do sistema, fora da memória do processo.
+
+Bytes lidos e tempo de leitura de cada imagem vão para os metadados do
+resultado ('bytes_lidos', 'tempo_leitura' e 'leitura_mmap' quando mapeada).
+No mmap o tempo é só o do mapeamento: a leitura de fato acontece nas faltas
+de página, durante o hash e a decodificação.
+
+TIFFs com várias páginas e PDFs continuam sendo lidos página a página por
+paginas.py; daqui só sai a decisão de que são paginados.
+
+Config: 'leitura_mmap_mb' (padrão 32; 0 desliga o mmap).
+
+API:
+  abrir_imagem(caminho) -> ArquivoImagem (FileNotFoundError se não existir, ValueError se vazio)
+  ArquivoImagem.dados -> conteúdo (bytes ou mmap), lido na primeira vez
+  ArquivoImagem.cabecalho() -> {'formato', 'largura', 'altura', 'paginas', 'sem_compressao'} ou None
+  ArquivoImagem.paginado() -> bool (PDF ou TIFF com mais de uma página)
+  ArquivoImagem.hash() -> SHA-256 do conteúdo (o mesmo de cache_ocr.hash_arquivo)
+  ArquivoImagem.versao() -> (tamanho, mtime_ns, hash) do que foi lido (para o manifesto)
+  ArquivoImagem.decodificar(flags) -> ndarray ou None
+  ArquivoImagem.pil() -> PIL.Image sobre o buffer
+  ArquivoImagem.estatisticas() -> {'bytes_lidos', 'tempo_leitura'[, 'leitura_mmap']}
+"""
+import io
+import os
+import hashlib
+import mmap
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from cache_ocr import hash_dados
+from paginas import EXTENSOES_PDF, EXTENSOES_TIFF
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+LIMITE_MMAP_MB = 32
+_FORMATOS_MMAP = ('BMP', 'TIFF')
+
+_limite_mmap = None
+
+
+def limite_mmap():
+    """Tamanho (bytes) a partir do qual BMP/TIFF sem compressão são mapeados; 0 = nunca."""
+    global _limite_mmap
+    if _limite_mmap is None:
+        try:
+            mb = float((load_config() or {}).get('leitura_mmap_mb', LIMITE_MMAP_MB))
+        except (TypeError, ValueError):
+            mb = LIMITE_MMAP_MB
+        _limite_mmap = int(mb * 1024 * 1024)
+    return _limite_mmap
+
+
+class ArquivoImagem:
+    """Um arquivo de imagem aberto uma única vez, com o conteúdo lido (ou mapeado) sob demanda."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, 'rb')
+        self.st = os.fstat(self._arquivo.fileno())
+        self.tamanho = self.st.st_size
+        if self.tamanho == 0:
+            self._arquivo.close()
+            raise ValueError(f"arquivo vazio: {os.path.basename(caminho)}")
+        self._dados = None
+        self._mmap = None
+        self._cabecalho = False
+        self._bytes = 0
+        self._tempo = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def cabecalho(self):
+        """Formato, dimensões e nº de páginas lidos só do cabeçalho (None se o PIL não reconhecer)."""
+        if self._cabecalho is False:
+            self._cabecalho = None
+            try:
+                if self._dados is None:
+                    self._arquivo.seek(0)
+                    fonte = self._arquivo
+                else:
+                    fonte = self._fonte_pil()
+                with Image.open(fonte) as img:
+                    compressao = img.info.get('compression')
+                    self._cabecalho = {
+                        'formato': img.format,
+                        'largura': img.size[0],
+                        'altura': img.size[1],
+                        'paginas': getattr(img, 'n_frames', 1),
+                        # BMP: 0 (BI_RGB); TIFF: 'raw'
+                        'sem_compressao': compressao in (0, 'raw'),
+                    }
+            except Exception:
+                pass
+        return self._cabecalho
+
+    def paginado(self):
+        """Mesma regra de paginas.eh_documento_paginado, sem abrir o arquivo de novo."""
+        nome = self.caminho.lower()
+        if nome.endswith(EXTENSOES_PDF):
+            return True
+        if nome.endswith(EXTENSOES_TIFF):
+            cabecalho = self.cabecalho()
+            return bool(cabecalho and cabecalho['paginas'] > 1)
+        return False
+
+    def _usar_mmap(self):
+        limite = limite_mmap()
+        if not limite or self.tamanho < limite:
+            return False
+        cabecalho = self.cabecalho()
+        return bool(cabecalho and cabecalho['formato'] in _FORMATOS_MMAP and cabecalho['sem_compressao'])
+
+    @property
+    def dados(self):
+        if self._dados is None:
+            usar_mmap = self._usar_mmap()
+            inicio = time.perf_counter()
+            if usar_mmap:
+                self._mmap = mmap.mmap(self._arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(self._mmap, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+                self._dados = self._mmap
+            else:
+                self._arquivo.seek(0)
+                self._dados = self._arquivo.read()
+            self._tempo += time.perf_counter() - inicio
+            self._bytes += self.tamanho
+        return self._dados
+
+    def hash(self):
+        """SHA-256 do conteúdo, memorizado em cache_ocr (hash_arquivo depois não relê o arquivo)."""
+        return hash_dados(self.caminho, self.st, self.dados)
+
+    def versao(self):
+        """
+        (tamanho, mtime_ns, hash) do conteúdo lido por este objeto: o stat é do
+        próprio arquivo aberto, então não muda se o arquivo for trocado depois.
+        Sem o conteúdo já carregado (TIFF/PDF, lidos por página), o hash sai
+        em blocos do mesmo descritor, sem trazer o arquivo todo para a memória.
+        """
+        if self._dados is not None:
+            return self.st.st_size, self.st.st_mtime_ns, self.hash()
+        h = hashlib.sha256()
+        self._arquivo.seek(0)
+        for parte in iter(lambda: self._arquivo.read(1 << 20), b''):
+            h.update(parte)
+        self._arquivo.seek(0)
+        return self.st.st_size, self.st.st_mtime_ns, h.hexdigest()
+
+    def decodificar(self, flags=cv2.IMREAD_GRAYSCALE):
+        """cv2.imdecode sobre o buffer; None se o cv2 não reconhecer o formato."""
+        return cv2.imdecode(np.frombuffer(self.dados, np.uint8), flags)
+
+    def _fonte_pil(self):
+        if self._mmap is not None:
+            self._mmap.seek(0)
+            return self._mmap
+        return io.BytesIO(self._dados)
+
+    def pil(self):
+        """Imagem PIL lendo do mesmo buffer (sem nova leitura do disco)."""
+        self.dados
+        return Image.open(self._fonte_pil())
+
+    def estatisticas(self):
+        estatisticas = {'bytes_lidos': self._bytes, 'tempo_leitura': round(self._tempo, 4)}
+        if self._mmap is not None:
+            estatisticas['leitura_mmap'] = True
+        return estatisticas
+
+    def fechar(self):
+        self._dados = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Ainda há um array apontando para o mapeamento; ele fecha quando for coletado
+                pass
+        self._arquivo.close()
+
+
+def abrir_imagem(caminho):
+    """Abre `caminho` para leitura única (ver ArquivoImagem)."""
+    return ArquivoImagem(caminho)
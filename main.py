@@ -1,7 +1,17 @@
 # main.py - Arquivo principal do sistema OCR
 import pytesseract
-from ocr_funcoes import processar_imagem, criar_imagem_teste, listar_imagens
+from ocr_funcoes import processar_imagem, criar_imagem_teste, listar_imagens, confianca_de, observacao_historico
+from processamento_lote import numero_workers
+from cache_ocr import obter_cache, resumo_desde
+from niveis_ocr import ResumoNiveis
+from modelos_documento import carregar_modelos, extrair_campos
+from monitor_pasta import MonitorPasta
+from manifesto import ManifestoOCR
+from pagina_branca import eh_branca
+from trabalhos import (JornalTrabalhos, preparar_trabalho, executar_trabalho, interrupcao_suave,
+                       rodar_no_terminal, descrever)
 import os
+import threading
 import csv
 from datetime import datetime
 
@@ -88,7 +98,8 @@ def menu_avancado(gerenciador):
                 print(f"\n📄 Documentos do tipo '{tipo}':")
                 for doc in documentos:
                     if len(doc) > 3:
-                        print(f"   - {doc[1]} (Processado em: {doc[3]})")
+                        observacao = f" - {doc[5]}" if len(doc) > 5 and doc[5] else ""
+                        print(f"   - {doc[1]} (Processado em: {doc[3]}){observacao}")
             else:
                 print(f"❌ Nenhum documento do tipo '{tipo}' encontrado.")
             input("\nPressione Enter para continuar...")
@@ -121,7 +132,7 @@ def exportar_para_csv(gerenciador):
     try:
         with open(arquivo_export, 'w', newline='', encoding='utf-8') as arquivo:
             writer = csv.writer(arquivo)
-            writer.writerow(['ID', 'Arquivo', 'Tipo', 'Data Processamento', 'Precisão'])
+            writer.writerow(['ID', 'Arquivo', 'Tipo', 'Data Processamento', 'Precisão', 'Observação'])
             for doc in documentos:
                 writer.writerow(doc)
         print(f"✅ Dados exportados para: {arquivo_export}")
@@ -140,6 +151,9 @@ def menu_principal():
     print("2 - Processar todas as imagens da pasta")
     print("3 - Criar imagem de teste")
     print("4 - Listar imagens disponíveis")
+    print("7 - Extrair campos por modelo de documento")
+    print("8 - Monitorar pasta (processa o que chegar)")
+    print("9 - Retomar trabalho interrompido")
     print("6 - Menu avançado")
     print("5 - Sair")
     print("=" * 50)
@@ -173,6 +187,8 @@ def main():
                 print("=" * 40)
                 print(resultado)
                 print("=" * 40)
+                print(f"🎯 Confiança: {resultado.confianca:.1f}% (mínima {resultado.confianca_min:.1f}%, "
+                      f"{resultado.palavras} palavras, {resultado.tempo:.2f}s)")
                 
                 # Salvar resultado
                 nome_salvar = nome_imagem.split('.')[0] + "_texto.txt"
@@ -184,33 +200,63 @@ def main():
                 
                 # Registrar no histórico
                 tipo = input("Digite o tipo de documento (ou Enter para pular): ") or "genérico"
-                gerenciador.adicionar_documento(nome_imagem, tipo)
+                gerenciador.adicionar_documento(nome_imagem, tipo, confianca_de(resultado),
+                                                observacao_historico(resultado))
+            elif eh_branca(resultado):
+                print(f"📄 Página em branco: OCR dispensado ({resultado.tempo:.2f}s)")
+                gerenciador.adicionar_documento(nome_imagem, "genérico", 0, observacao_historico(resultado))
             else:
                 print("❌ Nenhum texto foi extraído. Verifique se a imagem existe e é válida.")
         
         elif opcao == "2":
-            # Processar todas as imagens
-            imagens = listar_imagens(imagens_dir)
-            if imagens:
-                tipo = input("Digite o tipo de documento (ou Enter para 'genérico'): ") or "genérico"
-                for imagem in imagens:
-                    print(f"\n🔄 Processando: {imagem}")
-                    resultado = processar_imagem(imagem, imagens_dir)
-                    if resultado:
-                        print(f"✅ Concluído: {imagem}")
-                        
-                        # Salvar resultado
-                        nome_salvar = imagem.split('.')[0] + "_texto.txt"
-                        caminho_salvar = os.path.join(resultados_dir, nome_salvar)
-                        
-                        with open(caminho_salvar, "w", encoding="utf-8") as arquivo:
-                            arquivo.write(resultado)
-                        print(f"📁 Resultado salvo em: {caminho_salvar}")
-                        
-                        # Registrar no histórico
-                        gerenciador.adicionar_documento(imagem, tipo)
-            else:
+            # Processar todas as imagens (só as novas ou alteradas desde a última vez) como um trabalho retomável
+            manifesto = ManifestoOCR(imagens_dir)
+            jornal = JornalTrabalhos()
+            todas = listar_imagens(imagens_dir)
+            imagens = manifesto.pendentes(todas, resultados_dir)
+            if len(todas) > len(imagens):
+                print(f"⏭️  {len(todas) - len(imagens)} imagem(ns) sem alteração desde o último processamento")
+            trabalho_id = jornal.inacabado(imagens_dir)
+            if trabalho_id:
+                print(f"▶️  Retomando o trabalho interrompido {trabalho_id}")
+            if imagens or trabalho_id:
+                if trabalho_id is None:
+                    tipo = input("Digite o tipo de documento (ou Enter para 'genérico'): ") or "genérico"
+                else:
+                    tipo = jornal.obter(trabalho_id)['tipo_documento']
+                trabalho_id = preparar_trabalho(jornal, imagens, imagens_dir, resultados_dir, tipo)
+                print(f"\n⚡ Processando {len(jornal.pendentes(trabalho_id))} imagem(ns) com {numero_workers()} processo(s)... "
+                      "(Ctrl-C interrompe e pode ser retomado depois)")
+                cache = obter_cache()
+                antes = cache.estatisticas() if cache else None
+                niveis = ResumoNiveis()
+                parar = threading.Event()
+                # O pipeline salva o resultado (e uma página por arquivo em TIFF/PDF); o trabalho registra no histórico
+                with interrupcao_suave(parar):
+                    for resultado in executar_trabalho(jornal, trabalho_id, gerenciador, manifesto=manifesto, parar=parar):
+                        imagem = resultado['arquivo']
+                        niveis.registrar(resultado)
+                        if resultado['texto']:
+                            print(f"✅ Concluído: {imagem} ({resultado['tempo']:.1f}s, confiança {confianca_de(resultado):.0f}%)")
+                            if resultado.get('salvo_em'):
+                                print(f"📁 Resultado salvo em: {resultado['salvo_em']}")
+                        elif eh_branca(resultado):
+                            print(f"📄 Em branco: {imagem} (OCR dispensado)")
+                        else:
+                            print(f"❌ Falha: {imagem} ({resultado['erro']})")
+                resumo_cache = resumo_desde(antes)
+                if resumo_cache:
+                    print(resumo_cache)
+                if niveis.texto():
+                    print(niveis.texto())
+                if parar.is_set():
+                    print(f"⏸️  Trabalho {trabalho_id} interrompido: use a opção 9 para continuar")
+            elif not todas:
                 print("❌ Nenhuma imagem encontrada na pasta 'imagens'")
+            else:
+                print("✅ Nada a processar: todas as imagens já estão atualizadas")
+            jornal.fechar()
+            manifesto.fechar()
         
         elif opcao == "3":
             # Criar imagem de teste
@@ -227,6 +273,52 @@ def main():
             else:
                 print("❌ Nenhuma imagem na pasta 'imagens'")
         
+        elif opcao == "7":
+            # OCR só das regiões dos campos de um modelo conhecido
+            modelos = carregar_modelos()
+            print("\n🗂️  Modelos disponíveis:")
+            for nome_modelo, modelo in modelos.items():
+                print(f"  - {nome_modelo}: {modelo.get('descricao', '')}")
+            tipo_modelo = input("Digite o modelo: ").strip()
+            nome_imagem = input("Digite o nome da imagem (ex: documento.jpg): ")
+            dados = extrair_campos(nome_imagem, imagens_dir, tipo_modelo)
+            if dados:
+                print("\n✅ CAMPOS EXTRAÍDOS:")
+                print("=" * 40)
+                for campo, valor in dados['campos'].items():
+                    print(f"{campo}: {valor}")
+                print("=" * 40)
+                print(f"⏱️  {dados['tempo']:.2f}s")
+                gerenciador.adicionar_documento(nome_imagem, tipo_modelo)
+        
+        elif opcao == "8":
+            # Pasta quente: processa cada imagem nova ou alterada até Ctrl-C
+            tipo = input("Digite o tipo de documento (ou Enter para 'genérico'): ") or "genérico"
+            try:
+                MonitorPasta(imagens_dir, resultados_dir, gerenciador, tipo).executar()
+            except KeyboardInterrupt:
+                print("\n⏹️  Monitoramento encerrado")
+        
+        elif opcao == "9":
+            # Continuar um "Processar Tudo" que foi interrompido (Ctrl-C, queda de energia...)
+            jornal = JornalTrabalhos()
+            trabalhos = jornal.listar()
+            if trabalhos:
+                print("\n📋 Trabalhos inacabados:")
+                for trabalho in trabalhos:
+                    print(f"  - {descrever(trabalho)}")
+                trabalho_id = input("Digite o ID (ou Enter para o mais recente): ").strip() or trabalhos[-1]['id']
+                if jornal.obter(trabalho_id) is None:
+                    print(f"❌ Trabalho não encontrado: {trabalho_id}")
+                else:
+                    refazer = input("Tentar de novo as imagens que falharam? (s/N): ").strip().lower() == "s"
+                    manifesto = ManifestoOCR(jornal.obter(trabalho_id)['imagens_dir'])
+                    rodar_no_terminal(jornal, trabalho_id, gerenciador, manifesto, refazer)
+                    manifesto.fechar()
+            else:
+                print("✅ Nenhum trabalho interrompido")
+            jornal.fechar()
+        
         elif opcao == "6":
             # Menu avançado
             menu_avancado(gerenciador)
@@ -241,4 +333,6 @@ def main():
         input("\nPressione Enter para continuar...")
 
 if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
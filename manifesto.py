@@ -0,0 +1,148 @@
+"""
+Manifesto incremental: registra, por pasta de imagens, o que já foi processado
+e com qual configuração, para que "Processar Tudo" processe só o que mudou.
+
+Cada arquivo processado guarda tamanho, mtime, hash do conteúdo e a assinatura
+do processamento (níveis de OCR, pré-processamento e motor). Na próxima
+execução basta um stat por arquivo: só quem mudou de tamanho/mtime tem o hash
+recalculado (um arquivo apenas "tocado" não é reprocessado) e trocar a config
+ou o motor invalida todas as entradas.
+
+Os manifestos ficam em <pasta do config.json>/manifestos/, um SQLite por pasta.
+
+API:
+  ManifestoOCR(imagens_dir).pendentes(imagens, resultados_dir=None, arquivo_saida=None) -> lista do que precisa de OCR
+  ManifestoOCR(imagens_dir).registrar(nome, salvo_em=None, versao=None)
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+from cache_ocr import hash_arquivo
+from ocr_funcoes import assinatura_processamento
+
+try:
+    from cdigo.config import _appdata_config_path
+except Exception:
+    from config import _appdata_config_path
+
+
+def caminho_manifesto(imagens_dir):
+    """Arquivo do manifesto de `imagens_dir` (um por pasta, identificado pelo caminho absoluto)."""
+    pasta = os.path.normcase(os.path.abspath(imagens_dir))
+    nome = hashlib.sha1(pasta.encode('utf-8')).hexdigest()[:16] + '.db'
+    return os.path.join(os.path.dirname(_appdata_config_path()), 'manifestos', nome)
+
+
+class ManifestoOCR:
+    """Índice persistente (SQLite) dos arquivos já processados de uma pasta."""
+
+    def __init__(self, imagens_dir, caminho=None):
+        self.imagens_dir = imagens_dir
+        self.caminho = caminho or caminho_manifesto(imagens_dir)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS arquivos (
+                    nome TEXT PRIMARY KEY,
+                    tamanho INTEGER,
+                    mtime_ns INTEGER,
+                    hash TEXT,
+                    assinatura TEXT,
+                    salvo_em TEXT,
+                    processado_em REAL
+                )
+            ''')
+
+    def pendentes(self, imagens, resultados_dir=None, arquivo_saida=None):
+        """
+        Filtra `imagens`, mantendo só as que precisam de OCR: novas, alteradas,
+        processadas com outra config/motor ou cujo _texto.txt sumiu de `resultados_dir`.
+        `arquivo_saida` é o arquivo único com todos os resultados (JSONL/CSV do
+        ocr_cli): se ele não existe, todas as imagens estão pendentes.
+        """
+        if arquivo_saida and not os.path.exists(arquivo_saida):
+            return list(imagens)
+        assinatura = assinatura_processamento()
+        with self._lock:
+            registros = {linha[0]: linha[1:] for linha in self._conn.execute(
+                'SELECT nome, tamanho, mtime_ns, hash, assinatura, salvo_em FROM arquivos')}
+
+        pendentes = []
+        tocados = []
+        for nome in imagens:
+            registro = registros.get(nome)
+            if registro is None or registro[3] != assinatura:
+                pendentes.append(nome)
+                continue
+            tamanho, mtime_ns, hash_antigo, _, salvo_em = registro
+            if resultados_dir and not os.path.exists(salvo_em or self._resultado_padrao(nome, resultados_dir)):
+                pendentes.append(nome)
+                continue
+            try:
+                st = os.stat(os.path.join(self.imagens_dir, nome))
+            except OSError:
+                pendentes.append(nome)
+                continue
+            if (st.st_size, st.st_mtime_ns) == (tamanho, mtime_ns):
+                continue
+            # Mesmo tamanho e data nova: pode ter sido só "tocado"; o hash decide
+            if st.st_size == tamanho and self._hash(nome) == hash_antigo:
+                tocados.append((st.st_mtime_ns, nome))
+                continue
+            pendentes.append(nome)
+
+        if tocados:
+            with self._lock, self._conn:
+                self._conn.executemany('UPDATE arquivos SET mtime_ns = ? WHERE nome = ?', tocados)
+        return pendentes
+
+    def registrar(self, nome, salvo_em=None, versao=None):
+        """
+        Marca `nome` como processado com a config atual. `versao` é o
+        (tamanho, mtime_ns, hash) do conteúdo que foi de fato reconhecido,
+        tirado na leitura (leitura_imagem.ArquivoImagem.versao): se o arquivo
+        foi trocado durante o OCR, a próxima execução vê a diferença e o
+        processa de novo. Sem ela, o arquivo é lido agora.
+        """
+        if versao is None:
+            caminho = os.path.join(self.imagens_dir, nome)
+            try:
+                st = os.stat(caminho)
+                versao = (st.st_size, st.st_mtime_ns, self._hash(nome))
+            except OSError as e:
+                print(f"⚠️ Manifesto: não foi possível registrar {nome}: {e}")
+                return
+        tamanho, mtime_ns, hash_conteudo = versao
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (nome, tamanho, mtime_ns, hash_conteudo, assinatura_processamento(), salvo_em, time.time())
+            )
+
+    def remover(self, nome):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM arquivos WHERE nome = ?', (nome,))
+
+    def limpar(self):
+        """Esquece tudo: a próxima execução processa a pasta inteira."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM arquivos')
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    def _hash(self, nome):
+        return hash_arquivo(os.path.join(self.imagens_dir, nome))
+
+    @staticmethod
+    def _resultado_padrao(nome, resultados_dir):
+        # Mesmo nome usado por processamento_lote.salvar_resultado
+        return os.path.join(resultados_dir, nome.split('.')[0] + "_texto.txt")
@@ -0,0 +1,173 @@
+"""
+Extração de campos por modelo de documento (OCR por zonas).
+
+Para layouts conhecidos não é preciso rodar a análise de página inteira
+(--psm 3): cada campo tem uma região fixa (frações da largura/altura da
+imagem), que é recortada e lida sozinha como uma linha (--psm 7) com lista de
+caracteres permitidos. Os recortes rodam em paralelo no pool de processos.
+Cada recorte passa pelo perfil de pré-processamento 'recorte' (binarização e
+uma moldura branca), não pelo da página inteira; ele pode ser redefinido em
+'perfis_preprocessamento' no config.json.
+
+Modelos extras podem ser declarados no config.json, em 'modelos_documento':
+
+  "modelos_documento": {
+    "rg_sp": {
+      "descricao": "RG - SP",
+      "campos": {
+        "rg":   {"regiao": [0.05, 0.10, 0.40, 0.16], "tipo": "rg"},
+        "nome": {"regiao": [0.05, 0.20, 0.90, 0.27], "tipo": "nome"}
+      }
+    }
+  }
+
+Tipos de campo: cpf, rg, data, nome, texto (define a whitelist padrão e em
+que chave de ProcessadorDados.estruturar_dados o valor aparece).
+
+API:
+  carregar_modelos() -> dict
+  extrair_campos(nome_arquivo, imagens_dir, tipo_modelo, workers=None) -> dict (ou None)
+"""
+import os
+import time
+
+from ocr_backends import obter_backend
+from preprocessamento import carregar_cinza, preparar
+from processador_dados import ProcessadorDados
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+PERFIL_RECORTE = 'recorte'
+
+_LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzÁÂÃÀÉÊÍÓÔÕÚÇáâãàéêíóôõúç"
+
+WHITELISTS = {
+    'cpf': "0123456789.-",
+    'rg': "0123456789.-Xx",
+    'data': "0123456789/",
+    'nome': _LETRAS,
+    'texto': None,
+}
+
+# Modelo do documento gerado por ocr_funcoes.criar_imagem_teste (1600x1000)
+MODELOS_PADRAO = {
+    'documento_teste': {
+        'descricao': "Documento de teste (criar_imagem_teste)",
+        'campos': {
+            'nome': {'regiao': [0.085, 0.080, 0.75, 0.135], 'tipo': 'nome'},
+            'cpf': {'regiao': [0.070, 0.125, 0.40, 0.180], 'tipo': 'cpf'},
+            'rg': {'regiao': [0.060, 0.170, 0.35, 0.225], 'tipo': 'rg'},
+            'data_nascimento': {'regiao': [0.250, 0.215, 0.50, 0.270], 'tipo': 'data'},
+        },
+    },
+}
+
+
+def carregar_modelos():
+    """Modelos embutidos + os declarados em 'modelos_documento' no config.json."""
+    modelos = dict(MODELOS_PADRAO)
+    try:
+        modelos.update((load_config() or {}).get('modelos_documento') or {})
+    except Exception:
+        pass
+    return modelos
+
+
+def config_campo(campo):
+    """Config do Tesseract para um campo: uma linha (--psm 7) com whitelist."""
+    tipo = campo.get('tipo', 'texto')
+    config = f"--oem {campo.get('oem', 1)} --psm {campo.get('psm', 7)} -l {campo.get('idioma', 'por')}"
+    whitelist = campo.get('whitelist', WHITELISTS.get(tipo))
+    if whitelist:
+        config += f" -c tessedit_char_whitelist={whitelist}"
+    return config
+
+
+def recortar(cinza, regiao):
+    """Recorta a região [x0, y0, x1, y1] (frações de 0 a 1) de um array."""
+    altura, largura = cinza.shape[:2]
+    x0, y0, x1, y1 = regiao
+    x0, x1 = int(max(0.0, x0) * largura), int(min(1.0, x1) * largura)
+    y0, y1 = int(max(0.0, y0) * altura), int(min(1.0, y1) * altura)
+    return cinza[y0:y1, x0:x1]
+
+
+def _ocr_recorte(recorte, config):
+    # Roda no worker: o motor do backend já está aquecido lá
+    if recorte.size == 0:
+        return ''
+    return obter_backend().reconhecer(preparar(recorte.copy(), perfil=PERFIL_RECORTE), config).strip()
+
+
+def _estruturar(campos, modelo):
+    """Converte os campos lidos no formato de ProcessadorDados.estruturar_dados."""
+    dados = {'cpf': None, 'rg': None, 'datas': [], 'nomes': []}
+    for nome, valor in campos.items():
+        tipo = modelo['campos'][nome].get('tipo', 'texto')
+        if not valor:
+            continue
+        if tipo == 'cpf':
+            dados['cpf'] = ProcessadorDados.extrair_cpf(valor) or valor
+        elif tipo == 'rg':
+            dados['rg'] = ProcessadorDados.extrair_rg(valor) or valor
+        elif tipo == 'data':
+            dados['datas'] += ProcessadorDados.extrair_datas(valor) or [valor]
+        elif tipo == 'nome':
+            dados['nomes'].append(' '.join(valor.split()))
+    dados['texto_completo'] = '\n'.join(f"{nome}: {valor}" for nome, valor in campos.items())
+    return dados
+
+
+def extrair_campos(nome_arquivo, imagens_dir, tipo_modelo, workers=None):
+    """
+    Lê só os campos declarados no modelo `tipo_modelo`.
+
+    Retorna o dict de ProcessadorDados.estruturar_dados acrescido de
+    'modelo', 'campos' (texto cru de cada campo) e 'tempo'; ou None em erro.
+    """
+    modelos = carregar_modelos()
+    modelo = modelos.get(tipo_modelo)
+    if modelo is None:
+        print(f"❌ Modelo de documento desconhecido: {tipo_modelo} (disponíveis: {', '.join(modelos)})")
+        return None
+
+    caminho = os.path.join(imagens_dir, nome_arquivo)
+    inicio = time.perf_counter()
+    cinza = carregar_cinza(caminho, perfil=PERFIL_RECORTE)
+    if cinza is None:
+        print(f"❌ Não foi possível abrir: {nome_arquivo}")
+        return None
+
+    # Import tardio: processamento_lote importa ocr_funcoes, que não depende deste módulo
+    from processamento_lote import numero_workers, obter_agendador
+    from agendador_ocr import PRIORIDADE_INTERATIVA
+
+    tarefas = {nome: (recortar(cinza, campo['regiao']), config_campo(campo))
+               for nome, campo in modelo['campos'].items()}
+    workers = min(numero_workers(workers), len(tarefas))
+
+    campos = {}
+    try:
+        if workers > 1:
+            # Um documento pedido pelo usuário: passa na frente de lotes em andamento
+            agendador = obter_agendador(numero_workers())
+            futuros = {nome: agendador.submit(_ocr_recorte, recorte, config, prioridade=PRIORIDADE_INTERATIVA)
+                       for nome, (recorte, config) in tarefas.items()}
+            for nome, futuro in futuros.items():
+                campos[nome] = futuro.result()
+        else:
+            for nome, (recorte, config) in tarefas.items():
+                campos[nome] = _ocr_recorte(recorte, config)
+    except Exception as e:
+        print(f"❌ Erro ao extrair campos de {nome_arquivo}: {e}")
+        return None
+
+    dados = _estruturar(campos, modelo)
+    dados['modelo'] = tipo_modelo
+    dados['campos'] = campos
+    dados['tempo'] = round(time.perf_counter() - inicio, 4)
+    return dados
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Modo "pasta quente": monitora a pasta de imagens e processa sozinho cada
+arquivo novo ou alterado, sem precisar clicar em "Processar Tudo".
+
+Usa eventos do sistema de arquivos via `watchdog` (inotify no Linux,
+ReadDirectoryChangesW no Windows) quando o pacote está instalado; sem ele,
+varre a pasta a cada `intervalo` segundos comparando com um índice de
+tamanho/mtime (uma passada de stat, sem abrir arquivos).
+
+Um arquivo só entra no OCR depois de ficar `estabilidade` segundos sem mudar
+de tamanho nem de data (o scanner ainda pode estar gravando). Os prontos entram
+numa fila que alimenta um único processamento_lote.processar_em_fluxo, aberto
+numa thread durante todo o monitoramento: quem chega durante o OCR de outros
+não espera o grupo anterior terminar. O índice só registra a versão de um
+arquivo depois que o OCR dela deu certo; uma falha volta para a fila até
+TENTATIVAS vezes (ou até o arquivo mudar de novo).
+
+Uso:
+  python monitor_pasta.py [imagens_dir] [resultados_dir] [--intervalo S] [--estabilidade S] [--existentes]
+
+API:
+  MonitorPasta(imagens_dir, resultados_dir, gerenciador=None, ...).executar()  (bloqueia)
+  .iniciar() / .parar()  (em thread separada)
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+from ocr_funcoes import eh_imagem
+from processamento_lote import processar_em_fluxo
+from manifesto import ManifestoOCR
+from pagina_branca import eh_branca
+
+try:
+    from cdigo.history import GerenciadorDocumentos
+except Exception:
+    from history import GerenciadorDocumentos
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+TENTATIVAS = 3
+_FIM = object()
+
+
+class _Eventos(FileSystemEventHandler):
+    """Repassa ao monitor o nome de cada arquivo criado, alterado ou movido para a pasta."""
+
+    def __init__(self, monitor):
+        self.monitor = monitor
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.monitor.marcar(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.monitor.marcar(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.monitor.marcar(event.dest_path)
+
+
+class MonitorPasta:
+    """Processa continuamente as imagens que chegam em `imagens_dir`."""
+
+    def __init__(self, imagens_dir, resultados_dir, gerenciador=None, tipo_documento="genérico",
+                 intervalo=2.0, estabilidade=1.5, processar_existentes=False, ao_processar=None, usar_eventos=True):
+        self.imagens_dir = os.path.abspath(imagens_dir)
+        self.resultados_dir = resultados_dir
+        self.gerenciador = gerenciador
+        self.tipo_documento = tipo_documento
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.processar_existentes = processar_existentes
+        self.ao_processar = ao_processar
+        self.usar_eventos = usar_eventos and Observer is not None
+
+        # nome -> (tamanho, mtime_ns) da versão já processada
+        self._indice = {}
+        # nome -> [tamanho, mtime_ns, instante da última mudança, instante em que foi visto]
+        self._pendentes = {}
+        # nome -> ((tamanho, mtime_ns), instante em que foi visto) dos que estão na fila ou no OCR
+        self._em_andamento = {}
+        # nome -> ((tamanho, mtime_ns), falhas seguidas dessa versão)
+        self._falhas = {}
+        self._chegadas = queue.Queue()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._manifesto = None
+
+    # ---------- detecção ----------
+
+    def marcar(self, caminho):
+        """Registra que `caminho` apareceu ou mudou (chamado pelos eventos ou pela varredura)."""
+        nome = os.path.basename(caminho)
+        if os.path.dirname(os.path.abspath(caminho)) != self.imagens_dir or not eh_imagem(nome):
+            return
+        with self._lock:
+            if nome not in self._pendentes:
+                agora = time.monotonic()
+                self._pendentes[nome] = [-1, -1, agora, agora]
+        self._acordar.set()
+
+    def _varrer(self, inicial=False):
+        """Uma passada de stat na pasta; marca o que não bate com o índice."""
+        try:
+            entradas = list(os.scandir(self.imagens_dir))
+        except OSError as e:
+            print(f"⚠️ Não foi possível ler {self.imagens_dir}: {e}")
+            return
+        pendentes = None
+        if inicial and self.processar_existentes:
+            # Dos que já estavam na pasta, só o que o manifesto não tem como atualizado
+            pendentes = set(self._manifesto.pendentes([e.name for e in entradas if eh_imagem(e.name)],
+                                                      self.resultados_dir))
+        for entrada in entradas:
+            if not entrada.is_file() or not eh_imagem(entrada.name):
+                continue
+            try:
+                st = entrada.stat()
+            except OSError:
+                continue
+            assinatura = (st.st_size, st.st_mtime_ns)
+            if inicial and (pendentes is None or entrada.name not in pendentes):
+                self._indice[entrada.name] = assinatura
+            elif self._indice.get(entrada.name) != assinatura:
+                self.marcar(entrada.path)
+
+    def _prontos(self):
+        """Arquivos pendentes que ficaram `estabilidade` segundos sem mudar."""
+        agora = time.monotonic()
+        prontos = []
+        with self._lock:
+            for nome, estado in list(self._pendentes.items()):
+                try:
+                    st = os.stat(os.path.join(self.imagens_dir, nome))
+                except OSError:
+                    # Removido ou renomeado antes de ficar pronto
+                    del self._pendentes[nome]
+                    continue
+                assinatura = (st.st_size, st.st_mtime_ns)
+                if self._indice.get(nome) == assinatura:
+                    del self._pendentes[nome]
+                elif nome in self._em_andamento:
+                    # A mesma versão já está no OCR; uma nova espera a atual terminar
+                    if self._em_andamento[nome][0] == assinatura:
+                        del self._pendentes[nome]
+                elif (estado[0], estado[1]) != assinatura:
+                    estado[0], estado[1], estado[2] = st.st_size, st.st_mtime_ns, agora
+                elif st.st_size > 0 and agora - estado[2] >= self.estabilidade:
+                    prontos.append((nome, assinatura, estado[3]))
+                    del self._pendentes[nome]
+        return prontos
+
+    # ---------- processamento ----------
+
+    def _enfileirar(self, prontos):
+        for nome, assinatura, visto in prontos:
+            with self._lock:
+                self._em_andamento[nome] = (assinatura, visto)
+            self._chegadas.put(nome)
+
+    def _nomes(self):
+        """Entrada do pipeline: os nomes conforme ficam prontos, até o monitor parar."""
+        while True:
+            nome = self._chegadas.get()
+            if nome is _FIM:
+                return
+            yield nome
+
+    def _consumir(self):
+        """Thread do OCR: um processar_em_fluxo só, alimentado pela fila de chegadas."""
+        while True:
+            try:
+                for resultado in processar_em_fluxo(self._nomes(), self.imagens_dir, self.resultados_dir,
+                                                    self.gerenciador, self.tipo_documento,
+                                                    manifesto=self._manifesto):
+                    self._concluir(resultado)
+                return
+            except Exception as e:
+                print(f"⚠️ Erro no processamento do monitor: {e}")
+                # O que estava no pipeline se perdeu com ele: volta a ser detectado
+                with self._lock:
+                    perdidos, self._em_andamento = list(self._em_andamento), {}
+                for nome in perdidos:
+                    self.marcar(os.path.join(self.imagens_dir, nome))
+                if self._parar.wait(self.intervalo):
+                    return
+
+    def _concluir(self, resultado):
+        nome = resultado['arquivo']
+        with self._lock:
+            assinatura, visto = self._em_andamento.pop(nome, (None, time.monotonic()))
+        latencia = time.monotonic() - visto
+        if resultado['texto'] or eh_branca(resultado):
+            with self._lock:
+                self._indice[nome] = assinatura
+                self._falhas.pop(nome, None)
+            if resultado['texto']:
+                print(f"✅ {nome} ({latencia:.1f}s após chegar)")
+            else:
+                print(f"📄 {nome}: página em branco ({latencia:.1f}s após chegar)")
+        else:
+            print(f"❌ {nome}: {resultado['erro']}")
+            if not resultado.get('quarentena'):
+                self._falhou(nome, assinatura)
+        if self.ao_processar:
+                try:
+                    self.ao_processar(resultado)
+                except Exception as e:
+                    print(f"⚠️ Erro no retorno do monitor: {e}")
+
+    def _falhou(self, nome, assinatura):
+        """Põe a imagem de volta na detecção; depois de TENTATIVAS, só quando o arquivo mudar."""
+        with self._lock:
+            anterior, falhas = self._falhas.get(nome, (assinatura, 0))
+            falhas = falhas + 1 if anterior == assinatura else 1
+            self._falhas[nome] = (assinatura, falhas)
+            if falhas >= TENTATIVAS:
+                self._indice[nome] = assinatura
+        if falhas >= TENTATIVAS:
+            print(f"⛔ {nome}: {falhas} falha(s) seguidas, só volta ao OCR se o arquivo mudar")
+        else:
+            print(f"🔁 {nome}: nova tentativa ({falhas + 1}/{TENTATIVAS})")
+            self.marcar(os.path.join(self.imagens_dir, nome))
+
+    def executar(self):
+        """Laço principal; bloqueia até parar() (ou Ctrl-C)."""
+        os.makedirs(self.imagens_dir, exist_ok=True)
+        self._manifesto = ManifestoOCR(self.imagens_dir)
+        observador = None
+        if self.usar_eventos:
+            observador = Observer()
+            observador.schedule(_Eventos(self), self.imagens_dir, recursive=False)
+            observador.start()
+        self._varrer(inicial=True)
+        modo = "eventos do sistema" if observador else f"varredura a cada {self.intervalo:g}s"
+        print(f"👀 Monitorando {self.imagens_dir} ({modo}). Ctrl-C para sair.")
+        ocr = threading.Thread(target=self._consumir, name="monitor-ocr", daemon=True)
+        ocr.start()
+
+        try:
+            while not self._parar.is_set():
+                if observador is None:
+                    self._varrer()
+                self._enfileirar(self._prontos())
+
+                # Com eventos, dorme até algo acontecer; sem eles, até a próxima varredura
+                if self._pendentes:
+                    espera = min(0.5, self.estabilidade)
+                else:
+                    espera = None if observador else self.intervalo
+                self._acordar.wait(espera)
+                self._acordar.clear()
+        finally:
+            # O pipeline termina o que já recebeu antes de o manifesto fechar
+            self._chegadas.put(_FIM)
+            ocr.join()
+            if observador is not None:
+                observador.stop()
+                observador.join()
+            self._manifesto.fechar()
+
+    def iniciar(self):
+        """Roda executar() numa thread em segundo plano."""
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self.executar, name="monitor-pasta", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+def main(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Processa automaticamente as imagens que chegam na pasta")
+    parser.add_argument('imagens_dir', nargs='?', default=os.path.join(project_root, "imagens"))
+    parser.add_argument('resultados_dir', nargs='?', default=os.path.join(project_root, "resultados", "textos_extraidos"))
+    parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos entre varreduras (sem watchdog)")
+    parser.add_argument('--estabilidade', type=float, default=1.5, help="Segundos sem mudança para considerar o arquivo pronto")
+    parser.add_argument('--existentes', action='store_true', help="Processa também o que já está na pasta")
+    parser.add_argument('--tipo', default="genérico", help="Tipo de documento registrado no histórico")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.resultados_dir, exist_ok=True)
+    monitor = MonitorPasta(args.imagens_dir, args.resultados_dir, GerenciadorDocumentos(args.resultados_dir),
+                           args.tipo, args.intervalo, args.estabilidade, args.existentes)
+    try:
+        monitor.executar()
+    except KeyboardInterrupt:
+        print("\n👋 Monitor encerrado")
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
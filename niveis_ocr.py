@@ -0,0 +1,150 @@
+"""
+OCR adaptativo em níveis: começa pela configuração mais barata e só escala
+para as mais caras quando a confiança média das palavras fica abaixo do mínimo.
+
+  rapido      --oem 1 --psm 6   só LSTM, bloco único, sem análise de layout/OSD
+  padrao      --oem 3 --psm 3   segmentação automática (config antiga)
+  esparso     --oem 3 --psm 11  texto esparso, sem ordem de leitura
+
+Páginas giradas ou inclinadas já chegam endireitadas do pré-processamento
+(preprocessamento.endireitar), então não há nível com OSD (--psm 1); quem
+precisar dele pode incluí-lo em 'niveis_ocr'.
+
+Se nenhum nível atingir o mínimo, fica o resultado de maior confiança.
+Níveis e limiar podem ser trocados no config.json ('niveis_ocr' como lista de
+{"nome", "config"} e 'confianca_minima').
+
+API:
+  parametros() -> (niveis, confianca_minima)
+  assinatura() -> str que identifica a estratégia (usada na chave do cache)
+  reconhecer_adaptativo(backend, imagem, palavras=False) -> dict com texto, confiança, nível e tempos
+  ResumoNiveis().registrar(resultado) / .texto() -> quantos itens pararam em cada nível e o tempo poupado
+"""
+import time
+
+from ocr_backends import texto_de_palavras
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+NIVEIS_PADRAO = [
+    {'nome': 'rapido', 'config': '--oem 1 --psm 6 -l por'},
+    {'nome': 'padrao', 'config': '--oem 3 --psm 3 -l por'},
+    {'nome': 'esparso', 'config': '--oem 3 --psm 11 -l por'},
+]
+CONFIANCA_MINIMA = 75.0
+
+
+def parametros():
+    cfg = load_config() or {}
+    niveis = cfg.get('niveis_ocr') or NIVEIS_PADRAO
+    return niveis, float(cfg.get('confianca_minima', CONFIANCA_MINIMA))
+
+
+def assinatura():
+    """Muda quando a lista de níveis ou o limiar mudam (invalida o cache)."""
+    niveis, minima = parametros()
+    return ' > '.join(nivel['config'] for nivel in niveis) + f" @{minima:g}"
+
+
+def _media(valores):
+    return sum(valores) / len(valores) if valores else 0.0
+
+
+def reconhecer_adaptativo(backend, imagem, palavras=False):
+    """
+    Roda os níveis em ordem até um atingir a confiança mínima.
+
+    Retorna {'texto', 'confiancas', 'confianca', 'nivel', 'config', 'tempo_niveis'};
+    'tempo_niveis' tem o tempo gasto (s) em cada nível tentado. Com
+    `palavras=True` usa backend.reconhecer_palavras e devolve também
+    'palavras' (com as caixas, para quem precisa das coordenadas).
+    """
+    niveis, minima = parametros()
+    melhor = None
+    tempos = {}
+    for nivel in niveis:
+        inicio = time.perf_counter()
+        try:
+            if palavras:
+                lista = backend.reconhecer_palavras(imagem, nivel['config'])
+                texto, confiancas = texto_de_palavras(lista), [p['confianca'] for p in lista]
+            else:
+                texto, confiancas = backend.reconhecer_com_confianca(imagem, nivel['config'])
+        except TimeoutError:
+            # Imagem que estoura o tempo num nível estoura nos outros: fica com o que já tem
+            if melhor is None:
+                raise
+            break
+        except Exception as e:
+            # Ex.: nível com OSD sem o osd.traineddata instalado
+            print(f"⚠️ Nível de OCR '{nivel['nome']}' falhou: {e}")
+            continue
+        finally:
+            tempos[nivel['nome']] = round(time.perf_counter() - inicio, 4)
+
+        confianca = _media(confiancas)
+        if melhor is None or confianca > melhor['confianca']:
+            melhor = {
+                'texto': texto.strip(),
+                'confiancas': confiancas,
+                'confianca': confianca,
+                'nivel': nivel['nome'],
+                'config': nivel['config'],
+            }
+            if palavras:
+                melhor['palavras'] = lista
+        if confianca >= minima:
+            break
+
+    if melhor is None:
+        raise RuntimeError("Nenhum nível de OCR conseguiu processar a imagem")
+    melhor['tempo_niveis'] = tempos
+    return melhor
+
+
+class ResumoNiveis:
+    """
+    Acumula, resultado a resultado, em que nível cada imagem/página parou.
+    texto() informa a distribuição e a estimativa de CPU poupada: para os
+    itens que pararam no primeiro nível, a diferença entre o tempo médio
+    medido do segundo nível e o que gastaram.
+    """
+
+    def __init__(self):
+        self.niveis = [nivel['nome'] for nivel in parametros()[0]]
+        self.contagem = {}
+        self.tempos_nivel = {}
+        self.tempos_primeiro = []
+
+    def registrar(self, resultado):
+        # Documentos contam página por página
+        for pagina in resultado.get('paginas') or [resultado]:
+            self._registrar_metadados(pagina.get('metadados') or {})
+
+    def _registrar_metadados(self, metadados):
+        nivel = metadados.get('nivel')
+        if not nivel or metadados.get('cache'):
+            return
+        tempos = metadados.get('tempo_niveis') or {}
+        self.contagem[nivel] = self.contagem.get(nivel, 0) + 1
+        for nome, tempo in tempos.items():
+            self.tempos_nivel.setdefault(nome, []).append(tempo)
+        if self.niveis and nivel == self.niveis[0]:
+            self.tempos_primeiro.append(tempos.get(nivel, 0.0))
+
+    def texto(self):
+        total = sum(self.contagem.values())
+        if not total:
+            return ""
+        partes = [f"{nome} {self.contagem[nome]}" for nome in self.niveis if nome in self.contagem]
+        texto = (f"⚡ Níveis de OCR: {', '.join(partes)} "
+                 f"({len(self.tempos_primeiro) * 100 // total}% no caminho rápido)")
+        if len(self.niveis) > 1 and self.tempos_primeiro and self.tempos_nivel.get(self.niveis[1]):
+            custo_segundo = _media(self.tempos_nivel[self.niveis[1]])
+            poupado = sum(max(0.0, custo_segundo - t) for t in self.tempos_primeiro)
+            texto += f", ~{poupado:.1f}s de CPU poupados"
+        return texto
@@ -0,0 +1,312 @@
+"""
+Backends de OCR: camada sob ocr_funcoes que define como o Tesseract é chamado.
+
+- tesserocr: usa a API C do Tesseract dentro do próprio processo. O motor é
+  inicializado uma vez por worker e reaproveitado: sem subprocesso, sem arquivo
+  temporário e sem recarregar o traineddata a cada imagem.
+- pytesseract: fallback; inicia um processo `tesseract` por chamada.
+
+API:
+  obter_backend(nome=None) -> backend com .nome, .versao(), .reconhecer(imagem, config)
+    e .reconhecer_com_confianca(imagem, config) -> (texto, confianças por palavra)
+    e .reconhecer_palavras(imagem, config) -> lista de palavras com caixa (ver palavras_de_dados)
+    (imagem pode ser PIL.Image ou array NumPy uint8)
+  backends_disponiveis() -> lista de nomes
+  texto_de_palavras(palavras) -> texto remontado em linhas e parágrafos
+"""
+import os
+import shlex
+import threading
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+CONFIG_PADRAO = '--oem 3 --psm 3 -l por'
+# Segundos que uma imagem pode levar no OCR ('tempo_limite_imagem' no config.json; 0 = sem limite)
+TEMPO_LIMITE_PADRAO = 120
+
+_backends = {}
+_escolhas = {}
+
+
+def interpretar_config(config):
+    """Converte uma string de config do Tesseract ('--oem 3 --psm 3 -l por -c x=y') em dict."""
+    opcoes = {'lang': 'eng', 'oem': 3, 'psm': 3, 'variaveis': {}}
+    partes = shlex.split(config or '')
+    i = 0
+    while i < len(partes):
+        parte = partes[i]
+        valor = partes[i + 1] if i + 1 < len(partes) else None
+        if parte == '-l' and valor:
+            opcoes['lang'] = valor
+            i += 1
+        elif parte == '--oem' and valor:
+            opcoes['oem'] = int(valor)
+            i += 1
+        elif parte == '--psm' and valor:
+            opcoes['psm'] = int(valor)
+            i += 1
+        elif parte == '-c' and valor and '=' in valor:
+            chave, val = valor.split('=', 1)
+            opcoes['variaveis'][chave] = val
+            i += 1
+        i += 1
+    return opcoes
+
+
+def texto_de_dados(dados):
+    """Remonta o texto de um image_to_data: palavras por linha, linha em branco entre parágrafos."""
+    linhas = {}
+    for i, palavra in enumerate(dados['text']):
+        if not palavra or not str(palavra).strip():
+            continue
+        chave = (dados['block_num'][i], dados['par_num'][i], dados['line_num'][i])
+        linhas.setdefault(chave, []).append(str(palavra))
+
+    partes = []
+    anterior = None
+    for (bloco, paragrafo, _), palavras in linhas.items():
+        if anterior is not None and (bloco, paragrafo) != anterior:
+            partes.append('')
+        partes.append(' '.join(palavras))
+        anterior = (bloco, paragrafo)
+    return '\n'.join(partes)
+
+
+def palavras_de_dados(dados):
+    """
+    Palavras de um image_to_data como dicts {'texto', 'confianca', 'x', 'y',
+    'largura', 'altura', 'bloco', 'paragrafo', 'linha'} (coordenadas em px).
+    """
+    palavras = []
+    for i, palavra in enumerate(dados['text']):
+        if not palavra or not str(palavra).strip() or float(dados['conf'][i]) < 0:
+            continue
+        palavras.append({
+            'texto': str(palavra),
+            'confianca': float(dados['conf'][i]),
+            'x': int(dados['left'][i]),
+            'y': int(dados['top'][i]),
+            'largura': int(dados['width'][i]),
+            'altura': int(dados['height'][i]),
+            'bloco': dados['block_num'][i],
+            'paragrafo': dados['par_num'][i],
+            'linha': dados['line_num'][i],
+        })
+    return palavras
+
+
+def texto_de_palavras(palavras):
+    """Mesmo texto de texto_de_dados, a partir de uma lista de palavras_de_dados."""
+    return texto_de_dados({
+        'text': [p['texto'] for p in palavras],
+        'block_num': [p['bloco'] for p in palavras],
+        'par_num': [p['paragrafo'] for p in palavras],
+        'line_num': [p['linha'] for p in palavras],
+    })
+
+
+class BackendPytesseract:
+    """Chama o executável do Tesseract via pytesseract (um processo por imagem)."""
+    nome = 'pytesseract'
+
+    def __init__(self):
+        self._versao = None
+        try:
+            self.tempo_limite = float((load_config() or {}).get('tempo_limite_imagem', TEMPO_LIMITE_PADRAO))
+        except (TypeError, ValueError):
+            self.tempo_limite = TEMPO_LIMITE_PADRAO
+
+    def aquecer(self, config=CONFIG_PADRAO):
+        pass
+
+    def _chamar(self, funcao, imagem, **kwargs):
+        # O pytesseract mata o processo do tesseract que passar do tempo limite
+        try:
+            return funcao(imagem, timeout=self.tempo_limite or 0, **kwargs)
+        except RuntimeError as e:
+            if 'timeout' in str(e).lower():
+                raise TimeoutError(f"Tesseract excedeu {self.tempo_limite:g}s") from e
+            raise
+
+    def versao(self):
+        if self._versao is None:
+            self._versao = str(pytesseract.get_tesseract_version())
+        return self._versao
+
+    def reconhecer(self, imagem, config=CONFIG_PADRAO):
+        return self._chamar(pytesseract.image_to_string, imagem, config=config)
+
+    def reconhecer_com_confianca(self, imagem, config=CONFIG_PADRAO):
+        # Uma única execução do tesseract devolve palavras e confianças
+        palavras = self.reconhecer_palavras(imagem, config)
+        return texto_de_palavras(palavras), [p['confianca'] for p in palavras]
+
+    def reconhecer_palavras(self, imagem, config=CONFIG_PADRAO):
+        dados = self._chamar(pytesseract.image_to_data, imagem, config=config, output_type=pytesseract.Output.DICT)
+        return palavras_de_dados(dados)
+
+
+class BackendTesserocr:
+    """Mantém motores do Tesseract inicializados no processo atual (via tesserocr)."""
+    nome = 'tesserocr'
+
+    def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._motores = {}
+        self._lock = threading.Lock()
+
+    def _motor(self, opcoes):
+        # psm pode mudar a cada chamada; idioma, oem e variáveis exigem outro Init
+        chave = (opcoes['lang'], opcoes['oem'], tuple(sorted(opcoes['variaveis'].items())))
+        motor = self._motores.get(chave)
+        if motor is None:
+            kwargs = {'lang': opcoes['lang'], 'oem': self._tesserocr.OEM(opcoes['oem'])}
+            tessdata = os.environ.get('TESSDATA_PREFIX')
+            if tessdata:
+                kwargs['path'] = tessdata
+            motor = self._tesserocr.PyTessBaseAPI(**kwargs)
+            for variavel, valor in opcoes['variaveis'].items():
+                motor.SetVariable(variavel, valor)
+            self._motores[chave] = motor
+        return motor
+
+    def aquecer(self, config=CONFIG_PADRAO):
+        with self._lock:
+            self._motor(interpretar_config(config))
+
+    def versao(self):
+        # "tesseract 5.3.0\n leptonica-1.82.0 ..." -> "5.3.0"
+        return self._tesserocr.tesseract_version().split('\n')[0].replace('tesseract', '').strip()
+
+    def reconhecer(self, imagem, config=CONFIG_PADRAO):
+        opcoes = interpretar_config(config)
+        with self._lock:
+            motor = self._motor(opcoes)
+            motor.SetPageSegMode(self._tesserocr.PSM(opcoes['psm']))
+            self._definir_imagem(motor, imagem)
+            texto = motor.GetUTF8Text()
+            motor.Clear()
+        return texto
+
+    def reconhecer_com_confianca(self, imagem, config=CONFIG_PADRAO):
+        # Texto remontado das palavras, como no pytesseract: os dois backends dão o mesmo texto
+        palavras = self.reconhecer_palavras(imagem, config)
+        return texto_de_palavras(palavras), [p['confianca'] for p in palavras]
+
+    def reconhecer_palavras(self, imagem, config=CONFIG_PADRAO):
+        opcoes = interpretar_config(config)
+        ril = self._tesserocr.RIL
+        palavras = []
+        with self._lock:
+            motor = self._motor(opcoes)
+            motor.SetPageSegMode(self._tesserocr.PSM(opcoes['psm']))
+            self._definir_imagem(motor, imagem)
+            motor.Recognize()
+            iterador = motor.GetIterator()
+            # Os números de bloco/parágrafo/linha só precisam mudar junto com o layout
+            bloco = paragrafo = linha = 0
+            if iterador is not None:
+                for item in self._tesserocr.iterate_level(iterador, ril.WORD):
+                    if item.IsAtBeginningOf(ril.BLOCK):
+                        bloco += 1
+                    if item.IsAtBeginningOf(ril.PARA):
+                        paragrafo += 1
+                    if item.IsAtBeginningOf(ril.TEXTLINE):
+                        linha += 1
+                    texto = item.GetUTF8Text(ril.WORD)
+                    caixa = item.BoundingBox(ril.WORD)
+                    if not texto or not texto.strip() or caixa is None:
+                        continue
+                    x1, y1, x2, y2 = caixa
+                    palavras.append({'texto': texto, 'confianca': float(item.Confidence(ril.WORD)),
+                                     'x': x1, 'y': y1, 'largura': x2 - x1, 'altura': y2 - y1,
+                                     'bloco': bloco, 'paragrafo': paragrafo, 'linha': linha})
+            motor.Clear()
+        return palavras
+
+    def _definir_imagem(self, motor, imagem):
+        if isinstance(imagem, Image.Image):
+            motor.SetImage(imagem)
+            return
+        # Array NumPy (cinza ou RGB): passa os bytes direto, sem criar PIL.Image
+        altura, largura = imagem.shape[:2]
+        canais = 1 if imagem.ndim == 2 else imagem.shape[2]
+        dados = np.ascontiguousarray(imagem)
+        motor.SetImageBytes(dados.tobytes(), largura, altura, canais, largura * canais)
+
+    def finalizar(self):
+        with self._lock:
+            for motor in self._motores.values():
+                try:
+                    motor.End()
+                except Exception:
+                    pass
+            self._motores.clear()
+
+
+_CLASSES = {
+    'tesserocr': BackendTesserocr,
+    'pytesseract': BackendPytesseract,
+}
+
+
+def _instanciar(nome):
+    if nome not in _backends:
+        _backends[nome] = _CLASSES[nome]()
+    return _backends[nome]
+
+
+def backends_disponiveis():
+    """Lista os backends que podem ser carregados nesta máquina."""
+    disponiveis = []
+    for nome in _CLASSES:
+        try:
+            _instanciar(nome)
+            disponiveis.append(nome)
+        except Exception:
+            pass
+    return disponiveis
+
+
+def obter_backend(nome=None):
+    """
+    Retorna o backend deste processo (criado uma vez e reaproveitado).
+
+    Ordem de escolha: argumento > 'backend_ocr' do config.json > variável
+    OCR_BACKEND > tesserocr se instalado > pytesseract.
+    """
+    pedido = nome or None
+    if pedido in _escolhas:
+        return _escolhas[pedido]
+
+    if not nome:
+        try:
+            nome = (load_config() or {}).get('backend_ocr')
+        except Exception:
+            nome = None
+        nome = nome or os.environ.get('OCR_BACKEND') or 'auto'
+
+    if nome in _escolhas:
+        return _escolhas[nome]
+
+    candidatos = ['tesserocr', 'pytesseract'] if nome == 'auto' else [nome, 'pytesseract']
+    backend = None
+    for candidato in candidatos:
+        try:
+            backend = _instanciar(candidato)
+            break
+        except Exception:
+            continue
+
+    _escolhas[nome] = backend
+    _escolhas[pedido] = backend
+    return backend
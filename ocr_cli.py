@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Linha de comando não interativa para processar lotes (cron, systemd, contêiner).
+
+Recebe arquivos, pastas ou padrões glob, processa tudo no pipeline em estágios
+(processamento_lote.processar_em_fluxo) e grava o texto em txt (um _texto.txt
+por imagem, como o menu), JSONL ou CSV (um arquivo só). Cada imagem concluída
+gera uma linha JSON de progresso na saída padrão; as mensagens do sistema vão
+para a saída de erro.
+
+Com --incremental o JSONL/CSV é acrescentado, não reescrito: as imagens sem
+alteração continuam com a linha da execução anterior e uma imagem
+reprocessada ganha uma linha nova (vale a última). Se o arquivo de
+resultados sumir, tudo é processado de novo.
+
+Uso:
+  python ocr_cli.py ENTRADA [ENTRADA ...] [--saida DIR] [--formato txt|jsonl|csv]
+                    [--workers N] [--tipo T] [--incremental] [--sem-historico] [--dry-run]
+
+  python ocr_cli.py imagens/ "scans/**/*.tif" --formato jsonl --workers 8
+
+Linhas de progresso (uma por linha, JSON):
+  {"evento": "imagem", "arquivo": ..., "ok": true, "branca": false, "tempo": 1.2, "confianca": 91.0, "n": 3, "total": 40}
+  {"evento": "resumo", "total": 40, "ok": 39, "falhas": 1, "ignoradas": 0, "tempo_total": 12.3, ...}
+
+Códigos de saída:
+  0 tudo certo (ou nada a fazer)   1 algumas imagens falharam   2 erro de uso / entrada inexistente
+  3 todas as imagens falharam      130 interrompido com Ctrl-C
+"""
+import argparse
+import contextlib
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+from ocr_funcoes import eh_imagem, listar_imagens, confianca_de
+from processamento_lote import processar_em_fluxo, numero_workers
+from manifesto import ManifestoOCR
+from trabalhos import interrupcao_suave
+from pagina_branca import eh_branca
+
+try:
+    from cdigo.history import GerenciadorDocumentos
+except Exception:
+    from history import GerenciadorDocumentos
+
+
+SAIDA_OK = 0
+SAIDA_FALHAS = 1
+SAIDA_USO = 2
+SAIDA_TODAS_FALHARAM = 3
+SAIDA_INTERROMPIDO = 130
+
+FORMATOS = ('txt', 'jsonl', 'csv')
+COLUNAS_CSV = ['arquivo', 'ok', 'branca', 'tempo', 'confianca', 'paginas', 'erro', 'texto']
+
+
+def expandir_entradas(entradas):
+    """
+    Resolve arquivos, pastas (só o primeiro nível) e globs (`**` é recursivo)
+    em caminhos absolutos de imagens, sem repetir. Retorna (imagens, não encontradas).
+    """
+    imagens = []
+    vistos = set()
+    nao_encontradas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            caminhos = [os.path.join(entrada, nome) for nome in sorted(listar_imagens(entrada))]
+        elif os.path.isfile(entrada):
+            caminhos = [entrada]
+        else:
+            caminhos = [c for c in sorted(glob.glob(entrada, recursive=True)) if os.path.isfile(c) and eh_imagem(c)]
+            if not caminhos:
+                nao_encontradas.append(entrada)
+        for caminho in caminhos:
+            caminho = os.path.abspath(caminho)
+            if caminho not in vistos:
+                vistos.add(caminho)
+                imagens.append(caminho)
+    return imagens, nao_encontradas
+
+
+def agrupar_por_pasta(imagens):
+    """{pasta: [nomes]} na ordem de chegada (o pipeline trabalha com nomes relativos a uma pasta)."""
+    pastas = {}
+    for caminho in imagens:
+        pastas.setdefault(os.path.dirname(caminho), []).append(os.path.basename(caminho))
+    return pastas
+
+
+def _ok(resultado):
+    """Texto extraído ou página em branco reconhecida (que não é falha)."""
+    return bool(resultado['texto']) or eh_branca(resultado)
+
+
+class _Progresso:
+    """Escreve as linhas JSON de progresso (uma por evento) na saída padrão."""
+
+    def __init__(self, fluxo, total):
+        self.fluxo = fluxo
+        self.total = total
+        self.n = 0
+
+    def emitir(self, evento, **dados):
+        linha = {'evento': evento}
+        linha.update(dados)
+        self.fluxo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        self.fluxo.flush()
+
+    def imagem(self, caminho, resultado):
+        self.n += 1
+        self.emitir('imagem', arquivo=caminho, ok=_ok(resultado), branca=eh_branca(resultado),
+                    tempo=round(resultado['tempo'], 3),
+                    confianca=round(confianca_de(resultado), 1), paginas=len(resultado.get('paginas') or []) or 1,
+                    erro=resultado['erro'], n=self.n, total=self.total)
+
+
+class _Gravador:
+    """Grava os resultados em um único arquivo JSONL ou CSV (no formato txt o pipeline grava sozinho)."""
+
+    def __init__(self, formato, caminho, acrescentar=False):
+        self.formato = formato
+        novo = not acrescentar or not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        self.arquivo = open(caminho, 'w' if novo else 'a', encoding='utf-8', newline='')
+        self.csv = None
+        if formato == 'csv':
+            self.csv = csv.DictWriter(self.arquivo, fieldnames=COLUNAS_CSV)
+            if novo:
+                self.csv.writeheader()
+
+    def gravar(self, caminho, resultado):
+        registro = {
+            'arquivo': caminho,
+            'ok': _ok(resultado),
+            'branca': eh_branca(resultado),
+            'tempo': round(resultado['tempo'], 3),
+            'confianca': round(confianca_de(resultado), 1),
+            'paginas': len(resultado.get('paginas') or []) or 1,
+            'erro': resultado['erro'],
+            'texto': resultado['texto'] or '',
+        }
+        if self.csv is not None:
+            self.csv.writerow(registro)
+        else:
+            registro['metadados'] = resultado.get('metadados') or {}
+            self.arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        self.arquivo.flush()
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+def executar(args, progresso):
+    """Processa as entradas de `args`; retorna o código de saída."""
+    imagens, nao_encontradas = expandir_entradas(args.entradas)
+    for entrada in nao_encontradas:
+        progresso.emitir('erro', entrada=entrada, erro="entrada não encontrada")
+    if nao_encontradas and not args.ignorar_ausentes:
+        return SAIDA_USO
+
+    pastas = agrupar_por_pasta(imagens)
+    manifestos = {pasta: ManifestoOCR(pasta) for pasta in pastas} if args.incremental else {}
+    ignoradas = 0
+    arquivo_resultados = None
+    if args.formato != 'txt':
+        arquivo_resultados = args.arquivo or os.path.join(args.saida, "resultados." + args.formato)
+    try:
+        if args.incremental:
+            destino_txt = args.saida if args.formato == 'txt' else None
+            for pasta, nomes in pastas.items():
+                pendentes = manifestos[pasta].pendentes(nomes, destino_txt, arquivo_resultados)
+                ignoradas += len(nomes) - len(pendentes)
+                pastas[pasta] = pendentes
+        total = sum(len(nomes) for nomes in pastas.values())
+        progresso.total = total
+
+        if args.dry_run:
+            for pasta, nomes in pastas.items():
+                for nome in nomes:
+                    progresso.emitir('planejado', arquivo=os.path.join(pasta, nome))
+            progresso.emitir('resumo', total=total, ok=0, falhas=0, ignoradas=ignoradas, tempo_total=0.0,
+                             dry_run=True, workers=numero_workers(args.workers))
+            return SAIDA_OK
+
+        os.makedirs(args.saida, exist_ok=True)
+        gravador = None
+        if arquivo_resultados:
+            gravador = _Gravador(args.formato, arquivo_resultados, acrescentar=args.incremental)
+        gerenciador = None if args.sem_historico else GerenciadorDocumentos(args.saida)
+
+        ok = falhas = 0
+        inicio = time.perf_counter()
+        parar = threading.Event()
+        try:
+            with interrupcao_suave(parar):
+                for pasta, nomes in pastas.items():
+                    entrada = (nome for nome in nomes if not parar.is_set())
+                    for resultado in processar_em_fluxo(entrada, pasta, args.saida if gravador is None else None,
+                                                        gerenciador, args.tipo, workers=args.workers,
+                                                        manifesto=manifestos.get(pasta)):
+                        caminho = os.path.join(pasta, resultado['arquivo'])
+                        if gravador is not None:
+                            gravador.gravar(caminho, resultado)
+                        progresso.imagem(caminho, resultado)
+                        if _ok(resultado):
+                            ok += 1
+                        else:
+                            falhas += 1
+        finally:
+            if gravador is not None:
+                gravador.fechar()
+
+        tempo_total = time.perf_counter() - inicio
+        progresso.emitir('resumo', total=total, ok=ok, falhas=falhas, ignoradas=ignoradas,
+                         tempo_total=round(tempo_total, 3),
+                         imagens_por_segundo=round((ok + falhas) / tempo_total, 2) if tempo_total > 0 else 0.0,
+                         interrompido=parar.is_set(), workers=numero_workers(args.workers))
+    finally:
+        for manifesto in manifestos.values():
+            manifesto.fechar()
+
+    if parar.is_set():
+        return SAIDA_INTERROMPIDO
+    if falhas and not ok:
+        return SAIDA_TODAS_FALHARAM
+    if falhas or (nao_encontradas and not total):
+        return SAIDA_FALHAS
+    return SAIDA_OK
+
+
+def main(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Processa imagens em lote sem interação (para scripts e cron)")
+    parser.add_argument('entradas', nargs='+', help="Arquivos, pastas ou padrões glob (use aspas: \"scans/**/*.png\")")
+    parser.add_argument('--saida', default=os.path.join(project_root, "resultados", "textos_extraidos"),
+                        help="Pasta dos resultados e do histórico")
+    parser.add_argument('--formato', choices=FORMATOS, default='txt',
+                        help="txt: um _texto.txt por imagem; jsonl/csv: um arquivo com todos os resultados")
+    parser.add_argument('--arquivo', help="Caminho do arquivo JSONL/CSV (padrão: <saida>/resultados.<formato>)")
+    parser.add_argument('--workers', type=int, default=None, help="Processos de OCR (padrão: config.json ou núcleos)")
+    parser.add_argument('--tipo', default="genérico", help="Tipo de documento registrado no histórico")
+    parser.add_argument('--incremental', action='store_true', help="Pula o que não mudou desde a última execução")
+    parser.add_argument('--sem-historico', action='store_true', help="Não registra no histórico de documentos")
+    parser.add_argument('--ignorar-ausentes', action='store_true', help="Entradas inexistentes não abortam o lote")
+    parser.add_argument('--dry-run', action='store_true', help="Só lista o que seria processado")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers precisa ser pelo menos 1")
+
+    # A saída padrão fica só com as linhas JSON; as mensagens do sistema vão para stderr
+    progresso = _Progresso(sys.stdout, 0)
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            return executar(args, progresso)
+        except KeyboardInterrupt:
+            return SAIDA_INTERROMPIDO
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
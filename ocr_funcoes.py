@@ -2,6 +2,7 @@
 import pytesseract
 from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageFilter
 import os
+import time
 import cv2
 import numpy as np
 
@@ -10,86 +11,467 @@ from tesseract_config import apply_to_environment
 # Ensure we have consistent TESSDATA_PREFIX and pytesseract settings across modules
 apply_to_environment()
 
-def processar_imagem(nome_arquivo, imagens_dir):
+from ocr_backends import obter_backend
+from cache_ocr import obter_cache, hash_arquivo, montar_chave
+from leitura_imagem import abrir_imagem
+from duplicatas import obter_indice, assinatura_visual
+from pagina_branca import pagina_em_branco, eh_branca, assinatura as assinatura_branca
+from paginas import carregar_pagina, iterar_paginas
+from preprocessamento import carregar_cinza, cinza_de_pil, preparar, assinatura as assinatura_preprocessamento
+from niveis_ocr import reconhecer_adaptativo, assinatura as assinatura_niveis
+from faixas_ocr import planejar_faixas, reconhecer_em_faixas, assinatura as assinatura_faixas
+
+# Configurações do Tesseract otimizadas para português
+# PSM 3 = segmentação automática (melhor para documentos)
+# O OCR principal usa os níveis de niveis_ocr; esta é a config do nível 'padrao'
+CONFIG_TESSERACT = '--oem 3 --psm 3 -l por'
+
+
+class ResultadoOCR(str):
+    """
+    Texto extraído (continua sendo uma str, como o retorno antigo de
+    processar_imagem) com os dados do mesmo reconhecimento como atributos:
+    confianca (média, 0-100), confianca_min, palavras, tempo e metadados.
+    """
+
+    def __new__(cls, texto, metadados=None):
+        resultado = super().__new__(cls, texto or '')
+        resultado.metadados = metadados or {}
+        resultado.confianca = float(resultado.metadados.get('confianca') or 0.0)
+        resultado.confianca_min = float(resultado.metadados.get('confianca_min') or 0.0)
+        resultado.palavras = int(resultado.metadados.get('palavras') or 0)
+        resultado.tempo = float(resultado.metadados.get('tempo') or 0.0)
+        return resultado
+
+
+def processar_imagem(nome_arquivo, imagens_dir, pagina=None):
     """
     Processa uma imagem e extrai texto usando OCR
+
+    Retorna um ResultadoOCR (o texto, com confiança, nº de palavras e tempo)
+    ou None em caso de erro.
+    """
+    resultado = processar_imagem_detalhado(nome_arquivo, imagens_dir, pagina)
+    return ResultadoOCR(resultado['texto'], resultado['metadados']) if resultado else None
+
+
+def confianca_de(resultado):
+    """Confiança média (0-100) de um retorno de processar_imagem, _detalhado ou do lote; 0 se não houver."""
+    if resultado is None:
+        return 0.0
+    if isinstance(resultado, ResultadoOCR):
+        return resultado.confianca
+    if isinstance(resultado, dict):
+        return float((resultado.get('metadados') or {}).get('confianca') or 0.0)
+    return 0.0
+
+
+def observacao_historico(resultado):
+    """Texto da coluna Observação do histórico: página em branco, duplicata de outra imagem ou vazio."""
+    metadados = getattr(resultado, 'metadados', None)
+    if metadados is None and isinstance(resultado, dict):
+        metadados = resultado.get('metadados')
+    metadados = metadados or {}
+    if metadados.get('pagina_branca'):
+        return "página em branco"
+    if metadados.get('duplicata_de'):
+        return f"duplicata de {metadados['duplicata_de']}"
+    if metadados.get('paginas_brancas'):
+        return f"{metadados['paginas_brancas']} página(s) em branco"
+    return ""
+
+
+def processar_imagem_detalhado(nome_arquivo, imagens_dir, pagina=None):
+    """
+    Igual a processar_imagem, mas retorna {'texto', 'metadados'} (ou None).
+
+    Consulta o cache de OCR antes de decodificar: uma imagem já vista com a
+    mesma config custa apenas o hash dos bytes. Uma cópia quase idêntica de
+    outra imagem já reconhecida (duplicatas.py) reaproveita o texto dela, com
+    'duplicata_de' nos metadados. Uma página em branco (pagina_branca.py) não
+    passa pelo OCR: volta com texto vazio e 'pagina_branca' nos metadados. Com `pagina` (base 0) processa
+    só aquela página de um TIFF/PDF; sem ela, documentos com várias páginas são
+    processados inteiros por processar_documento.
     """
     try:
         # Caminho completo da imagem
         caminho_imagem = os.path.join(imagens_dir, nome_arquivo)
         
-        # Verificar se arquivo existe
-        if not os.path.exists(caminho_imagem):
+        # Uma única abertura valida o arquivo, dá o hash do cache e alimenta o decodificador
+        try:
+            arquivo = abrir_imagem(caminho_imagem)
+        except FileNotFoundError:
             print(f"❌ Arquivo não encontrado: {caminho_imagem}")
             return None
-        
-        # Verificar se arquivo é válido (tamanho > 0)
-        if os.path.getsize(caminho_imagem) == 0:
+        except ValueError:
             print(f"❌ Arquivo vazio: {nome_arquivo}")
             return None
-        
-        print(f"🔄 Processando: {nome_arquivo}")
-        
-        # Pré-processamento da imagem (retorna PIL.Image)
-        imagem_processada = preprocessar_imagem(caminho_imagem)
-        
-        if imagem_processada is None:
-            print(f"❌ Não foi possível processar a imagem: {nome_arquivo}")
-            return None
 
-        # Configurações do Tesseract otimizadas para português
-        # PSM 3 = segmentação automática (melhor para documentos)
-        config = '--oem 3 --psm 3 -l por'
+        if pagina is None and arquivo.paginado():
+            arquivo.fechar()
+            return processar_documento(nome_arquivo, imagens_dir)
 
-        # Extrair texto (garantir que é PIL.Image)
-        texto = pytesseract.image_to_string(imagem_processada, config=config)
-        
-        print(f"✅ Concluído: {nome_arquivo}")
-        return texto.strip()
-        
+        with arquivo:
+            rotulo = nome_arquivo if pagina is None else f"{nome_arquivo} [pág. {pagina + 1}]"
+            # Uma página avulsa de TIFF/PDF não carrega o documento inteiro: hash em blocos
+            chave = _chave_cache(_hash_para_cache(caminho_imagem, arquivo if pagina is None else None), pagina)
+            em_cache = consultar_cache(chave, nome_arquivo)
+            if em_cache is not None:
+                print(f"♻️ Cache: {rotulo}")
+                return em_cache
+
+            print(f"🔄 Processando: {rotulo}")
+            inicio = time.perf_counter()
+
+            # Pré-processamento em NumPy (array uint8 em cinza, sem ida e volta por PIL)
+            info_preprocessamento = {}
+            visual = None
+            if pagina is None:
+                cinza = carregar_cinza(arquivo, info_preprocessamento)
+                if cinza is None:
+                    print(f"❌ Não foi possível processar a imagem: {rotulo}")
+                    return None
+            else:
+                cinza = cinza_de_pil(carregar_pagina(caminho_imagem, pagina))
+        # Daqui em diante o arquivo (e o buffer com o conteúdo) já foi liberado
+
+        branca = pagina_em_branco(nome_arquivo, cinza, pagina)
+        if branca is not None:
+            branca['metadados']['tempo'] = time.perf_counter() - inicio
+            print(f"📄 Página em branco, OCR dispensado: {rotulo}")
+            return branca
+
+        if pagina is None:
+            duplicata, visual = procurar_duplicata(nome_arquivo, cinza, caminho_imagem)
+            if duplicata is not None:
+                duplicata['metadados']['tempo'] = time.perf_counter() - inicio
+                guardar_em_cache(chave, duplicata)
+                print(f"♻️ Duplicata de {duplicata['metadados']['duplicata_de']}: {rotulo}")
+                return duplicata
+        imagem_processada = preparar(cinza, info_preprocessamento)
+        del cinza
+
+        resultado = _reconhecer(nome_arquivo, imagem_processada, chave, pagina, inicio, info_preprocessamento)
+        registrar_duplicata(nome_arquivo, visual, resultado)
+        print(f"✅ Concluído: {rotulo}")
+        return resultado
+
+    except (TimeoutError, MemoryError):
+        # Falhas que o agendador tenta de novo e, persistindo, põe em quarentena
+        raise
     except Exception as e:
         print(f"❌ Erro ao processar {nome_arquivo}: {e}")
         return None
 
+
+def processar_documento(nome_arquivo, imagens_dir):
+    """
+    Processa em sequência todas as páginas de um TIFF/PDF, uma página por vez
+    na memória. Retorna {'texto', 'metadados', 'paginas'}.
+    (Para OCR paralelo das páginas use processamento_lote.processar_lote.)
+    """
+    caminho = os.path.join(imagens_dir, nome_arquivo)
+    hash_conteudo = _hash_para_cache(caminho)
+    paginas = {}
+
+    def em_cache(indice):
+        resultado = consultar_cache(_chave_cache(hash_conteudo, indice), nome_arquivo)
+        if resultado is not None:
+            paginas[indice] = resultado
+            return True
+        return False
+
+    print(f"🔄 Processando documento: {nome_arquivo}")
+    for indice, pagina in iterar_paginas(caminho, pular=em_cache):
+        if pagina is None:
+            continue
+        inicio = time.perf_counter()
+        try:
+            info_preprocessamento = {}
+            cinza = cinza_de_pil(pagina)
+            branca = pagina_em_branco(nome_arquivo, cinza, indice)
+            if branca is not None:
+                branca['metadados']['tempo'] = time.perf_counter() - inicio
+                paginas[indice] = branca
+                del cinza, pagina
+                continue
+            imagem_processada = preparar(cinza, info_preprocessamento)
+            del cinza
+            paginas[indice] = _reconhecer(nome_arquivo, imagem_processada, _chave_cache(hash_conteudo, indice),
+                                          indice, inicio, info_preprocessamento)
+        except (TimeoutError, MemoryError):
+            raise
+        except Exception as e:
+            print(f"❌ Erro na página {indice + 1} de {nome_arquivo}: {e}")
+            paginas[indice] = {'texto': '', 'metadados': {'pagina': indice}, 'erro': str(e)}
+        del pagina
+
+    print(f"✅ Concluído: {nome_arquivo} ({len(paginas)} página(s))")
+    return montar_resultado_documento(nome_arquivo, [paginas[i] for i in sorted(paginas)])
+
+
+def montar_resultado_documento(nome_arquivo, paginas):
+    """Junta os resultados de cada página (em ordem) num resultado de documento."""
+    partes = []
+    for resultado in paginas:
+        numero = resultado['metadados'].get('pagina', 0) + 1
+        partes.append(f"--- Página {numero} ---\n{resultado['texto'] or ''}")
+
+    tem_texto = any(resultado['texto'] for resultado in paginas)
+    brancas = sum(1 for resultado in paginas if eh_branca(resultado))
+    # Confiança do documento: média ponderada pelo nº de palavras de cada página
+    palavras = sum(r['metadados'].get('palavras', 0) for r in paginas)
+    com_palavras = [r['metadados'] for r in paginas if r['metadados'].get('palavras')]
+    metadados = {
+        'arquivo': nome_arquivo,
+        'paginas': len(paginas),
+        'tempo': round(sum(r['metadados'].get('tempo', 0) for r in paginas), 4),
+        'cache': bool(paginas) and all(r['metadados'].get('cache') for r in paginas),
+        'palavras': palavras,
+        'confianca': round(sum(m['confianca'] * m['palavras'] for m in com_palavras) / palavras, 1) if palavras else 0.0,
+        'confianca_min': min((m.get('confianca_min', 0.0) for m in com_palavras), default=0.0),
+    }
+    if brancas:
+        metadados['paginas_brancas'] = brancas
+        metadados['pagina_branca'] = brancas == len(paginas)
+    return {
+        'texto': '\n\n'.join(partes) if tem_texto else '',
+        'metadados': metadados,
+        'paginas': paginas,
+    }
+
+
+def _hash_para_cache(caminho, arquivo=None):
+    if obter_cache() is None:
+        return None
+    try:
+        if arquivo is not None:
+            return arquivo.hash()
+        return hash_arquivo(caminho)
+    except Exception as e:
+        print(f"⚠️ Cache ignorado para {caminho}: {e}")
+        return None
+
+
+def assinatura_processamento():
+    """Tudo o que, além da imagem, muda o texto extraído: níveis de OCR, pré-processamento e motor."""
+    backend = obter_backend()
+    return (f"{assinatura_niveis()}{assinatura_faixas()}|pre{assinatura_preprocessamento()}|branca{assinatura_branca()}"
+            f"|{backend.nome} {backend.versao()}")
+
+
+def _chave_cache(hash_conteudo, pagina=None):
+    if hash_conteudo is None:
+        return None
+    if pagina is not None:
+        hash_conteudo = f"{hash_conteudo}#p{pagina}"
+    return montar_chave(hash_conteudo, assinatura_niveis() + assinatura_faixas(), assinatura_preprocessamento(),
+                        obter_backend().versao())
+
+
+def consultar_cache(chave, nome_arquivo):
+    cache = obter_cache()
+    if cache is None or chave is None:
+        return None
+    try:
+        em_cache = cache.obter(chave)
+    except Exception as e:
+        print(f"⚠️ Cache ignorado para {nome_arquivo}: {e}")
+        return None
+    if em_cache is not None:
+        em_cache['metadados']['cache'] = True
+        em_cache['metadados']['arquivo'] = nome_arquivo
+    return em_cache
+
+
+def chave_cache(caminho, pagina=None, arquivo=None):
+    """
+    Chave do cache de OCR para o arquivo (ou a página `pagina`); None se o
+    cache estiver desligado. Com `arquivo` (ArquivoImagem já aberto) o hash
+    sai do buffer dele, sem ler o arquivo de novo.
+    """
+    return _chave_cache(_hash_para_cache(caminho, arquivo), pagina)
+
+
+def guardar_em_cache(chave, resultado):
+    cache = obter_cache()
+    if cache is None or chave is None:
+        return
+    try:
+        cache.guardar(chave, resultado['texto'], resultado['metadados'])
+    except Exception as e:
+        print(f"⚠️ Não foi possível gravar no cache: {e}")
+
+
+def procurar_duplicata(nome_arquivo, cinza, caminho=None):
+    """
+    Procura no índice de duplicatas uma imagem quase idêntica a `cinza` já
+    reconhecida com a mesma assinatura de processamento (conferida contra o
+    arquivo original, ver duplicatas.py). Retorna (resultado reaproveitado ou
+    None, assinatura visual para registrar_duplicata ou None). Sem o `caminho`
+    do arquivo a imagem não entra no índice.
+    """
+    indice = obter_indice()
+    if indice is None:
+        return None, None
+    try:
+        visual = assinatura_visual(cinza, caminho)
+        original = indice.procurar(visual, assinatura_processamento(), cinza)
+    except Exception as e:
+        print(f"⚠️ Deduplicação ignorada para {nome_arquivo}: {e}")
+        return None, None
+    if original is None:
+        return None, visual
+    metadados = dict(original['metadados'])
+    metadados.update(arquivo=nome_arquivo, cache=False, tempo=0.0,
+                     duplicata_de=original['arquivo'], distancia_duplicata=original['distancia'])
+    return {'texto': original['texto'], 'metadados': metadados}, None
+
+
+def registrar_duplicata(nome_arquivo, visual, resultado):
+    """Inclui no índice de duplicatas uma imagem recém-reconhecida (`visual` de procurar_duplicata)."""
+    indice = obter_indice()
+    if indice is None or visual is None or not resultado or not resultado.get('texto'):
+        return
+    try:
+        indice.registrar(visual, assinatura_processamento(), nome_arquivo, resultado)
+    except Exception as e:
+        print(f"⚠️ Não foi possível registrar {nome_arquivo} no índice de duplicatas: {e}")
+
+
+def reconhecer_preparada(nome_arquivo, imagem_processada, pagina=None, info_preprocessamento=None, inicio=None):
+    """
+    OCR de uma imagem já pré-processada, sem passar pelo cache.
+    Retorna {'texto', 'metadados'}; 'tempo' conta a partir de `inicio` (ou do início do OCR).
+    Imagens muito grandes são reconhecidas em faixas paralelas (faixas_ocr).
+    """
+    if inicio is None:
+        inicio = time.perf_counter()
+
+    faixas = planejar_faixas(imagem_processada)
+    if faixas:
+        ocr = reconhecer_em_faixas(imagem_processada, faixas)
+    else:
+        # Extrair texto pelo backend do processo, escalando de nível só se a confiança for baixa.
+        # Texto e confianças saem da mesma passada do OCR
+        ocr = reconhecer_adaptativo(obter_backend(), imagem_processada)
+    return montar_resultado_ocr(nome_arquivo, ocr, imagem_processada.shape, pagina, info_preprocessamento, inicio)
+
+
+def montar_resultado_ocr(nome_arquivo, ocr, forma, pagina=None, info_preprocessamento=None, inicio=None):
+    """
+    {'texto', 'metadados'} a partir do dict de reconhecer_adaptativo (ou de
+    faixas_ocr.juntar_faixas) e da forma (altura, largura) da imagem reconhecida.
+    """
+    texto = ocr['texto']
+    confiancas = ocr['confiancas']
+
+    metadados = {
+        'arquivo': nome_arquivo,
+        'config': ocr['config'],
+        'nivel': ocr['nivel'],
+        'confianca': round(ocr['confianca'], 1),
+        'confianca_min': round(min(confiancas), 1) if confiancas else 0.0,
+        'palavras': len(confiancas),
+        'tempo_niveis': ocr['tempo_niveis'],
+        'backend': ocr.get('backend') or obter_backend().nome,
+        'largura': int(forma[1]),
+        'altura': int(forma[0]),
+        'tempo': round(time.perf_counter() - inicio, 4) if inicio is not None else 0.0,
+    }
+    if pagina is not None:
+        metadados['pagina'] = pagina
+    if ocr.get('faixas'):
+        metadados['faixas'] = ocr['faixas']
+    # Ex.: escala aplicada pela normalização de resolução
+    metadados.update(info_preprocessamento or {})
+    return {'texto': texto, 'metadados': metadados}
+
+
+def _reconhecer(nome_arquivo, imagem_processada, chave, pagina, inicio, info_preprocessamento=None):
+    resultado = reconhecer_preparada(nome_arquivo, imagem_processada, pagina, info_preprocessamento, inicio)
+    guardar_em_cache(chave, resultado)
+    resultado['metadados']['cache'] = False
+    return resultado
+
+
+def preprocessar_pil(pil):
+    """
+    Mesma melhoria de preprocessar_imagem, para uma imagem PIL já carregada
+    (ex.: uma página de TIFF/PDF)
+    """
+    # Converter para escala de cinza, aumentar contraste e aplicar sharpen
+    pil = pil.convert('L')
+    pil = ImageOps.autocontrast(pil, cutoff=2)
+    pil = pil.filter(ImageFilter.SHARPEN)
+    return pil
+
+
 def preprocessar_imagem(caminho_imagem):
     """
-    Melhora a qualidade da imagem para melhor OCR
+    Melhora a qualidade da imagem para melhor OCR (cadeia fixa antiga, em PIL,
+    mantida como referência dos benchmarks; o OCR usa preprocessamento.preparar,
+    configurável por perfil)
     """
     try:
-        # Ler imagem com cv2
-        imagem = cv2.imread(caminho_imagem)
-
-        # Verificar se a imagem foi carregada
-        if imagem is None:
-            print(f"⚠️ cv2 não conseguiu ler a imagem, tentando PIL...")
-            try:
-                pil = Image.open(caminho_imagem)
-                # Validar que a imagem é válida
-                pil.verify()
-                pil = Image.open(caminho_imagem)  # Reabrir após verify
-                pil = pil.convert('L')
-                pil = ImageOps.autocontrast(pil, cutoff=2)
-                pil = pil.filter(ImageFilter.SHARPEN)
-                return pil
-            except Exception as e:
-                print(f"⚠️ PIL também falhou: {e}")
-                return None
+        # Arquivo lido uma vez: cv2, validação e PIL usam o mesmo buffer
+        with abrir_imagem(caminho_imagem) as arquivo:
+            imagem = arquivo.decodificar(cv2.IMREAD_COLOR)
+
+            # Verificar se a imagem foi carregada
+            if imagem is None:
+                print(f"⚠️ cv2 não conseguiu ler a imagem, tentando PIL...")
+                try:
+                    # Validar que a imagem é válida
+                    with arquivo.pil() as pil:
+                        pil.verify()
+                    # verify() inutiliza o objeto: reabre do buffer, sem ler o disco de novo
+                    return preprocessar_pil(arquivo.pil())
+                except Exception as e:
+                    print(f"⚠️ PIL também falhou: {e}")
+                    return None
 
         # Converter para RGB e criar PIL image
         rgb = cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB)
         pil = Image.fromarray(rgb)
 
-        # Converter para escala de cinza, aumentar contraste e aplicar sharpen
-        pil = pil.convert('L')
-        pil = ImageOps.autocontrast(pil, cutoff=2)
-        pil = pil.filter(ImageFilter.SHARPEN)
-
-        return pil
+        return preprocessar_pil(pil)
         
     except Exception as e:
         print(f"⚠️ Erro fatal no pré-processamento: {e}")
         return None
 
+FONTES_SISTEMA = [r"C:\\Windows\\Fonts\\arial.ttf", r"C:\\Windows\\Fonts\\calibri.ttf", "arial.ttf"]
+
+
+def carregar_fonte(tamanho=36, caminhos=None):
+    """Primeira fonte TrueType disponível em `caminhos` (ou a padrão do PIL)."""
+    for fpath in caminhos or FONTES_SISTEMA:
+        try:
+            return ImageFont.truetype(fpath, tamanho)
+        except Exception:
+            continue
+    try:
+        return ImageFont.load_default(size=tamanho)
+    except TypeError:
+        # PIL < 10.1 não aceita tamanho na fonte padrão
+        return ImageFont.load_default()
+
+
+def desenhar_documento(texto, fonte, tamanho=(1600, 1000), margem=40):
+    """Desenha `texto` (uma linha por \\n) em preto sobre uma página branca."""
+    img = Image.new('RGB', tamanho, color='white')
+    d = ImageDraw.Draw(img)
+    y_pos = margem
+    # Calcular altura da linha usando textbbox (compatível com PIL 10+)
+    bbox = fonte.getbbox("Ay")
+    line_height = (bbox[3] - bbox[1]) + 12 if bbox else 48
+    for linha in texto.split('\n'):
+        d.text((margem, y_pos), linha, fill='black', font=fonte)
+        y_pos += line_height
+    return img
+
+
 def criar_imagem_teste():
     """
     Cria uma imagem de teste simulando um documento
@@ -99,22 +481,6 @@ def criar_imagem_teste():
         project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         imagens_dir = os.path.join(project_root, "imagens")
         os.makedirs(imagens_dir, exist_ok=True)
-        # Criar imagem branca (maior para melhor OCR)
-        img = Image.new('RGB', (1600, 1000), color='white')
-        d = ImageDraw.Draw(img)
-
-        # Tentar usar uma fonte do sistema para melhor legibilidade
-        fonte = None
-        possiveis_fontes = [r"C:\\Windows\\Fonts\\arial.ttf", r"C:\\Windows\\Fonts\\calibri.ttf", "arial.ttf"]
-        for fpath in possiveis_fontes:
-            try:
-                fonte = ImageFont.truetype(fpath, 36)
-                break
-            except Exception:
-                fonte = None
-        if fonte is None:
-            fonte = ImageFont.load_default()
-        
         # Texto de teste (documento fictício)
         texto = """DOCUMENTO DE IDENTIFICACAO
 Nome: Maria Oliveira Santos
@@ -129,15 +495,8 @@ Este eh um documento de teste para validacao
 do sistema de reconhecimento optico de caracteres.
 Projeto de Estagio em Ciencia da Computacao."""
         
-        # Adicionar texto à imagem
-        linhas = texto.split('\n')
-        y_pos = 40
-        # Calcular altura da linha usando textbbox (compatível com PIL 10+)
-        bbox = fonte.getbbox("Ay")
-        line_height = (bbox[3] - bbox[1]) + 12 if bbox else 48
-        for linha in linhas:
-            d.text((40, y_pos), linha, fill='black', font=fonte)
-            y_pos += line_height
+        # Tentar usar uma fonte do sistema para melhor legibilidade
+        img = desenhar_documento(texto, carregar_fonte(36))
         
         # Salvar imagem em PNG com DPI para melhor qualidade
         caminho_salvar = os.path.join(imagens_dir, "documento_teste.png")
@@ -148,16 +507,22 @@ Projeto de Estagio em Ciencia da Computacao."""
         print(f"❌ Erro ao criar imagem teste: {e}")
         return False
 
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.pdf')
+
+
+def eh_imagem(nome_arquivo):
+    return nome_arquivo.lower().endswith(EXTENSOES_IMAGEM)
+
+
 def listar_imagens(imagens_dir):
     """
     Lista todas as imagens na pasta 'imagens'
     """
-    extensoes = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
     imagens = []
     
     try:
         for arquivo in os.listdir(imagens_dir):
-            if any(arquivo.lower().endswith(ext) for ext in extensoes):
+            if eh_imagem(arquivo):
                 imagens.append(arquivo)
     except Exception as e:
         print(f"❌ Erro ao listar imagens: {e}")
@@ -170,7 +535,7 @@ def extrair_texto_simples(caminho_imagem):
     """
     try:
         imagem = Image.open(caminho_imagem)
-        texto = pytesseract.image_to_string(imagem, lang='por')
+        texto = obter_backend().reconhecer(imagem, '-l por')
         return texto.strip()
     except Exception as e:
         return f"Erro: {e}"
\ No newline at end of file
@@ -13,6 +13,10 @@ sys.path.insert(0, current_dir)
 
 # Importar e rodar a GUI
 if __name__ == "__main__":
+    # Necessário para o pool de processos do executável (PyInstaller/Windows)
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     try:
         import customtkinter as ctk
         from gui_ocr import OCRguiModerna
@@ -0,0 +1,166 @@
+"""
+Rejeição rápida de páginas em branco (ou quase) antes do OCR.
+
+Lotes de scanners duplex trazem muitos versos em branco, e cada um custaria
+uma passada inteira do Tesseract. Logo depois da decodificação, uma amostra
+da página (um pixel a cada `passo`, até LADO_AMOSTRA pixels no lado maior,
+sem as margens, onde ficam bordas do scanner e furos) passa por três
+estatísticas vetorizadas:
+
+  desvio       desvio-padrão dos níveis de cinza; abaixo de 'branca_desvio_minimo' a página é lisa
+  tinta        fração de pixels a mais de 'branca_contraste' níveis do fundo (a mediana);
+               o decalque do verso e o ruído do papel ficam abaixo disso
+  componentes  manchas de tinta conectadas com pelo menos AREA_MINIMA pixels (poeira isolada não conta)
+
+A página é considerada em branco se for lisa, ou se tiver no máximo
+'branca_tinta_maxima' de tinta e no máximo 'branca_componentes_maximos'
+componentes. Páginas com bastante tinta saem antes da contagem de
+componentes, então o custo fica em poucos milissegundos mesmo em A4 a 300 dpi.
+
+Uma página em branco não vai para o OCR: o resultado tem texto vazio,
+'pagina_branca': True nos metadados e é registrado no histórico como
+"página em branco".
+
+Config: 'paginas_brancas' (padrão True) e os limites acima.
+
+API:
+  classificar(cinza, limites=None) -> {'branca', 'desvio', 'tinta', 'componentes'}
+  pagina_em_branco(nome_arquivo, cinza, pagina=None) -> resultado {'texto': '', 'metadados'} ou None
+  eh_branca(resultado) -> bool
+  limites_configurados() -> dict (None se a rejeição estiver desligada)
+  assinatura() -> str com os limites em uso (entra na assinatura do processamento)
+"""
+import cv2
+import numpy as np
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+LADO_AMOSTRA = 1024
+MARGEM = 0.06
+AREA_MINIMA = 4
+
+LIMITES_PADRAO = {
+    'branca_desvio_minimo': 2.0,
+    'branca_contraste': 60,
+    'branca_tinta_maxima': 0.001,
+    'branca_componentes_maximos': 5,
+}
+
+_limites = None
+_limites_carregados = False
+
+
+def limites_configurados():
+    """Limites do config.json (com os padrões); None se 'paginas_brancas' estiver desligado."""
+    global _limites, _limites_carregados
+    if not _limites_carregados:
+        _limites = _ler_limites()
+        _limites_carregados = True
+    return _limites
+
+
+def _ler_limites():
+    try:
+        cfg = load_config() or {}
+    except Exception:
+        cfg = {}
+    if not cfg.get('paginas_brancas', True):
+        return None
+    limites = dict(LIMITES_PADRAO)
+    for chave, padrao in LIMITES_PADRAO.items():
+        try:
+            limites[chave] = type(padrao)(cfg.get(chave, padrao))
+        except (TypeError, ValueError):
+            pass
+    return limites
+
+
+def assinatura():
+    limites = limites_configurados()
+    if limites is None:
+        return "off"
+    return ",".join(f"{limites[chave]:g}" for chave in sorted(limites))
+
+
+def _amostra(cinza):
+    altura, largura = cinza.shape[:2]
+    passo = max(1, max(altura, largura) // LADO_AMOSTRA)
+    my, mx = int(altura * MARGEM), int(largura * MARGEM)
+    return np.ascontiguousarray(cinza[my:altura - my:passo, mx:largura - mx:passo])
+
+
+def classificar(cinza, limites=None):
+    """Estatísticas de tinta da página e se ela está em branco segundo `limites`."""
+    limites = limites or LIMITES_PADRAO
+    amostra = _amostra(cinza)
+    if amostra.size == 0:
+        return {'branca': False, 'desvio': 0.0, 'tinta': 0.0, 'componentes': 0}
+
+    _, desvio = cv2.meanStdDev(amostra)
+    desvio = float(desvio[0, 0])
+    classificacao = {'branca': True, 'desvio': round(desvio, 2), 'tinta': 0.0, 'componentes': 0}
+    if desvio < limites['branca_desvio_minimo']:
+        return classificacao
+
+    acumulado = np.cumsum(cv2.calcHist([amostra], [0], None, [256], [0, 256]).ravel())
+    fundo = int(np.searchsorted(acumulado, acumulado[-1] / 2))
+    _, tinta = cv2.threshold(cv2.absdiff(amostra, np.full_like(amostra, fundo)),
+                             limites['branca_contraste'], 1, cv2.THRESH_BINARY)
+    fracao = cv2.countNonZero(tinta) / tinta.size
+    classificacao['tinta'] = round(fracao, 6)
+    if fracao > limites['branca_tinta_maxima']:
+        classificacao['branca'] = False
+        return classificacao
+
+    # Pouca tinta: conta as manchas só no retângulo que contém toda a tinta
+    x, y, w, h = cv2.boundingRect(tinta)
+    componentes = 0
+    if w and h:
+        _, _, estatisticas, _ = cv2.connectedComponentsWithStats(tinta[y:y + h, x:x + w], connectivity=8)
+        componentes = int(np.count_nonzero(estatisticas[1:, cv2.CC_STAT_AREA] >= AREA_MINIMA))
+    classificacao['componentes'] = componentes
+    classificacao['branca'] = componentes <= limites['branca_componentes_maximos']
+    return classificacao
+
+
+def pagina_em_branco(nome_arquivo, cinza, pagina=None):
+    """
+    Resultado de OCR vazio para uma página em branco, ou None (página com
+    conteúdo, rejeição desligada ou erro na classificação). 'tempo' fica em 0:
+    quem chama soma o próprio tempo.
+    """
+    limites = limites_configurados()
+    if limites is None:
+        return None
+    try:
+        classificacao = classificar(cinza, limites)
+    except Exception as e:
+        print(f"⚠️ Detecção de página em branco ignorada para {nome_arquivo}: {e}")
+        return None
+    if not classificacao.pop('branca'):
+        return None
+    metadados = {
+        'arquivo': nome_arquivo,
+        'pagina_branca': True,
+        'classificacao_branca': classificacao,
+        'cache': False,
+        'tempo': 0.0,
+        'palavras': 0,
+        'confianca': 0.0,
+        'confianca_min': 0.0,
+    }
+    if pagina is not None:
+        metadados['pagina'] = pagina
+    return {'texto': '', 'metadados': metadados}
+
+
+def eh_branca(resultado):
+    """True se o resultado (dict ou ResultadoOCR) é de uma página/documento em branco."""
+    metadados = getattr(resultado, 'metadados', None)
+    if metadados is None and isinstance(resultado, dict):
+        metadados = resultado.get('metadados')
+    return bool((metadados or {}).get('pagina_branca'))
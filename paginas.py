@@ -0,0 +1,150 @@
+"""
+Leitura página a página de documentos com várias páginas (TIFF multipágina e PDF).
+
+Cada página é decodificada só quando pedida, então um documento de 300 páginas
+nunca é carregado inteiro na memória. PDFs usam pypdfium2 (ou pdf2image como
+alternativa); se nenhum estiver instalado, PDFs geram erro explicativo.
+
+API:
+  eh_documento_paginado(caminho) -> bool
+  contar_paginas(caminho) -> int
+  carregar_pagina(caminho, indice, dpi=300) -> PIL.Image
+  iterar_paginas(caminho, dpi=300, pular=None) -> gerador de (indice, PIL.Image)
+"""
+from PIL import Image
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+EXTENSOES_TIFF = ('.tif', '.tiff')
+EXTENSOES_PDF = ('.pdf',)
+DPI_PADRAO = 300
+
+
+def _dpi(dpi=None):
+    if dpi:
+        return dpi
+    try:
+        return int((load_config() or {}).get('dpi_pdf') or DPI_PADRAO)
+    except Exception:
+        return DPI_PADRAO
+
+
+def _eh_pdf(caminho):
+    return caminho.lower().endswith(EXTENSOES_PDF)
+
+
+def _eh_tiff(caminho):
+    return caminho.lower().endswith(EXTENSOES_TIFF)
+
+
+def contar_paginas(caminho):
+    """Número de páginas lido apenas do cabeçalho/índice do arquivo."""
+    if _eh_pdf(caminho):
+        try:
+            import pypdfium2 as pdfium
+            pdf = pdfium.PdfDocument(caminho)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+        except ImportError:
+            pass
+        try:
+            from pdf2image import pdfinfo_from_path
+            return int(pdfinfo_from_path(caminho)['Pages'])
+        except ImportError:
+            raise RuntimeError("Suporte a PDF requer 'pypdfium2' ou 'pdf2image' instalado")
+
+    if _eh_tiff(caminho):
+        with Image.open(caminho) as img:
+            return getattr(img, 'n_frames', 1)
+
+    return 1
+
+
+def eh_documento_paginado(caminho):
+    """True para PDFs e para TIFFs com mais de uma página."""
+    if _eh_pdf(caminho):
+        return True
+    if _eh_tiff(caminho):
+        try:
+            return contar_paginas(caminho) > 1
+        except Exception:
+            return False
+    return False
+
+
+def _renderizar_pdf(pdf, indice, dpi):
+    pagina = pdf[indice]
+    try:
+        return pagina.render(scale=dpi / 72).to_pil()
+    finally:
+        pagina.close()
+
+
+def carregar_pagina(caminho, indice, dpi=None):
+    """Decodifica somente a página `indice` (base 0) do documento."""
+    dpi = _dpi(dpi)
+    if _eh_pdf(caminho):
+        try:
+            import pypdfium2 as pdfium
+            pdf = pdfium.PdfDocument(caminho)
+            try:
+                return _renderizar_pdf(pdf, indice, dpi)
+            finally:
+                pdf.close()
+        except ImportError:
+            pass
+        try:
+            from pdf2image import convert_from_path
+        except ImportError:
+            raise RuntimeError("Suporte a PDF requer 'pypdfium2' ou 'pdf2image' instalado")
+        return convert_from_path(caminho, dpi=dpi, first_page=indice + 1, last_page=indice + 1)[0]
+
+    with Image.open(caminho) as img:
+        img.seek(indice)
+        img.load()
+        # copy() desvincula a página do arquivo, que é fechado ao sair do with
+        return img.copy()
+
+
+def iterar_paginas(caminho, dpi=None, pular=None):
+    """
+    Gera (indice, PIL.Image) uma página por vez, mantendo o arquivo aberto entre
+    páginas. Se `pular(indice)` retornar True a página não é decodificada e o
+    gerador entrega (indice, None).
+    """
+    dpi = _dpi(dpi)
+    if _eh_pdf(caminho):
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            for indice in range(contar_paginas(caminho)):
+                if pular and pular(indice):
+                    yield indice, None
+                else:
+                    yield indice, carregar_pagina(caminho, indice, dpi)
+            return
+        pdf = pdfium.PdfDocument(caminho)
+        try:
+            for indice in range(len(pdf)):
+                if pular and pular(indice):
+                    yield indice, None
+                else:
+                    yield indice, _renderizar_pdf(pdf, indice, dpi)
+        finally:
+            pdf.close()
+        return
+
+    with Image.open(caminho) as img:
+        for indice in range(getattr(img, 'n_frames', 1)):
+            if pular and pular(indice):
+                yield indice, None
+                continue
+            img.seek(indice)
+            img.load()
+            yield indice, img.copy()
@@ -0,0 +1,771 @@
+"""
+Pré-processamento em arrays NumPy, sem passar por PIL.
+
+A imagem é decodificada direto em escala de cinza (cv2.IMREAD_GRAYSCALE) e as
+etapas trabalham no mesmo buffer: autocontraste por tabela (LUT) calculada dos
+percentis do histograma e nitidez com o mesmo kernel do ImageFilter.SHARPEN.
+O array resultante vai direto para o backend de OCR.
+
+Antes de tudo, endireitar() corrige páginas giradas (90/180/270 graus) e
+inclinadas, sem o OSD do Tesseract: numa amostra binarizada da página, o
+perfil de projeção das linhas de texto (soma dos quadrados do histograma das
+linhas, calculado para todos os ângulos de uma vez) é mais nítido no ângulo
+certo, e mais nítido nas linhas do que nas colunas se o texto estiver em pé.
+De cabeça para baixo se reconhece pela linha de base: numa linha de texto
+os pés das letras se alinham e só g, p, q, ç descem, enquanto os topos variam
+(b, d, l, t, maiúsculas, acentos); se os topos é que se alinham, a página
+está invertida.
+
+A cadeia é declarada em perfis: listas de etapas, cada uma um nome ou um
+dict {"etapa": nome, parâmetros...}. A imagem já chega em cinza da
+decodificação, então não há etapa de conversão. Etapas disponíveis:
+
+  endireitar       rotação 90/180/270 e inclinação (maximo)
+  recortar_bordas  tira bordas escuras do scanner e margens vazias (margem)
+  resolucao        reamostra para o tamanho de texto ideal (alvo, max_megapixels)
+  suavizar         remove ruído (metodo: mediana, gaussiano ou nlmeans; tamanho; forca)
+  autocontraste    estica o histograma (corte)
+  nitidez          kernel do ImageFilter.SHARPEN
+  otsu             binarização global
+  sauvola          binarização adaptativa, para iluminação irregular (janela, k, r)
+  morfologia       age sobre a tinta (operacao: dilatar, erodir, abrir, fechar; tamanho)
+  margem           moldura branca em volta (tamanho, px)
+
+Perfis embutidos em PERFIS_PADRAO; outros podem ser declarados (ou os
+embutidos redefinidos) em 'perfis_preprocessamento' no config.json, e
+'perfil_preprocessamento' escolhe o perfil em uso:
+
+  "perfil_preprocessamento": "recibos",
+  "perfis_preprocessamento": {
+    "recibos": ["resolucao", {"etapa": "suavizar", "tamanho": 5}, "sauvola"]
+  }
+
+O tempo de cada etapa vai para metadados['tempo_preprocessamento'].
+
+JPEGs grandes (fotos de celular) são decodificados já reduzidos por 2, 4 ou
+8, com a escala no domínio DCT do libjpeg (cv2.IMREAD_REDUCED_GRAYSCALE_*),
+sem montar a imagem inteira na memória. O fator sai só do cabeçalho e do
+config.json: o maior que ainda deixa 'megapixels_decodificacao' megapixels.
+Assim o mesmo arquivo é sempre decodificado na mesma escala, seja qual for
+a ordem do lote ou o worker, e a chave do cache (assinatura) a identifica.
+Só vale para perfis com a etapa 'resolucao': sem ela nada leva o texto de
+volta ao tamanho alvo.
+
+API:
+  carregar_cinza(origem, metadados=None, perfil=None) -> ndarray uint8 (ou None), JPEGs grandes já reduzidos
+  fator_decodificacao(largura, altura, min_mp) -> fator de redução do JPEG (1, 2, 4 ou 8)
+  cinza_de_pil(pil) -> ndarray uint8
+  autocontraste(cinza, corte=2) -> o mesmo array, ajustado no lugar
+  nitidez(cinza) -> o mesmo array, filtrado no lugar
+  estimar_orientacao(cinza) -> (quartos de volta no sentido horário, inclinação em graus)
+  endireitar(cinza, metadados=None) -> array sem rotação nem inclinação
+  normalizar_resolucao(cinza, metadados=None) -> array reamostrado para o tamanho de texto ideal
+  recortar_bordas(cinza, metadados=None, margem=0.02) -> recorte sem bordas
+  suavizar / binarizar_otsu / binarizar_sauvola / morfologia / margem -> etapas de limpeza e binarização
+  perfis() -> {nome: etapas} (embutidos + config.json)
+  perfil_configurado() -> (nome, [(etapa, parametros)])
+  preparar(cinza, metadados=None, perfil=None) -> aplica as etapas do perfil sobre um array em cinza
+  preprocessar_array(caminho, metadados=None) -> ndarray uint8 (ou None)
+  assinatura() -> str que identifica a cadeia (usada na chave do cache)
+"""
+import time
+import inspect
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from leitura_imagem import abrir_imagem
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+# Incrementar sempre que a cadeia padrão mudar (faz parte da chave do cache de OCR)
+VERSAO = 3
+
+# Altura mediana dos caracteres (px, ~ altura-x) em que o Tesseract acerta mais:
+# equivale a texto de 10-12 pt digitalizado a 300 dpi
+ALTURA_TEXTO_ALVO = 22
+ESCALA_MINIMA = 0.25
+ESCALA_MAXIMA = 4.0
+# Sem texto detectável, só reduz imagens acima deste tamanho
+MAX_MEGAPIXELS = 8.0
+# A estimativa roda numa cópia reduzida com este lado máximo
+_LADO_ESTIMATIVA = 2000
+# Faixa morta da escala: reamostrar por pouco custa tempo e não melhora o OCR
+_FAIXA_MORTA = (0.85, 1.2)
+
+# Decodificação reduzida de JPEG: sem saber o tamanho do texto, reduz até
+# restarem MEGAPIXELS_DECODIFICACAO (A4 a ~200 dpi)
+MEGAPIXELS_DECODIFICACAO = 3.0
+# Incrementar se a regra do fator mudar (entra na assinatura)
+_VERSAO_DECODIFICACAO = 2
+_LEITURAS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+_FORMATOS_REDUZIVEIS = ('JPEG', 'MPO')
+
+# Endireitamento: inclinação procurada até INCLINACAO_MAXIMA graus, em passos
+# de 1 grau e depois de 0,1 grau; abaixo de INCLINACAO_MINIMA não vale girar
+INCLINACAO_MAXIMA = 10.0
+INCLINACAO_MINIMA = 0.2
+_LADO_ORIENTACAO = 1000
+_PONTOS_ORIENTACAO = 4000
+_MINIMO_PONTOS = 300
+_LINHAS_VOTACAO = 15
+_MINIMO_LINHAS = 3
+_FAIXA_VOTACAO = 0.4        # fração central da altura endireitada para a votação
+# Quanto o perfil das colunas precisa vencer o das linhas para girar 90 graus,
+# e as linhas invertidas vencerem as em pé para girar 180
+_FATOR_90 = 1.15
+_FATOR_180 = 1.5
+
+# Pixels a mais que isto (níveis) do fundo contam como tinta no recorte
+_CONTRASTE_RECORTE = 40
+_LADO_RECORTE = 1024
+
+
+# Mesmo kernel do PIL.ImageFilter.SHARPEN (soma 16)
+_KERNEL_NITIDEZ = np.array([[-2, -2, -2],
+                            [-2, 32, -2],
+                            [-2, -2, -2]], dtype=np.float32) / 16.0
+
+
+def carregar_cinza(origem, metadados=None, perfil=None):
+    """
+    Decodifica já em escala de cinza um caminho ou um ArquivoImagem já aberto
+    (leitura_imagem), lendo o arquivo uma vez só. JPEGs grandes saem
+    reduzidos se `perfil` (padrão: o do config.json) tiver a etapa
+    'resolucao' (fator em metadados['reducao_decodificacao']); bytes e tempo
+    de leitura também vão para `metadados`. Usa PIL, sobre o mesmo buffer, só
+    se o cv2 não reconhecer o formato.
+    """
+    if isinstance(origem, str):
+        try:
+            with abrir_imagem(origem) as arquivo:
+                return carregar_cinza(arquivo, metadados, perfil)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Não foi possível decodificar {origem}: {e}")
+            return None
+
+    arquivo = origem
+    cinza = _carregar_reduzida(arquivo, metadados, perfil)
+    if cinza is None:
+        cinza = arquivo.decodificar(cv2.IMREAD_GRAYSCALE)
+    if cinza is None:
+        try:
+            with arquivo.pil() as pil:
+                cinza = cinza_de_pil(pil)
+        except Exception as e:
+            print(f"⚠️ Não foi possível decodificar {arquivo.caminho}: {e}")
+    if metadados is not None:
+        metadados.update(arquivo.estatisticas())
+    return cinza
+
+
+def _parametros_decodificacao(perfil=None):
+    """
+    Parâmetros da decodificação reduzida para `perfil` (padrão: o do
+    config.json). Só há redução se o perfil tiver a etapa 'resolucao' (e a
+    normalização estiver ligada): é ela que leva o texto ao tamanho alvo.
+    """
+    cfg = load_config() or {}
+    _, etapas = perfil_configurado() if perfil is None else _carregar_perfil(perfil)
+    com_resolucao = any(nome == 'resolucao' for nome, _ in etapas)
+    return {
+        'ativo': (bool(cfg.get('decodificacao_reduzida', True)) and com_resolucao
+                  and _parametros_resolucao()['ativo']),
+        'min_mp': float(cfg.get('megapixels_decodificacao', MEGAPIXELS_DECODIFICACAO)),
+    }
+
+
+def fator_decodificacao(largura, altura, min_mp):
+    """Maior fator de redução (8, 4, 2 ou 1) que ainda deixa `min_mp` megapixels."""
+    megapixels = largura * altura / 1e6
+    return next((fator for fator in (8, 4, 2) if megapixels / (fator * fator) >= min_mp), 1)
+
+
+def _carregar_reduzida(arquivo, metadados=None, perfil=None):
+    """
+    JPEG grande decodificado já reduzido, ou None (outro formato, imagem
+    pequena, recurso desligado, perfil sem 'resolucao'): quem chama
+    decodifica normalmente.
+    """
+    p = _parametros_decodificacao(perfil)
+    if not p['ativo']:
+        return None
+    cabecalho = arquivo.cabecalho()
+    if not cabecalho or cabecalho['formato'] not in _FORMATOS_REDUZIVEIS:
+        return None
+    fator = fator_decodificacao(cabecalho['largura'], cabecalho['altura'], p['min_mp'])
+    if fator == 1:
+        return None
+    cinza = arquivo.decodificar(_LEITURAS[fator])
+    if cinza is not None and metadados is not None:
+        metadados['reducao_decodificacao'] = fator
+    return cinza
+
+
+def cinza_de_pil(pil):
+    """Converte uma imagem PIL (ex.: página de TIFF/PDF) em array uint8 gravável."""
+    if pil.mode != 'L':
+        pil = pil.convert('L')
+    return np.array(pil, dtype=np.uint8)
+
+
+def autocontraste(cinza, corte=2):
+    """
+    Equivalente a ImageOps.autocontrast(cutoff=corte): descarta `corte`% dos
+    pixels em cada ponta do histograma e estica o restante para 0..255.
+    """
+    hist = cv2.calcHist([cinza], [0], None, [256], [0, 256]).ravel()
+    acumulado = np.cumsum(hist)
+    total = acumulado[-1]
+    baixo = int(np.searchsorted(acumulado, total * corte / 100.0, side='right'))
+    alto = int(np.searchsorted(acumulado, total * (1 - corte / 100.0), side='left'))
+    if alto <= baixo:
+        return cinza
+
+    lut = (np.arange(256, dtype=np.float32) - baixo) * (255.0 / (alto - baixo))
+    lut = np.clip(lut, 0, 255).astype(np.uint8)
+    cv2.LUT(cinza, lut, dst=cinza)
+    return cinza
+
+
+def nitidez(cinza):
+    """Aplica o kernel de nitidez no próprio array."""
+    cv2.filter2D(cinza, -1, _KERNEL_NITIDEZ, dst=cinza, borderType=cv2.BORDER_REPLICATE)
+    return cinza
+
+
+def _parametros_resolucao():
+    cfg = load_config() or {}
+    return {
+        'ativo': bool(cfg.get('normalizar_resolucao', True)),
+        'alvo': float(cfg.get('altura_texto_alvo', ALTURA_TEXTO_ALVO)),
+        'max_mp': float(cfg.get('max_megapixels', MAX_MEGAPIXELS)),
+    }
+
+
+def _parametros_endireitar():
+    cfg = load_config() or {}
+    return {
+        'ativo': bool(cfg.get('endireitar', True)),
+        'maximo': float(cfg.get('inclinacao_maxima', INCLINACAO_MAXIMA)),
+    }
+
+
+def assinatura():
+    """Identifica a cadeia e os parâmetros que alteram a imagem final (para o cache)."""
+    p = _parametros_resolucao()
+    e = _parametros_endireitar()
+    endireitamento = f"-end{e['maximo']:g}" if e['ativo'] else ""
+    if not p['ativo']:
+        texto = f"{VERSAO}{endireitamento}"
+    else:
+        texto = f"{VERSAO}-res{p['alvo']:g}-{p['max_mp']:g}mp{endireitamento}"
+    d = _parametros_decodificacao()
+    if d['ativo']:
+        texto += f"-dec{_VERSAO_DECODIFICACAO}-{d['min_mp']:g}mp"
+    # A cadeia padrão mantém a assinatura de antes dos perfis (não invalida o cache)
+    _, etapas = perfil_configurado()
+    if etapas != _normalizar_etapas(PERFIS_PADRAO['padrao']):
+        texto += "-" + _descrever_etapas(etapas)
+    return texto
+
+
+def _pontos_de_tinta(binaria):
+    """Coordenadas (y, x) de até _PONTOS_ORIENTACAO pixels de tinta, em float32."""
+    pontos = cv2.findNonZero(binaria)
+    if pontos is None:
+        return None, None
+    pontos = pontos.reshape(-1, 2)
+    pontos = pontos[::max(1, len(pontos) // _PONTOS_ORIENTACAO)].astype(np.float32)
+    return pontos[:, 1], pontos[:, 0]
+
+
+def _nitidez_perfis(angulos, y, x, diagonal):
+    """
+    Para cada ângulo (graus), a soma dos quadrados do histograma das linhas
+    depois de girar os pontos: todos os ângulos num único bincount.
+    """
+    radianos = np.deg2rad(angulos)[:, None]
+    linhas = (y[None, :] * np.cos(radianos) - x[None, :] * np.sin(radianos)).astype(np.int32) + diagonal
+    linhas += np.arange(len(angulos), dtype=np.int32)[:, None] * (2 * diagonal)
+    histogramas = np.bincount(linhas.ravel(), minlength=len(angulos) * 2 * diagonal)
+    histogramas = histogramas.reshape(len(angulos), 2 * diagonal).astype(np.float64)
+    return (histogramas * histogramas).sum(axis=1)
+
+
+def _melhor_inclinacao(y, x, diagonal, maximo):
+    """(nitidez, ângulo) do perfil mais nítido: busca de 1 em 1 grau, depois de 0,1 em 0,1."""
+    grossos = np.arange(-maximo, maximo + 1e-6, 1.0)
+    aproximado = grossos[int(np.argmax(_nitidez_perfis(grossos, y, x, diagonal)))]
+    finos = np.arange(aproximado - 1.0, aproximado + 1.0 + 1e-6, 0.1)
+    nitidez_finos = _nitidez_perfis(finos, y, x, diagonal)
+    melhor = int(np.argmax(nitidez_finos))
+    return float(nitidez_finos[melhor]), float(finos[melhor])
+
+
+def _votar_sentido(binaria):
+    """
+    (linhas em pé, linhas invertidas) entre até _LINHAS_VOTACAO linhas de texto
+    do meio da faixa: em pé, os pés das letras variam menos que os topos.
+    """
+    perfil = binaria.sum(axis=1, dtype=np.int64)
+    if not perfil.any():
+        return 0, 0
+    com_tinta = np.concatenate(([False], perfil > 0.05 * perfil.max(), [False]))
+    bordas = np.flatnonzero(np.diff(com_tinta.astype(np.int8)))
+    inicios, fins = bordas[::2], bordas[1::2]
+    primeira = max(0, (len(inicios) - _LINHAS_VOTACAO) // 2)
+    inicios, fins = inicios[primeira:primeira + _LINHAS_VOTACAO], fins[primeira:primeira + _LINHAS_VOTACAO]
+    if not len(inicios):
+        return 0, 0
+
+    # Componentes só na faixa das linhas escolhidas
+    faixa = binaria[inicios[0]:fins[-1]]
+    _, _, estatisticas, _ = cv2.connectedComponentsWithStats(faixa, connectivity=8)
+    topos = estatisticas[1:, cv2.CC_STAT_TOP] + inicios[0]
+    esquerdas = estatisticas[1:, cv2.CC_STAT_LEFT]
+    alturas = estatisticas[1:, cv2.CC_STAT_HEIGHT]
+    larguras = estatisticas[1:, cv2.CC_STAT_WIDTH]
+    areas = estatisticas[1:, cv2.CC_STAT_AREA]
+    if not np.any(areas >= 4):
+        return 0, 0
+    mediana = np.median(alturas[areas >= 4])
+    # Só o que tem cara de letra: nem ruído, nem sublinhados e figuras
+    letras = (areas >= 4) & (alturas >= mediana * 0.5) & (alturas <= mediana * 3) & (larguras <= alturas * 3)
+    topos, pes, esquerdas = topos[letras], topos[letras] + alturas[letras], esquerdas[letras]
+    linha_de = np.searchsorted(inicios, (topos + pes) / 2, side='right') - 1
+
+    em_pe = invertidas = 0
+    for linha in range(len(inicios)):
+        selecao = np.flatnonzero(linha_de == linha)
+        if len(selecao) < 5:
+            continue
+        # Desvio em relação à mediana de trechos de 8 letras vizinhas: a inclinação que sobrou não pesa
+        selecao = selecao[np.argsort(esquerdas[selecao])]
+        variacao_topos = variacao_pes = 0.0
+        for trecho in np.array_split(selecao, max(1, len(selecao) // 8)):
+            variacao_topos += np.abs(topos[trecho] - np.median(topos[trecho])).sum()
+            variacao_pes += np.abs(pes[trecho] - np.median(pes[trecho])).sum()
+        if variacao_topos > variacao_pes:
+            em_pe += 1
+        elif variacao_pes > variacao_topos:
+            invertidas += 1
+    return em_pe, invertidas
+
+
+def _binarizar(amostra):
+    """Tinta = 1, fundo = 0 (Otsu)."""
+    return cv2.threshold(amostra, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+
+
+def _faixa_endireitada(amostra, angulo, fracao=_FAIXA_VOTACAO):
+    """
+    Faixa central (`fracao` da altura) da amostra girada em cinza (interpolação linear) e
+    binarizada de novo: girar a binária com vizinho mais próximo cria degraus
+    de 1 px nos pés das letras.
+    """
+    altura, largura = amostra.shape
+    topo = int(altura * (1 - fracao) / 2)
+    matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), angulo, 1.0)
+    matriz[1, 2] -= topo
+    faixa = cv2.warpAffine(amostra, matriz, (largura, max(1, int(altura * fracao))),
+                           flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return _binarizar(faixa)
+
+
+def estimar_orientacao(cinza, maximo=INCLINACAO_MAXIMA):
+    """
+    Estima, numa amostra binarizada (Otsu) de até _LADO_ORIENTACAO px, quantos
+    quartos de volta no sentido horário (0-3) e qual inclinação (graus, sentido
+    do cv2.getRotationMatrix2D) endireitam a página. (0, 0.0) se não houver
+    tinta suficiente ou linhas de texto reconhecíveis (foto, desenho) para decidir.
+    """
+    altura, largura = cinza.shape[:2]
+    passo = max(1, max(altura, largura) // _LADO_ORIENTACAO)
+    amostra = np.ascontiguousarray(cinza[::passo, ::passo])
+    binaria = _binarizar(amostra)
+    y, x = _pontos_de_tinta(binaria)
+    if y is None or len(y) < _MINIMO_PONTOS:
+        return 0, 0.0
+    diagonal = int(np.hypot(*binaria.shape)) + 2
+
+    nitidez_linhas, angulo = _melhor_inclinacao(y, x, diagonal, maximo)
+    nitidez_colunas, _ = _melhor_inclinacao(x, y, diagonal, maximo)
+    quartos = 0
+    if nitidez_colunas > nitidez_linhas * _FATOR_90:
+        # Texto em pé: gira a amostra 90 graus e mede a inclinação de novo
+        quartos = 1
+        amostra = cv2.rotate(amostra, cv2.ROTATE_90_CLOCKWISE)
+        y, x = _pontos_de_tinta(cv2.rotate(binaria, cv2.ROTATE_90_CLOCKWISE))
+        _, angulo = _melhor_inclinacao(y, x, diagonal, maximo)
+
+    # Uma volta de 180 graus não muda a inclinação, só troca topos e pés
+    em_pe, invertidas = _votar_sentido(_faixa_endireitada(amostra, angulo))
+    if em_pe + invertidas < _MINIMO_LINHAS:
+        # Texto só no alto ou no pé da página: vota com ela inteira
+        em_pe, invertidas = _votar_sentido(_faixa_endireitada(amostra, angulo, 1.0))
+    if em_pe + invertidas < _MINIMO_LINHAS:
+        return 0, 0.0
+    if invertidas > em_pe * _FATOR_180:
+        quartos += 2
+    return quartos, round(angulo, 2)
+
+
+_ROTACOES = {1: cv2.ROTATE_90_CLOCKWISE, 2: cv2.ROTATE_180, 3: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+def endireitar(cinza, metadados=None, maximo=None):
+    """
+    Desfaz rotações de 90/180/270 graus e inclinações de até `maximo` graus
+    (padrão: 'inclinacao_maxima'). 'rotacao' (graus, horário) e 'inclinacao'
+    aplicadas vão para `metadados`. A página inclinada é girada num quadro
+    ampliado, preenchido com a cor do fundo, para não cortar os cantos.
+    """
+    p = _parametros_endireitar()
+    if not p['ativo']:
+        return cinza
+    quartos, angulo = estimar_orientacao(cinza, p['maximo'] if maximo is None else float(maximo))
+    if abs(angulo) < INCLINACAO_MINIMA:
+        angulo = 0.0
+    if metadados is not None:
+        metadados['rotacao'] = quartos * 90
+        metadados['inclinacao'] = angulo
+
+    if quartos:
+        cinza = cv2.rotate(cinza, _ROTACOES[quartos])
+    if angulo:
+        altura, largura = cinza.shape[:2]
+        matriz = cv2.getRotationMatrix2D((largura / 2, altura / 2), angulo, 1.0)
+        cosseno, seno = abs(matriz[0, 0]), abs(matriz[0, 1])
+        nova_largura = int(round(altura * seno + largura * cosseno))
+        nova_altura = int(round(altura * cosseno + largura * seno))
+        matriz[0, 2] += (nova_largura - largura) / 2
+        matriz[1, 2] += (nova_altura - altura) / 2
+        fundo = int(np.median(cinza[::16, ::16]))
+        cinza = cv2.warpAffine(cinza, matriz, (nova_largura, nova_altura), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=fundo)
+    return cinza
+
+
+def estimar_altura_texto(cinza):
+    """
+    Estima a altura mediana dos caracteres (px) pelos componentes conexos de uma
+    cópia reduzida e binarizada (Otsu). Retorna None se não houver texto suficiente.
+    """
+    altura, largura = cinza.shape[:2]
+    reducao = min(1.0, _LADO_ESTIMATIVA / max(altura, largura))
+    amostra = cinza
+    if reducao < 1.0:
+        amostra = cv2.resize(cinza, (max(1, int(largura * reducao)), max(1, int(altura * reducao))),
+                             interpolation=cv2.INTER_AREA)
+
+    _, binaria = cv2.threshold(amostra, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    n, _, stats, _ = cv2.connectedComponentsWithStats(binaria, connectivity=8)
+    if n <= 1:
+        return None
+
+    alturas = stats[1:, cv2.CC_STAT_HEIGHT]
+    larguras = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    # Mantém só o que tem cara de caractere: nem ruído, nem linhas/figuras
+    plausiveis = ((alturas >= 3) & (alturas <= amostra.shape[0] * 0.2)
+                  & (larguras <= alturas * 4) & (areas >= 6))
+    if np.count_nonzero(plausiveis) < 20:
+        return None
+    return float(np.median(alturas[plausiveis])) / reducao
+
+
+def normalizar_resolucao(cinza, metadados=None, alvo=None, max_megapixels=None):
+    """
+    Reamostra a imagem para que o texto fique perto de `alvo` px (padrão:
+    'altura_texto_alvo'): fotos enormes são reduzidas e recibos minúsculos
+    ampliados. A escala escolhida e a altura estimada vão para `metadados`.
+    """
+    p = _parametros_resolucao()
+    if alvo is not None:
+        p['alvo'] = float(alvo)
+    if max_megapixels is not None:
+        p['max_mp'] = float(max_megapixels)
+    escala = 1.0
+    altura_texto = None
+    if p['ativo']:
+        altura_texto = estimar_altura_texto(cinza)
+        if altura_texto:
+            escala = p['alvo'] / altura_texto
+        else:
+            megapixels = cinza.shape[0] * cinza.shape[1] / 1e6
+            if megapixels > p['max_mp']:
+                escala = (p['max_mp'] / megapixels) ** 0.5
+        escala = min(ESCALA_MAXIMA, max(ESCALA_MINIMA, escala))
+        if _FAIXA_MORTA[0] <= escala <= _FAIXA_MORTA[1]:
+            escala = 1.0
+
+    if metadados is not None:
+        metadados['escala'] = round(escala, 4)
+        metadados['altura_texto'] = round(altura_texto, 1) if altura_texto else None
+
+    if escala == 1.0:
+        return cinza
+    altura, largura = cinza.shape[:2]
+    interpolacao = cv2.INTER_AREA if escala < 1 else cv2.INTER_CUBIC
+    return cv2.resize(cinza, (max(1, round(largura * escala)), max(1, round(altura * escala))),
+                      interpolation=interpolacao)
+
+
+def _entre_faixas_escuras(escuras):
+    """(início, fim) do trecho que sobra tirando as faixas escuras das duas pontas."""
+    claras = np.flatnonzero(~escuras)
+    if claras.size == 0:
+        return 0, 0
+    return int(claras[0]), int(claras[-1]) + 1
+
+
+def recortar_bordas(cinza, metadados=None, margem=0.02):
+    """
+    Recorta a página no retângulo que contém a tinta, depois de descartar as
+    faixas escuras que o scanner deixa nas bordas, com `margem` (fração do
+    lado) de folga. O recorte [x, y, largura, altura] vai para `metadados`.
+    Páginas sem tinta ficam como estão.
+    """
+    altura, largura = cinza.shape[:2]
+    passo = max(1, max(altura, largura) // _LADO_RECORTE)
+    amostra = cinza[::passo, ::passo]
+    fundo = int(np.median(amostra))
+
+    # Faixas escuras encostadas nas bordas (tampa do scanner, sombra do livro)
+    topo, base = _entre_faixas_escuras(amostra.mean(axis=1) < fundo / 2)
+    esquerda, direita = _entre_faixas_escuras(amostra.mean(axis=0) < fundo / 2)
+    miolo = amostra[topo:base, esquerda:direita]
+    if miolo.size == 0:
+        return cinza
+
+    _, tinta = cv2.threshold(cv2.absdiff(miolo, np.full_like(miolo, fundo)), _CONTRASTE_RECORTE, 255,
+                             cv2.THRESH_BINARY)
+    # Poeira isolada não deve alargar o recorte
+    tinta = cv2.medianBlur(tinta, 3)
+    x, y, w, h = cv2.boundingRect(tinta)
+    if not w or not h:
+        return cinza
+    # A folga não volta para dentro das faixas escuras
+    folga = int(margem * max(altura, largura))
+    x0 = max(esquerda * passo, (esquerda + x) * passo - folga)
+    y0 = max(topo * passo, (topo + y) * passo - folga)
+    x1 = min(direita * passo, largura, (esquerda + x + w) * passo + folga)
+    y1 = min(base * passo, altura, (topo + y + h) * passo + folga)
+    if metadados is not None:
+        metadados['recorte'] = [x0, y0, x1 - x0, y1 - y0]
+    if (x0, y0, x1, y1) == (0, 0, largura, altura):
+        return cinza
+    return np.ascontiguousarray(cinza[y0:y1, x0:x1])
+
+
+def suavizar(cinza, metodo='mediana', tamanho=3, forca=10):
+    """
+    Remove ruído: 'mediana' (sal e pimenta, poeira), 'gaussiano' (granulação)
+    ou 'nlmeans' (fotos ruidosas; bem mais lento). `tamanho` é o lado da
+    janela e `forca` o h do nlmeans.
+    """
+    tamanho = int(tamanho) | 1
+    if metodo == 'mediana':
+        return cv2.medianBlur(cinza, tamanho, dst=cinza)
+    if metodo == 'gaussiano':
+        return cv2.GaussianBlur(cinza, (tamanho, tamanho), 0, dst=cinza)
+    if metodo == 'nlmeans':
+        return cv2.fastNlMeansDenoising(cinza, None, h=float(forca))
+    raise ValueError(f"método de suavização desconhecido: {metodo}")
+
+
+def binarizar_otsu(cinza):
+    """Preto e branco com o limiar global de Otsu, no próprio array."""
+    cv2.threshold(cinza, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=cinza)
+    return cinza
+
+
+def binarizar_sauvola(cinza, janela=31, k=0.2, r=128):
+    """
+    Binarização adaptativa de Sauvola: limiar = m * (1 + k * (s / r - 1)),
+    com média m e desvio s numa janela `janela` x `janela` em volta de cada
+    pixel (filtros de caixa, sem laço em Python). Aguenta sombras e
+    iluminação irregular, onde um limiar global apaga parte do texto.
+    """
+    janela = int(janela) | 1
+    valores = cinza.astype(np.float32)
+    media = cv2.boxFilter(valores, cv2.CV_32F, (janela, janela), borderType=cv2.BORDER_REPLICATE)
+    limiar = cv2.sqrBoxFilter(valores, cv2.CV_32F, (janela, janela), borderType=cv2.BORDER_REPLICATE)
+    limiar -= media * media
+    np.maximum(limiar, 0, out=limiar)
+    np.sqrt(limiar, out=limiar)
+    limiar *= k / r
+    limiar += 1 - k
+    limiar *= media
+    return cv2.compare(valores, limiar, cv2.CMP_GT)
+
+
+# A tinta é escura: dilatar a tinta é erodir a imagem, e assim por diante
+_MORFOLOGIA = {
+    'dilatar': cv2.MORPH_ERODE,
+    'erodir': cv2.MORPH_DILATE,
+    'abrir': cv2.MORPH_CLOSE,
+    'fechar': cv2.MORPH_OPEN,
+}
+
+
+def morfologia(cinza, operacao='fechar', tamanho=2):
+    """
+    Operação morfológica sobre a tinta: 'fechar' emenda traços falhados,
+    'abrir' apaga pontinhos, 'dilatar' engrossa e 'erodir' afina as letras.
+    """
+    if operacao not in _MORFOLOGIA:
+        raise ValueError(f"operação morfológica desconhecida: {operacao}")
+    kernel = np.ones((int(tamanho), int(tamanho)), np.uint8)
+    return cv2.morphologyEx(cinza, _MORFOLOGIA[operacao], kernel, dst=cinza)
+
+
+def margem(cinza, tamanho=10):
+    """Moldura branca de `tamanho` px: o Tesseract erra letras encostadas na borda do recorte."""
+    tamanho = int(tamanho)
+    return cv2.copyMakeBorder(cinza, tamanho, tamanho, tamanho, tamanho, cv2.BORDER_CONSTANT, value=255)
+
+
+# nome -> (função, recebe metadados)
+ETAPAS = {
+    'endireitar': (endireitar, True),
+    'recortar_bordas': (recortar_bordas, True),
+    'resolucao': (normalizar_resolucao, True),
+    'suavizar': (suavizar, False),
+    'autocontraste': (autocontraste, False),
+    'nitidez': (nitidez, False),
+    'otsu': (binarizar_otsu, False),
+    'sauvola': (binarizar_sauvola, False),
+    'morfologia': (morfologia, False),
+    'margem': (margem, False),
+}
+
+PERFIS_PADRAO = {
+    # A cadeia de sempre
+    'padrao': ['endireitar', 'resolucao', 'autocontraste', 'nitidez'],
+    # PDFs gerados e capturas de tela: já vêm retos e limpos
+    'rapido': ['resolucao', 'autocontraste'],
+    # Fotos de celular: bordas da mesa, ruído do sensor, sombra na página
+    'foto': ['endireitar', 'recortar_bordas', 'resolucao', 'suavizar', 'sauvola'],
+    # Fax e cópias de cópia: traços falhados
+    'fax': ['endireitar', 'resolucao', 'otsu', {'etapa': 'morfologia', 'operacao': 'fechar'}],
+    # Campos recortados de um modelo de documento (modelos_documento): uma linha só,
+    # sem página para endireitar nem texto suficiente para medir a resolução
+    'recorte': ['otsu', 'margem'],
+}
+
+_perfil = None
+
+
+def _normalizar_etapas(etapas):
+    """Lista do perfil -> [(nome, parametros)], conferindo nomes e parâmetros."""
+    normalizadas = []
+    for etapa in etapas:
+        if isinstance(etapa, str):
+            nome, parametros = etapa, {}
+        else:
+            parametros = dict(etapa)
+            nome = parametros.pop('etapa', None)
+        if nome not in ETAPAS:
+            raise ValueError(f"etapa desconhecida: {nome}")
+        funcao, com_metadados = ETAPAS[nome]
+        argumentos = (None, None) if com_metadados else (None,)
+        try:
+            inspect.signature(funcao).bind(*argumentos, **parametros)
+        except TypeError as e:
+            raise ValueError(f"parâmetros inválidos para '{nome}': {e}")
+        normalizadas.append((nome, parametros))
+    return normalizadas
+
+
+def _descrever_etapas(etapas):
+    partes = []
+    for nome, parametros in etapas:
+        if parametros:
+            nome += "(" + ";".join(f"{chave}={parametros[chave]}" for chave in sorted(parametros)) + ")"
+        partes.append(nome)
+    return ",".join(partes)
+
+
+def perfis():
+    """Perfis embutidos + os declarados em 'perfis_preprocessamento' no config.json."""
+    todos = dict(PERFIS_PADRAO)
+    try:
+        todos.update((load_config() or {}).get('perfis_preprocessamento') or {})
+    except Exception:
+        pass
+    return todos
+
+
+def _carregar_perfil(nome):
+    todos = perfis()
+    if nome not in todos:
+        raise ValueError(f"perfil de pré-processamento desconhecido: {nome}")
+    return nome, _normalizar_etapas(todos[nome])
+
+
+def perfil_configurado():
+    """
+    (nome, etapas) do perfil escolhido em 'perfil_preprocessamento' (padrão
+    'padrao'). Um perfil inválido é avisado uma vez e troca-se pelo padrão.
+    """
+    global _perfil
+    if _perfil is None:
+        try:
+            nome = (load_config() or {}).get('perfil_preprocessamento') or 'padrao'
+        except Exception:
+            nome = 'padrao'
+        try:
+            _perfil = _carregar_perfil(nome)
+        except ValueError as e:
+            print(f"⚠️ Perfil de pré-processamento '{nome}' ignorado: {e}")
+            _perfil = ('padrao', _normalizar_etapas(PERFIS_PADRAO['padrao']))
+    return _perfil
+
+
+def preparar(cinza, metadados=None, perfil=None):
+    """
+    Aplica as etapas de `perfil` (padrão: o do config.json) sobre um array já
+    em cinza. O nome do perfil e o tempo de cada etapa (s) vão para `metadados`.
+    """
+    nome, etapas = perfil_configurado() if perfil is None else _carregar_perfil(perfil)
+    tempos = {}
+    for etapa, parametros in etapas:
+        funcao, com_metadados = ETAPAS[etapa]
+        inicio = time.perf_counter()
+        if com_metadados:
+            cinza = funcao(cinza, metadados, **parametros)
+        else:
+            cinza = funcao(cinza, **parametros)
+        tempos[etapa] = round(tempos.get(etapa, 0.0) + time.perf_counter() - inicio, 4)
+    if metadados is not None:
+        metadados['perfil'] = nome
+        metadados['tempo_preprocessamento'] = tempos
+    return cinza
+
+
+def preprocessar_array(caminho, metadados=None):
+    """
+    Versão NumPy de ocr_funcoes.preprocessar_imagem. Informações da
+    decodificação (redução, bytes lidos) e das etapas (ex.: escala aplicada)
+    são gravadas em `metadados`, se fornecido.
+    """
+    try:
+        cinza = carregar_cinza(caminho, metadados)
+        if cinza is None:
+            return None
+        return preparar(cinza, metadados)
+    except Exception as e:
+        print(f"⚠️ Erro fatal no pré-processamento: {e}")
+        return None
@@ -0,0 +1,840 @@
+"""
+Motor de processamento em lote: distribui imagens entre um pool de processos.
+
+Cada processo roda o Tesseract com uma única thread (OMP_THREAD_LIMIT=1), assim
+N processos ocupam N núcleos sem disputar entre si.
+
+O pipeline em estágios (processar_em_fluxo) separa as etapas: decodificação
+(threads, limitada por E/S), pré-processamento (threads; o cv2 libera o GIL),
+OCR (pool de processos) e um único gravador. Filas limitadas entre os estágios
+aplicam contrapressão: disco lento e OCR lento se sobrepõem em vez de somar, e
+a memória fica constante em pastas de qualquer tamanho.
+
+Tudo que vai para o pool passa pelo agendador (agendador_ocr): pedidos
+interativos (um documento escolhido na interface, o serviço HTTP) passam na
+frente das imagens de lote que estão esperando, e o envelhecimento garante
+que o lote continue andando. O agendador também vigia o tempo de cada tarefa
+('tempo_limite_imagem'): um worker travado é derrubado e o pool recriado, e
+falhas de infraestrutura são tentadas de novo com espera crescente. Cada
+worker tem um teto de memória ('limite_memoria_mb', Linux/macOS). Um arquivo
+que trava, derruba ou estoura a memória em todas as tentativas vai para a
+quarentena (quarentena.py) em vez de voltar a cada execução. Cópias quase
+idênticas de uma imagem já reconhecida (duplicatas.py, se 'deduplicacao'
+estiver ligada) reaproveitam o texto dela já na decodificação, sem passar
+pelo OCR; páginas em branco (pagina_branca.py) também, e vão para o
+histórico como "página em branco".
+Varreduras muito grandes (plantas, rolos contínuos) são divididas em faixas
+no pré-processamento e cada faixa vai para o pool como uma tarefa
+(faixas_ocr.py); o texto é juntado antes do gravador.
+
+API:
+  processar_lote(imagens, imagens_dir, workers=None, ordenado=False) -> gerador de dicts
+  processar_em_fluxo(imagens, imagens_dir, resultados_dir=None, gerenciador=None, manifesto=None, ...) -> gerador de dicts
+  salvar_resultado(resultado, resultados_dir) -> caminho do _texto.txt
+  numero_workers(workers=None) -> int
+  obter_agendador(workers) -> AgendadorPrioridades (.submit(fn, *args, prioridade=...), .metricas())
+  resumo_prioridades() -> linha com a espera média por prioridade
+  encerrar_pool()
+"""
+import os
+import sys
+import time
+import queue
+import signal
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from ocr_funcoes import (processar_imagem_detalhado, montar_resultado_documento, reconhecer_preparada,
+                         montar_resultado_ocr,
+                         chave_cache, consultar_cache, guardar_em_cache, confianca_de,
+                         procurar_duplicata, registrar_duplicata, observacao_historico)
+from paginas import eh_documento_paginado, contar_paginas, iterar_paginas
+from preprocessamento import carregar_cinza, cinza_de_pil, preparar
+from leitura_imagem import abrir_imagem
+from ocr_backends import obter_backend, TEMPO_LIMITE_PADRAO
+from agendador_ocr import (AgendadorPrioridades, PRIORIDADE_LOTE, ENVELHECIMENTO_PADRAO, TENTATIVAS_PADRAO,
+                           ESPERA_NOVA_TENTATIVA, RETENTAVEIS, eh_falha_persistente)
+from quarentena import mover_para_quarentena, quarentena_ativa, motivo_da_falha
+from pagina_branca import pagina_em_branco, eh_branca
+from faixas_ocr import planejar_faixas, submeter_faixas
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+_pool = None
+_pool_workers = 0
+_agendador = None
+# Cada worker do pool atual manda o próprio PID por aqui ao iniciar (para matar_pool)
+_fila_pids = None
+_pids_workers = set()
+
+# Memória que cada worker pode alocar além do que já usa ao iniciar ('limite_memoria_mb'; 0 = sem limite)
+LIMITE_MEMORIA_PADRAO_MB = 2048
+
+
+def numero_workers(workers=None):
+    """Resolve quantos processos usar: argumento > 'workers' do config.json > núcleos da máquina."""
+    if not workers:
+        try:
+            workers = int((load_config() or {}).get('workers') or 0)
+        except Exception:
+            workers = 0
+    if not workers:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _inicializar_worker(fila_pids=None):
+    if fila_pids is not None:
+        fila_pids.put(os.getpid())
+    # Uma thread de Tesseract por processo: o paralelismo vem do pool.
+    # Precisa vir antes de carregar o backend (tesserocr lê a variável no Init).
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    # Ctrl-C é tratado pelo processo principal (que decide se drena ou aborta)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _saida_para_stderr()
+    _limitar_memoria()
+    try:
+        obter_backend().aquecer()
+    except Exception as e:
+        print(f"⚠️ Não foi possível pré-carregar o motor OCR: {e}")
+
+
+def _saida_para_stderr():
+    """
+    Mensagens dos workers vão para a saída de erro: a saída padrão é do
+    processo principal (ocr_cli escreve nela só as linhas JSON). O dup2 cobre
+    também o que o motor escrever direto no descritor 1.
+    """
+    if sys.stderr is None:
+        # pythonw: sem console, print() já não escreve nada
+        sys.stdout = None
+        return
+    try:
+        sys.stdout.flush()
+        os.dup2(sys.stderr.fileno(), 1)
+    except (AttributeError, OSError, ValueError):
+        pass
+    sys.stdout = sys.stderr
+
+
+def _limitar_memoria():
+    """
+    Teto de memória do worker (RLIMIT_AS, herdado pelo tesseract que ele
+    chamar): o que o processo já usa + 'limite_memoria_mb'. Uma imagem que
+    passa disso falha com MemoryError em vez de levar a máquina junto.
+    """
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem rlimit; o vigia de tempo continua valendo
+        return
+    try:
+        limite_mb = float((load_config() or {}).get('limite_memoria_mb', LIMITE_MEMORIA_PADRAO_MB))
+    except (TypeError, ValueError):
+        limite_mb = LIMITE_MEMORIA_PADRAO_MB
+    if limite_mb <= 0:
+        return
+    atual = 0
+    try:
+        with open('/proc/self/statm') as f:
+            atual = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        _, rigido = resource.getrlimit(resource.RLIMIT_AS)
+        limite = atual + int(limite_mb * 1024 * 1024)
+        if rigido != resource.RLIM_INFINITY:
+            limite = min(limite, rigido)
+        resource.setrlimit(resource.RLIMIT_AS, (limite, rigido))
+    except (ValueError, OSError) as e:
+        print(f"⚠️ Não foi possível limitar a memória do worker: {e}")
+
+
+def _processar_item(processar_fn, nome_arquivo, imagens_dir, pagina=None):
+    inicio = time.perf_counter()
+    metadados = {}
+    try:
+        if pagina is None:
+            resultado = processar_fn(nome_arquivo, imagens_dir)
+        else:
+            resultado = processar_fn(nome_arquivo, imagens_dir, pagina)
+        # Aceita tanto processar_imagem (ResultadoOCR/str) quanto processar_imagem_detalhado (dict)
+        if isinstance(resultado, dict):
+            texto = resultado.get('texto')
+            metadados = resultado.get('metadados') or {}
+        else:
+            texto = resultado
+            metadados = getattr(resultado, 'metadados', None) or {}
+        erro = None if texto or metadados.get('pagina_branca') else "Nenhum texto extraído"
+    except (TimeoutError, MemoryError):
+        # Sobem até o agendador: nova tentativa e, persistindo, quarentena
+        raise
+    except Exception as e:
+        texto, erro = None, str(e)
+    return {
+        'arquivo': nome_arquivo,
+        'texto': texto,
+        'erro': erro,
+        'tempo': time.perf_counter() - inicio,
+        'metadados': metadados,
+        'pagina': pagina,
+    }
+
+
+def _tentativas_ocr():
+    try:
+        return max(1, int((load_config() or {}).get('tentativas_ocr', TENTATIVAS_PADRAO)))
+    except (TypeError, ValueError):
+        return TENTATIVAS_PADRAO
+
+
+class _ExecutorLocal:
+    """
+    Executa as tarefas na hora, no próprio processo (lote pequeno ou workers=1).
+    Como no agendador, falhas de infraestrutura (tempo esgotado, falta de
+    memória) são tentadas de novo até 'tentativas_ocr' vezes, com a mesma
+    espera crescente, e o Future leva o atributo `tentativas`: um arquivo só
+    vai para a quarentena depois de falhar em todas.
+    """
+
+    def __init__(self):
+        self.tentativas = _tentativas_ocr()
+
+    def submit(self, fn, *args, prioridade=None):
+        futuro = Future()
+        tentativa = 1
+        while True:
+            try:
+                resultado = fn(*args)
+            except RETENTAVEIS as e:
+                if tentativa < self.tentativas:
+                    time.sleep(ESPERA_NOVA_TENTATIVA * 2 ** (tentativa - 1))
+                    tentativa += 1
+                    continue
+                futuro.set_exception(e)
+            except Exception as e:
+                futuro.set_exception(e)
+            else:
+                futuro.set_result(resultado)
+            futuro.tentativas = tentativa
+            return futuro
+
+
+def _tarefas(imagens, imagens_dir):
+    """Gera (indice, nome, pagina, total_paginas); TIFF/PDF com várias páginas viram uma tarefa por página."""
+    for indice, nome in enumerate(imagens):
+        total = 0
+        try:
+            caminho = os.path.join(imagens_dir, nome)
+            if eh_documento_paginado(caminho):
+                total = contar_paginas(caminho)
+        except Exception:
+            total = 0
+        if total > 0:
+            for pagina in range(total):
+                yield indice, nome, pagina, total
+        else:
+            yield indice, nome, None, 1
+
+
+def _resultado_documento(nome_arquivo, itens):
+    """Junta os resultados das páginas (em ordem) no resultado do documento."""
+    paginas = []
+    erros = []
+    for item in itens:
+        metadados = dict(item['metadados'] or {})
+        metadados['pagina'] = item['pagina']
+        paginas.append({'texto': item['texto'] or '', 'metadados': metadados, 'erro': item['erro']})
+        if item['erro'] and item['texto'] is None:
+            erros.append(f"pág. {item['pagina'] + 1}: {item['erro']}")
+
+    documento = montar_resultado_documento(nome_arquivo, paginas)
+    erro = None
+    if not documento['texto'] and not documento['metadados'].get('pagina_branca'):
+        erro = "; ".join(erros) or "Nenhum texto extraído"
+    return {
+        'arquivo': nome_arquivo,
+        'texto': documento['texto'] or None,
+        'erro': erro,
+        'tempo': sum(item['tempo'] for item in itens),
+        'metadados': documento['metadados'],
+        'paginas': paginas,
+    }
+
+
+def obter_pool(workers):
+    """Retorna o pool de processos compartilhado, recriando-o se o tamanho mudou."""
+    global _pool, _pool_workers, _fila_pids
+    if _pool is None or _pool_workers != workers:
+        encerrar_pool()
+        # 'spawn' garante processos limpos: um motor já carregado no processo pai
+        # (com todas as threads OpenMP) não é herdado pelos workers via fork
+        contexto = multiprocessing.get_context('spawn')
+        _fila_pids = contexto.SimpleQueue()
+        _pids_workers.clear()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=contexto, initializer=_inicializar_worker,
+                                    initargs=(_fila_pids,))
+        _pool_workers = workers
+    return _pool
+
+
+def _coletar_pids():
+    """PIDs que os workers do pool atual informaram ao iniciar."""
+    if _fila_pids is not None:
+        while not _fila_pids.empty():
+            _pids_workers.add(_fila_pids.get())
+    return set(_pids_workers)
+
+
+def matar_pool():
+    """
+    Derruba os workers na hora (um deles travou); o próximo obter_pool cria
+    outro pool. As tarefas que estavam no pool não são canceladas: falham com
+    BrokenProcessPool e o agendador devolve as inocentes à fila.
+    """
+    global _pool, _pool_workers, _fila_pids
+    if _pool is not None:
+        sinal = getattr(signal, 'SIGKILL', signal.SIGTERM)
+        for pid in _coletar_pids():
+            try:
+                os.kill(pid, sinal)
+            except OSError:
+                pass
+        try:
+            _pool.shutdown(wait=False)
+        except Exception:
+            pass
+    _pool = None
+    _pool_workers = 0
+    _fila_pids = None
+    _pids_workers.clear()
+
+
+def encerrar_pool():
+    """Finaliza o pool compartilhado (chamado automaticamente na saída)."""
+    global _pool, _pool_workers
+    if _pool is not None:
+        try:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        except Exception:
+            pass
+    _pool = None
+    _pool_workers = 0
+
+
+atexit.register(encerrar_pool)
+
+
+def obter_agendador(workers):
+    """
+    Retorna o agendador de prioridades compartilhado, na frente do pool de
+    `workers` processos. Do config.json: 'envelhecimento_prioridade' e
+    'tempo_limite_imagem' (segundos) e 'tentativas_ocr'.
+    """
+    global _agendador
+    if _agendador is None:
+        config = load_config() or {}
+        try:
+            envelhecimento = float(config.get('envelhecimento_prioridade', ENVELHECIMENTO_PADRAO))
+            tempo_limite = float(config.get('tempo_limite_imagem', TEMPO_LIMITE_PADRAO))
+        except (TypeError, ValueError):
+            envelhecimento, tempo_limite = ENVELHECIMENTO_PADRAO, TEMPO_LIMITE_PADRAO
+        _agendador = AgendadorPrioridades(_executor_do_agendador, workers, envelhecimento, tempo_limite,
+                                          _tentativas_ocr(), matar_executor=matar_pool)
+    _agendador.capacidade = workers
+    return _agendador
+
+
+def resumo_prioridades():
+    """Espera na fila por prioridade desde o início do programa ('' se o pool não foi usado)."""
+    return _agendador.resumo() if _agendador is not None else ""
+
+
+def _executor_do_agendador(recriar=False):
+    if recriar:
+        # Um worker morreu: recria o pool
+        encerrar_pool()
+    return obter_pool(_agendador.capacidade)
+
+
+def processar_lote(imagens, imagens_dir, workers=None, ordenado=False, processar_fn=processar_imagem_detalhado,
+                   prioridade=PRIORIDADE_LOTE):
+    """
+    Processa uma lista de imagens em paralelo.
+
+    Gera um dict por imagem: {'arquivo', 'texto', 'erro', 'tempo', 'metadados'}. Com
+    `ordenado=True` os resultados saem na ordem de `imagens`; caso contrário,
+    conforme terminam. Erros de uma imagem não interrompem o lote.
+
+    TIFFs multipágina e PDFs são divididos em uma tarefa por página, então as
+    páginas de um mesmo documento rodam em paralelo; cada worker decodifica só
+    a sua página. O documento sai uma vez, com a chave extra 'paginas'.
+
+    `prioridade` (agendador_ocr.PRIORIDADE_*) decide a ordem no pool
+    compartilhado quando há outros lotes rodando. Um arquivo que trava,
+    derruba ou estoura a memória do worker em todas as tentativas vai para a
+    quarentena (chave extra 'quarentena' com o novo caminho).
+    """
+    imagens = list(imagens)
+    if not imagens:
+        return
+
+    workers = numero_workers(workers)
+
+    # Uma imagem simples (ou um núcleo) não compensa o custo de subir processos;
+    # com o pool já de pé, ela entra nele pela fila de prioridades
+    unica_simples = len(imagens) == 1 and not eh_documento_paginado(os.path.join(imagens_dir, imagens[0]))
+    if workers == 1 or (unica_simples and _pool is None):
+        executor = _ExecutorLocal()
+    else:
+        executor = obter_agendador(workers)
+
+    # Janela limitada de tarefas pendentes: memória constante em pastas grandes
+    janela = workers * 2
+    pendentes = {}
+    prontos = {}
+    documentos = {}
+    persistentes = set()
+    proximo_entregue = 0
+    tarefas = _tarefas(imagens, imagens_dir)
+    proxima = next(tarefas, None)
+
+    while proxima is not None or pendentes:
+        while proxima is not None and len(pendentes) + len(prontos) < janela:
+            indice, nome, pagina, total = proxima
+            futuro = executor.submit(_processar_item, processar_fn, nome, imagens_dir, pagina, prioridade=prioridade)
+            pendentes[futuro] = proxima
+            proxima = next(tarefas, None)
+
+        concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+        for futuro in concluidos:
+            indice, nome, pagina, total = pendentes.pop(futuro)
+            persistente = False
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Processo morreu ou falhou ao serializar: registra e segue
+                erro = str(e)
+                if eh_falha_persistente(e):
+                    erro = motivo_da_falha(e, getattr(futuro, 'tentativas', 1))
+                    persistente = True
+                resultado = {'arquivo': nome, 'texto': None, 'erro': erro, 'tempo': 0.0,
+                             'metadados': {}, 'pagina': pagina}
+
+            if pagina is not None:
+                paginas = documentos.setdefault(indice, {})
+                paginas[pagina] = resultado
+                if persistente:
+                    persistentes.add(indice)
+                if len(paginas) < total:
+                    continue
+                del documentos[indice]
+                resultado = _resultado_documento(nome, [paginas[i] for i in range(total)])
+                persistente = indice in persistentes
+                persistentes.discard(indice)
+            if persistente and not resultado['texto'] and quarentena_ativa():
+                destino = mover_para_quarentena(imagens_dir, nome, resultado['erro'])
+                if destino:
+                    resultado['quarentena'] = destino
+
+            if not ordenado:
+                yield resultado
+            else:
+                prontos[indice] = resultado
+
+        while ordenado and proximo_entregue in prontos:
+            yield prontos.pop(proximo_entregue)
+            proximo_entregue += 1
+
+
+# ==================== PIPELINE EM ESTÁGIOS ====================
+
+_FIM = object()
+
+
+def _colocar(fila, item, parar):
+    """put() que desiste se o pipeline for interrompido (consumidor abandonou o gerador)."""
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _iniciar_estagio(nome, funcao, entrada, saida, threads, consumidores, parar):
+    """
+    Sobe `threads` threads que aplicam `funcao(item)` (um gerador de itens) a
+    cada item de `entrada` e colocam o que sair em `saida`. Quando a última
+    thread termina, envia um _FIM para cada um dos `consumidores` seguintes.
+    """
+    restantes = [threads]
+    lock = threading.Lock()
+
+    def trabalhar():
+        while not parar.is_set():
+            try:
+                item = entrada.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _FIM:
+                break
+            for novo in funcao(item):
+                if not _colocar(saida, novo, parar):
+                    return
+        with lock:
+            restantes[0] -= 1
+            ultima = restantes[0] == 0
+        if ultima:
+            for _ in range(consumidores):
+                _colocar(saida, _FIM, parar)
+
+    for i in range(threads):
+        threading.Thread(target=trabalhar, name=f"ocr-{nome}-{i}", daemon=True).start()
+
+
+def _item(indice, nome, pagina=None, total=1, **extras):
+    item = {'indice': indice, 'nome': nome, 'pagina': pagina, 'total': total, 'tempos': {}}
+    item.update(extras)
+    return item
+
+
+def _decodificar(imagens_dir, tarefa, com_versao=False):
+    """
+    Estágio 1: consulta o cache e decodifica a imagem (ou cada página, uma por
+    vez) em cinza. Páginas em branco e cópias quase idênticas de imagens já
+    reconhecidas saem daqui com o resultado pronto, como um acerto de cache.
+    Com `com_versao`, cada item leva 'versao' (tamanho, mtime_ns, hash) do
+    arquivo como foi lido, para o manifesto.
+    """
+    indice, nome = tarefa
+    caminho = os.path.join(imagens_dir, nome)
+    entregues = set()
+    total = None
+    versao = None
+    try:
+        try:
+            arquivo = abrir_imagem(caminho)
+        except (OSError, ValueError):
+            yield _item(indice, nome, erro="Arquivo não encontrado ou vazio")
+            return
+
+        # Imagem simples: uma leitura só para o hash do cache e a decodificação.
+        # O arquivo fecha antes do yield, não fica aberto enquanto o item anda no pipeline
+        with arquivo:
+            paginado = arquivo.paginado()
+            if not paginado:
+                inicio = time.perf_counter()
+                chave = chave_cache(caminho, arquivo=arquivo)
+                em_cache = consultar_cache(chave, nome)
+                info = {}
+                if em_cache is None:
+                    cinza = carregar_cinza(arquivo, info)
+            # Do conteúdo que vai para o OCR: um arquivo trocado depois disto não é registrado como feito
+            if com_versao:
+                versao = arquivo.versao()
+
+        if not paginado:
+            if em_cache is not None:
+                yield _item(indice, nome, resultado=em_cache, versao=versao)
+                return
+            item = _item(indice, nome, chave=chave, inicio=inicio, info=info, versao=versao)
+            item['tempos']['decodificacao'] = round(time.perf_counter() - inicio, 4)
+            if cinza is None:
+                item['erro'] = "Não foi possível decodificar a imagem"
+            else:
+                _triar(item, cinza, caminho)
+            yield item
+            return
+
+        total = contar_paginas(caminho)
+        em_cache = {}
+
+        def pular(pagina):
+            resultado = consultar_cache(chave_cache(caminho, pagina), nome)
+            if resultado is not None:
+                em_cache[pagina] = resultado
+                return True
+            return False
+
+        inicio = time.perf_counter()
+        for pagina, pil in iterar_paginas(caminho, pular=pular):
+            item = _item(indice, nome, pagina, total, chave=chave_cache(caminho, pagina), inicio=inicio, versao=versao)
+            if pil is None:
+                item['resultado'] = em_cache.pop(pagina)
+            else:
+                cinza = cinza_de_pil(pil)
+                del pil
+                item['tempos']['decodificacao'] = round(time.perf_counter() - inicio, 4)
+                _triar(item, cinza)
+                del cinza
+            entregues.add(pagina)
+            yield item
+            inicio = time.perf_counter()
+    except Exception as e:
+        if total is None:
+            yield _item(indice, nome, erro=str(e))
+            return
+        # Completa o documento para o gravador não ficar esperando páginas que não virão
+        for pagina in range(total):
+            if pagina not in entregues:
+                yield _item(indice, nome, pagina, total, erro=str(e), versao=versao)
+
+
+def _triar(item, cinza, caminho=None):
+    """
+    Dispensa o OCR de páginas em branco e de cópias de imagens já reconhecidas
+    (só imagens de uma página); as demais seguem com o array para o pré-processamento.
+    """
+    inicio = time.perf_counter()
+    resultado = pagina_em_branco(item['nome'], cinza, item['pagina'])
+    if resultado is None and item['pagina'] is None:
+        resultado, item['visual'] = procurar_duplicata(item['nome'], cinza, caminho)
+    if resultado is not None:
+        item['resultado'] = resultado
+    else:
+        item['cinza'] = cinza
+    item['tempos']['triagem'] = round(time.perf_counter() - inicio, 4)
+
+
+def _preprocessar(item):
+    """Estágio 2: cadeia padrão de pré-processamento sobre o array em cinza."""
+    if 'cinza' in item:
+        inicio = time.perf_counter()
+        try:
+            info = item.get('info', {})
+            item['imagem'] = preparar(item.pop('cinza'), info)
+            item['info'] = info
+            # Varredura muito grande: as faixas vão para o pool separadas
+            item['faixas'] = planejar_faixas(item['imagem'])
+        except Exception as e:
+            item.pop('cinza', None)
+            item['erro'] = str(e)
+        item['tempos']['preprocessamento'] = round(time.perf_counter() - inicio, 4)
+    yield item
+
+
+def _despachar_ocr(entrada, saida, executor, vagas, parar, prioridade):
+    """
+    Estágio 3: envia as imagens prontas ao pool de processos. `vagas` limita
+    quantos itens podem estar entre este estágio e o gravador (contrapressão).
+    """
+    # Conta os itens enviados ao pool que ainda não chegaram à fila do gravador.
+    # Não basta esperar os futures: set_result acorda quem espera antes de rodar
+    # os callbacks, e o _FIM passaria na frente dos últimos resultados
+    pendentes = [0]
+    encaminhados = threading.Condition()
+
+    def concluir(futuro, item):
+        try:
+            item['resultado'] = futuro.result()
+        except Exception as e:
+            # Processo morreu ou falhou ao serializar: registra e segue
+            item['erro'] = str(e)
+            if eh_falha_persistente(e):
+                item['erro'] = motivo_da_falha(e, getattr(futuro, 'tentativas', 1))
+                item['falha_persistente'] = True
+        saida.put(item)
+        with encaminhados:
+            pendentes[0] -= 1
+            encaminhados.notify_all()
+
+    while not parar.is_set():
+        try:
+            item = entrada.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _FIM:
+            break
+        while not vagas.acquire(timeout=0.1):
+            if parar.is_set():
+                return
+        if 'imagem' not in item:
+            saida.put(item)
+            continue
+
+        try:
+            futuro = _submeter_ocr(executor, item, prioridade)
+        except Exception as e:
+            item['erro'] = str(e)
+            saida.put(item)
+            continue
+        with encaminhados:
+            pendentes[0] += 1
+        futuro.add_done_callback(lambda f, item=item: concluir(f, item))
+
+    with encaminhados:
+        while pendentes[0] and not parar.is_set():
+            encaminhados.wait(0.1)
+    saida.put(_FIM)
+
+
+def _submeter_ocr(executor, item, prioridade):
+    """Envia a imagem preparada do item ao executor: uma tarefa só, ou uma por faixa."""
+    imagem, info, faixas = item.pop('imagem'), item.pop('info', None), item.pop('faixas', None)
+    if not faixas:
+        return executor.submit(reconhecer_preparada, item['nome'], imagem, item['pagina'], info,
+                               prioridade=prioridade)
+
+    resultado = Future()
+    forma = imagem.shape
+    inicio = time.perf_counter()
+    juntado = submeter_faixas(executor, imagem, faixas, prioridade)
+
+    def montar(futuro):
+        try:
+            resultado.set_result(montar_resultado_ocr(item['nome'], futuro.result(), forma, item['pagina'],
+                                                      info, inicio))
+        except Exception as e:
+            resultado.set_exception(e)
+
+    juntado.add_done_callback(montar)
+    return resultado
+
+
+def _resultado_do_item(item):
+    """Converte um item que saiu do pipeline no formato de _processar_item."""
+    resultado = item.get('resultado')
+    metadados = dict((resultado or {}).get('metadados') or {})
+    texto = (resultado or {}).get('texto')
+    erro = item.get('erro')
+    if resultado is not None and not metadados.get('cache'):
+        metadados['cache'] = False
+        metadados['tempo_etapas'] = dict(item['tempos'], ocr=metadados.get('tempo', 0.0))
+    if erro is None and not texto and not metadados.get('pagina_branca'):
+        erro = "Nenhum texto extraído"
+    return {
+        'arquivo': item['nome'],
+        'texto': texto,
+        'erro': erro,
+        'tempo': sum(item['tempos'].values()) + metadados.get('tempo', 0.0) if not metadados.get('cache') else 0.0,
+        'metadados': metadados,
+        'pagina': item['pagina'],
+    }
+
+
+def processar_em_fluxo(imagens, imagens_dir, resultados_dir=None, gerenciador=None, tipo_documento="genérico",
+                       workers=None, threads_io=None, manifesto=None, prioridade=PRIORIDADE_LOTE):
+    """
+    Processa as imagens no pipeline em estágios e gera um dict por imagem (no
+    formato de processar_lote), conforme terminam. `imagens` pode ser um
+    gerador: cada nome só é pedido quando há vaga na fila de entrada.
+
+    O próprio gerador é o estágio gravador, único: grava o _texto.txt em
+    `resultados_dir` (chave extra 'salvo_em'), registra no histórico de
+    `gerenciador` e marca o arquivo como processado no `manifesto`
+    (manifesto.ManifestoOCR), se fornecidos, antes de entregar o resultado.
+    Arquivos que travaram ou derrubaram o worker em todas as tentativas vão
+    para a quarentena (chave extra 'quarentena' com o novo caminho).
+    """
+    if isinstance(imagens, (list, tuple)) and not imagens:
+        return
+
+    workers = numero_workers(workers)
+    threads_io = threads_io or min(4, workers)
+    capacidade = workers * 2
+    executor = _ExecutorLocal() if workers == 1 else obter_agendador(workers)
+
+    parar = threading.Event()
+    fila_tarefas = queue.Queue(maxsize=capacidade)
+    fila_decodificadas = queue.Queue(maxsize=capacidade)
+    fila_preparadas = queue.Queue(maxsize=capacidade)
+    # Sem limite próprio: o que entra nela já ocupou uma das `vagas`
+    fila_resultados = queue.Queue()
+    vagas = threading.BoundedSemaphore(capacidade)
+
+    def alimentar():
+        try:
+            for tarefa in enumerate(imagens):
+                if not _colocar(fila_tarefas, tarefa, parar):
+                    return
+        except Exception as e:
+            print(f"⚠️ Erro ao listar as imagens do lote: {e}")
+        for _ in range(threads_io):
+            _colocar(fila_tarefas, _FIM, parar)
+
+    threading.Thread(target=alimentar, name="ocr-tarefas", daemon=True).start()
+    _iniciar_estagio("decodificacao", lambda tarefa: _decodificar(imagens_dir, tarefa, manifesto is not None),
+                     fila_tarefas, fila_decodificadas, threads_io, threads_io, parar)
+    _iniciar_estagio("preprocessamento", _preprocessar, fila_decodificadas, fila_preparadas, threads_io, 1, parar)
+    threading.Thread(target=_despachar_ocr, name="ocr-despacho", daemon=True,
+                     args=(fila_preparadas, fila_resultados, executor, vagas, parar, prioridade)).start()
+
+    documentos = {}
+    persistentes = set()
+    try:
+        while True:
+            try:
+                # Com timeout para o Ctrl-C ser atendido também no Windows
+                item = fila_resultados.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _FIM:
+                break
+            vagas.release()
+
+            resultado = _resultado_do_item(item)
+            if item.get('chave') and resultado['texto'] and not resultado['metadados'].get('cache'):
+                guardar_em_cache(item['chave'], item['resultado'])
+            if item.get('visual') is not None:
+                registrar_duplicata(item['nome'], item['visual'], item.get('resultado'))
+
+            if item.get('falha_persistente'):
+                persistentes.add(item['indice'])
+            if item['pagina'] is not None:
+                paginas = documentos.setdefault(item['indice'], {})
+                paginas[item['pagina']] = resultado
+                if len(paginas) < item['total']:
+                    continue
+                del documentos[item['indice']]
+                resultado = _resultado_documento(item['nome'], [paginas[i] for i in range(item['total'])])
+
+            if item['indice'] in persistentes:
+                persistentes.discard(item['indice'])
+                if not resultado['texto'] and quarentena_ativa():
+                    destino = mover_para_quarentena(imagens_dir, resultado['arquivo'], resultado['erro'])
+                    if destino:
+                        resultado['quarentena'] = destino
+
+            if resultado['texto'] or eh_branca(resultado):
+                try:
+                    if resultados_dir:
+                        resultado['salvo_em'] = salvar_resultado(resultado, resultados_dir)
+                    if gerenciador is not None:
+                        gerenciador.adicionar_documento(resultado['arquivo'], tipo_documento, confianca_de(resultado),
+                                                        observacao_historico(resultado))
+                    if manifesto is not None:
+                        manifesto.registrar(resultado['arquivo'], resultado.get('salvo_em'), item.get('versao'))
+                except Exception as e:
+                    print(f"⚠️ Erro ao gravar {resultado['arquivo']}: {e}")
+            yield resultado
+    finally:
+        parar.set()
+
+
+def salvar_resultado(resultado, resultados_dir):
+    """
+    Grava <nome>_texto.txt em `resultados_dir` e, para documentos com várias
+    páginas, também <nome>_p001_texto.txt, <nome>_p002_texto.txt, ...
+    Retorna o caminho do arquivo do documento.
+    """
+    base = resultado['arquivo'].split('.')[0]
+    caminho = os.path.join(resultados_dir, base + "_texto.txt")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        arquivo.write(resultado['texto'] or '')
+
+    paginas = resultado.get('paginas') or []
+    if len(paginas) > 1:
+        for pagina in paginas:
+            numero = pagina['metadados'].get('pagina', 0) + 1
+            caminho_pagina = os.path.join(resultados_dir, f"{base}_p{numero:03d}_texto.txt")
+            with open(caminho_pagina, "w", encoding="utf-8") as arquivo:
+                arquivo.write(pagina['texto'] or '')
+    return caminho
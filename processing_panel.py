@@ -1,20 +1,41 @@
 """
 Painel de processamento: encapsula área de resultado e botões para processar imagens.
 
+O OCR roda numa thread à parte para a janela não congelar; o texto e as
+mensagens voltam para a thread do Tk por uma fila, drenada com after().
+"Processar Selecionadas" e "Processar Tudo" têm cada um a sua área de
+resultado e podem rodar ao mesmo tempo: as selecionadas entram com
+prioridade interativa e passam na frente do lote no pool. Só o botão do
+tipo que está rodando fica desligado até ele terminar.
+
 API:
   ProcessingPanel(parent, imagens_dir, resultados_dir, process_image_fn, listar_images_fn, gerenciador, get_selected_fn)
 
 """
 import os
+import queue
 import threading
 import customtkinter as ctk
 from tkinter import scrolledtext, messagebox
+from processamento_lote import processar_lote, numero_workers, resumo_prioridades
+from agendador_ocr import PRIORIDADE_INTERATIVA
+from cache_ocr import obter_cache, resumo_desde
+from niveis_ocr import ResumoNiveis
+from ocr_funcoes import confianca_de, observacao_historico
+from pagina_branca import eh_branca
+from manifesto import ManifestoOCR
+from trabalhos import JornalTrabalhos, preparar_trabalho, executar_trabalho
 try:
     from cdigo.theme import PALETA
 except Exception:
     from theme import PALETA
 
 
+# Tipos de processamento: no máximo um de cada em andamento
+SELECIONADAS = 'selecionadas'
+TUDO = 'tudo'
+
+
 class ProcessingPanel(ctk.CTkFrame):
     def __init__(self, parent, imagens_dir, resultados_dir, process_image_fn, listar_images_fn, gerenciador, get_selected_fn, **kwargs):
         super().__init__(parent, **kwargs)
@@ -25,39 +46,101 @@ class ProcessingPanel(ctk.CTkFrame):
         self.gerenciador = gerenciador
         self.get_selected_fn = get_selected_fn
         self.parent = parent
+        self._fila_ui = queue.Queue()
+        # tipo -> thread em andamento
+        self._execucoes = {}
 
         title_right = ctk.CTkLabel(self, text="✅ Resultado da Extração", font=("Segoe UI", 14, "bold"), text_color=PALETA["accent"])
         title_right.pack(anchor="w", pady=(0, 10))
 
-        self.texto_resultado = scrolledtext.ScrolledText(self, font=("Courier New", 10), bg=PALETA["fundo_escuro"], fg=PALETA["sucesso"], insertbackground=PALETA["accent"])
-        self.texto_resultado.pack(fill="both", expand=True, pady=(0, 10))
+        self._saidas = {}
+        for tipo, titulo in ((SELECIONADAS, "▶️ Selecionadas"), (TUDO, "⚡ Processar Tudo")):
+            ctk.CTkLabel(self, text=titulo, font=("Segoe UI", 11, "bold"), text_color=PALETA["texto_secundario"]).pack(anchor="w")
+            saida = scrolledtext.ScrolledText(self, font=("Courier New", 10), height=10, bg=PALETA["fundo_escuro"], fg=PALETA["sucesso"], insertbackground=PALETA["accent"])
+            saida.pack(fill="both", expand=True, pady=(0, 10))
+            self._saidas[tipo] = saida
 
         process_btn_frame = ctk.CTkFrame(self, fg_color="transparent")
         process_btn_frame.pack(fill="x")
 
-        ctk.CTkButton(process_btn_frame, text="▶️ Processar Selecionadas", font=("Segoe UI", 11, "bold"), fg_color=PALETA["botao_primario"], hover_color=PALETA["botao_hover"], text_color=PALETA["texto_principal"], command=self.process_selected, height=40).pack(side="left", padx=5, fill="x", expand=True)
-        ctk.CTkButton(process_btn_frame, text="⚡ Processar Tudo", font=("Segoe UI", 11, "bold"), fg_color=PALETA["botao_primario"], hover_color=PALETA["botao_hover"], text_color=PALETA["texto_principal"], command=self.process_all, height=40).pack(side="left", padx=5, fill="x", expand=True)
+        self._botoes = {
+            SELECIONADAS: ctk.CTkButton(process_btn_frame, text="▶️ Processar Selecionadas", font=("Segoe UI", 11, "bold"), fg_color=PALETA["botao_primario"], hover_color=PALETA["botao_hover"], text_color=PALETA["texto_principal"], command=self.process_selected, height=40),
+            TUDO: ctk.CTkButton(process_btn_frame, text="⚡ Processar Tudo", font=("Segoe UI", 11, "bold"), fg_color=PALETA["botao_primario"], hover_color=PALETA["botao_hover"], text_color=PALETA["texto_principal"], command=self.process_all, height=40),
+        }
+        for botao in self._botoes.values():
+            botao.pack(side="left", padx=5, fill="x", expand=True)
 
-    def _save_text(self, imagem, texto):
+    def _save_text(self, imagem, texto, resultados_dir):
         nome_salvar = imagem.split('.')[0] + "_texto.txt"
-        caminho_salvar = os.path.join(self.resultados_dir, nome_salvar)
+        caminho_salvar = os.path.join(resultados_dir, nome_salvar)
         try:
             with open(caminho_salvar, "w", encoding="utf-8") as f:
                 f.write(texto)
         except Exception:
             pass
 
-    def _append(self, txt):
+    def _append(self, tipo, txt):
+        # Pode vir da thread de processamento: o widget só é tocado na thread do Tk
+        self._na_interface(self._escrever, tipo, txt)
+
+    def _escrever(self, tipo, txt):
         try:
-            self.texto_resultado.insert("end", txt)
-            self.texto_resultado.see("end")
+            self._saidas[tipo].insert("end", txt)
+            self._saidas[tipo].see("end")
+        except Exception:
+            pass
+
+    def _na_interface(self, fn, *args):
+        """Agenda fn(*args) para rodar na thread do Tk (ver _drenar_fila)."""
+        self._fila_ui.put((fn, args))
+
+    def _drenar_fila(self):
+        # Vivas antes de drenar: o que uma thread pôs na fila antes de terminar não se perde
+        terminadas = [tipo for tipo, thread in self._execucoes.items() if not thread.is_alive()]
+        while True:
+            try:
+                fn, args = self._fila_ui.get_nowait()
+            except queue.Empty:
+                break
             try:
-                self.parent.update()
+                fn(*args)
             except Exception:
                 pass
+        for tipo in terminadas:
+            del self._execucoes[tipo]
+            self._habilitar_botao(tipo, True)
+        # Um laço de drenagem só, enquanto houver alguma execução
+        if self._execucoes:
+            self.after(100, self._drenar_fila)
+
+    def _habilitar_botao(self, tipo, habilitar):
+        try:
+            self._botoes[tipo].configure(state="normal" if habilitar else "disabled")
         except Exception:
             pass
 
+    def _ocupado(self, tipo):
+        if tipo not in self._execucoes:
+            return False
+        messagebox.showwarning("Aviso", "Este processamento já está em andamento")
+        return True
+
+    def _em_segundo_plano(self, tipo, alvo, *args):
+        """Roda alvo(*args) numa thread, com o botão do `tipo` desligado até ela terminar."""
+        drenando = bool(self._execucoes)
+        self._habilitar_botao(tipo, False)
+        self._execucoes[tipo] = threading.Thread(target=self._rodar, args=(tipo, alvo) + args, daemon=True)
+        self._execucoes[tipo].start()
+        if not drenando:
+            self.after(100, self._drenar_fila)
+
+    def _rodar(self, tipo, alvo, *args):
+        try:
+            alvo(*args)
+        except Exception as e:
+            self._append(tipo, f"❌ ERRO: {e}\n")
+            self._na_interface(messagebox.showerror, "Erro", f"Erro: {e}")
+
     def process_selected(self):
         selected = set()
         try:
@@ -69,34 +152,51 @@ class ProcessingPanel(ctk.CTkFrame):
             messagebox.showwarning("Aviso", "Nenhuma imagem selecionada!")
             return
 
-        # Run synchronously but keep UI responsive
+        if self._ocupado(SELECIONADAS):
+            return
+        self._saidas[SELECIONADAS].delete("1.0", "end")
+        # Os diretórios e o histórico valem como estavam no clique, mesmo que mudem durante o lote
+        self._em_segundo_plano(SELECIONADAS, self._processar_selecionadas, sorted(selected), self.imagens_dir,
+                               self.resultados_dir, self.gerenciador)
+
+    def _processar_selecionadas(self, selected, imagens_dir, resultados_dir, gerenciador):
         processadas = 0
         erros = 0
-        self.texto_resultado.delete("1.0", "end")
-        self._append(f"⏳ Processando {len(selected)} imagem(ns)...\n\n")
+        self._append(SELECIONADAS, f"⏳ Processando {len(selected)} imagem(ns)...\n\n")
 
-        for imagem in sorted(selected):
-            self._append(f"🔄 {imagem}...\n")
-            try:
-                resultado = self.process_image_fn(imagem, self.imagens_dir)
-                if resultado:
-                    self._save_text(imagem, resultado)
+        # Prioridade interativa: com um "Processar Tudo" em andamento, passa na frente do lote no pool
+        try:
+            for resultado in processar_lote(selected, imagens_dir, processar_fn=self.process_image_fn,
+                                            prioridade=PRIORIDADE_INTERATIVA):
+                imagem = resultado['arquivo']
+                if resultado['texto']:
+                    self._save_text(imagem, resultado['texto'], resultados_dir)
+                    try:
+                        gerenciador.adicionar_documento(imagem, "genérico", confianca_de(resultado),
+                                                        observacao_historico(resultado))
+                    except Exception:
+                        pass
+                    self._append(SELECIONADAS, f"✅ {imagem} ({resultado['tempo']:.1f}s)\n")
+                    processadas += 1
+                elif eh_branca(resultado):
                     try:
-                        self.gerenciador.adicionar_documento(imagem, "genérico")
+                        gerenciador.adicionar_documento(imagem, "genérico", 0, observacao_historico(resultado))
                     except Exception:
                         pass
-                    self._append("✅ OK\n\n")
+                    self._append(SELECIONADAS, f"📄 {imagem}: página em branco\n")
                     processadas += 1
                 else:
-                    self._append("❌ FALHA\n\n")
+                    self._append(SELECIONADAS, f"❌ {imagem}: {resultado['erro']}\n")
                     erros += 1
-            except Exception as e:
-                self._append(f"❌ ERRO: {e}\n\n")
-                erros += 1
+        except Exception as e:
+            self._append(SELECIONADAS, f"❌ ERRO: {e}\n\n")
+            erros += 1
 
-        self._append("\n" + '='*50 + "\n")
-        self._append(f"📊 RESUMO: {processadas} processadas, {erros} erros\n")
-        messagebox.showinfo("Sucesso", f"✅ {processadas} imagem(ns) processada(s)!")
+        self._append(SELECIONADAS, "\n" + '='*50 + "\n")
+        self._append(SELECIONADAS, f"📊 RESUMO: {processadas} processadas, {erros} erros\n")
+        if resumo_prioridades():
+            self._append(SELECIONADAS, resumo_prioridades() + "\n")
+        self._na_interface(messagebox.showinfo, "Sucesso", f"✅ {processadas} imagem(ns) processada(s)!")
 
     def process_all(self):
         imagens = []
@@ -108,32 +208,62 @@ class ProcessingPanel(ctk.CTkFrame):
         if not imagens:
             messagebox.showwarning("Aviso", "Nenhuma imagem encontrada!")
             return
+        if self._ocupado(TUDO):
+            return
+        self._saidas[TUDO].delete("1.0", "end")
+        self._em_segundo_plano(TUDO, self._processar_tudo, imagens, self.imagens_dir, self.resultados_dir, self.gerenciador)
 
-        self.texto_resultado.delete("1.0", "end")
+    def _processar_tudo(self, imagens, imagens_dir, resultados_dir, gerenciador):
+        # Só o que mudou desde o último processamento (ou com config/motor diferente)
+        manifesto = ManifestoOCR(imagens_dir)
+        total = len(imagens)
+        imagens = manifesto.pendentes(imagens, resultados_dir)
+        if total > len(imagens):
+            self._append(TUDO, f"⏭️ {total - len(imagens)} imagem(ns) sem alteração, ignorada(s)\n")
+        # Um trabalho interrompido desta pasta continua de onde parou
+        jornal = JornalTrabalhos()
+        trabalho_id = jornal.inacabado(imagens_dir)
+        if not imagens and trabalho_id is None:
+            jornal.fechar()
+            manifesto.fechar()
+            self._na_interface(messagebox.showinfo, "Sucesso", "✅ Nada a processar: todas as imagens já estão atualizadas")
+            return
+        if trabalho_id:
+            self._append(TUDO, f"▶️ Retomando o trabalho interrompido {trabalho_id}\n")
+        trabalho_id = preparar_trabalho(jornal, imagens, imagens_dir, resultados_dir)
+        pendentes = len(jornal.pendentes(trabalho_id))
+        self._append(TUDO, f"⏳ Processando {pendentes} imagem(ns) com {numero_workers()} processo(s)...\n\n")
         processadas = 0
         erros = 0
-        for img in imagens:
-            self._append(f"🔄 {img}...\n")
-            try:
-                resultado = self.process_image_fn(img, self.imagens_dir)
-                if resultado:
-                    self._save_text(img, resultado)
-                    try:
-                        self.gerenciador.adicionar_documento(img, "genérico")
-                    except Exception:
-                        pass
-                    self._append("✅ OK\n")
-                    processadas += 1
-                else:
-                    self._append("❌ FALHA\n")
-                    erros += 1
-            except Exception as e:
-                self._append(f"❌ ERRO: {e}\n")
+        cache = obter_cache()
+        antes = cache.estatisticas() if cache else None
+        niveis = ResumoNiveis()
+        # O pipeline grava o _texto.txt; o trabalho marca no diário e registra no histórico
+        for resultado in executar_trabalho(jornal, trabalho_id, gerenciador, manifesto=manifesto):
+            img = resultado['arquivo']
+            niveis.registrar(resultado)
+            if resultado['texto']:
+                self._append(TUDO, f"✅ {img} ({resultado['tempo']:.1f}s, confiança {confianca_de(resultado):.0f}%)\n")
+                processadas += 1
+            elif eh_branca(resultado):
+                self._append(TUDO, f"📄 {img}: página em branco\n")
+                processadas += 1
+            else:
+                self._append(TUDO, f"❌ {img}: {resultado['erro']}\n")
                 erros += 1
+        jornal.fechar()
+        manifesto.fechar()
 
-        self._append("\n" + '='*50 + "\n")
-        self._append(f"📊 RESUMO: {processadas} processadas, {erros} erros\n")
-        messagebox.showinfo("Sucesso", "⚡ Processamento concluído!")
+        self._append(TUDO, "\n" + '='*50 + "\n")
+        self._append(TUDO, f"📊 RESUMO: {processadas} processadas, {erros} erros\n")
+        resumo_cache = resumo_desde(antes)
+        if resumo_cache:
+            self._append(TUDO, resumo_cache + "\n")
+        if niveis.texto():
+            self._append(TUDO, niveis.texto() + "\n")
+        if resumo_prioridades():
+            self._append(TUDO, resumo_prioridades() + "\n")
+        self._na_interface(messagebox.showinfo, "Sucesso", "⚡ Processamento concluído!")
 
     def set_dirs(self, imagens_dir=None, resultados_dir=None):
         """Atualiza os diretórios usados pelo painel."""
@@ -0,0 +1,70 @@
+"""
+Quarentena de arquivos problemáticos.
+
+Um arquivo que trava o Tesseract, derruba o worker ou estoura a memória em
+todas as tentativas é movido para <pasta de imagens>/quarentena/, junto com
+um <nome>.motivo.txt. Assim ele sai de "Processar Tudo" e da pasta monitorada
+(que só olham o primeiro nível) e não volta a segurar os próximos lotes.
+Para tentar de novo, basta mover o arquivo de volta.
+
+Desligue com "quarentena": false no config.json.
+
+API:
+  mover_para_quarentena(imagens_dir, nome, motivo) -> novo caminho (ou None)
+  motivo_da_falha(erro, tentativas) -> texto do motivo
+  quarentena_ativa() -> bool
+"""
+import os
+import shutil
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from cdigo.config import load_config
+except Exception:
+    from config import load_config
+
+
+PASTA_QUARENTENA = 'quarentena'
+
+
+def quarentena_ativa():
+    try:
+        return bool((load_config() or {}).get('quarentena', True))
+    except Exception:
+        return True
+
+
+def motivo_da_falha(erro, tentativas=1):
+    """Descreve uma falha do agendador (tempo esgotado, worker morto, memória) em português."""
+    if isinstance(erro, TimeoutError):
+        motivo = f"tempo esgotado ({erro})"
+    elif isinstance(erro, BrokenProcessPool):
+        motivo = "o worker do OCR morreu (falha grave ou falta de memória)"
+    elif isinstance(erro, MemoryError):
+        motivo = "falta de memória"
+    else:
+        motivo = str(erro)
+    return f"{motivo} em {tentativas} tentativa(s)"
+
+
+def mover_para_quarentena(imagens_dir, nome, motivo):
+    """Move `nome` para a quarentena de `imagens_dir` e grava o motivo ao lado."""
+    origem = os.path.join(imagens_dir, nome)
+    pasta = os.path.join(imagens_dir, PASTA_QUARENTENA)
+    destino = os.path.join(pasta, nome)
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        if os.path.exists(destino):
+            base, extensao = os.path.splitext(nome)
+            destino = os.path.join(pasta, f"{base}_{time.strftime('%Y%m%d-%H%M%S')}{extensao}")
+        shutil.move(origem, destino)
+        with open(destino + ".motivo.txt", "w", encoding="utf-8") as f:
+            f.write(f"arquivo: {nome}\n")
+            f.write(f"data: {time.strftime('%d/%m/%Y %H:%M:%S')}\n")
+            f.write(f"motivo: {motivo}\n")
+    except OSError as e:
+        print(f"⚠️ Não foi possível mover {nome} para a quarentena: {e}")
+        return None
+    print(f"🚫 {nome} movido para a quarentena: {motivo}")
+    return destino
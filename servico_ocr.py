@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Serviço HTTP local de OCR (asyncio, só biblioteca padrão).
+
+Um único processo mantém o pool de workers aquecido (processamento_lote.obter_pool)
+e atende vários clientes: cada requisição vira uma tarefa de
+processar_imagem_detalhado no pool, sem cada ferramenta subir o próprio Tesseract.
+No máximo `workers` imagens rodam ao mesmo tempo; até `limite_fila` esperam a
+vez e o excedente recebe 503 (com Retry-After) em vez de acumular memória.
+
+Endpoints:
+  POST /ocr       corpo = bytes da imagem (?nome=doc.png opcional), multipart/form-data
+                  com um arquivo, ou JSON {"caminho": "/pasta/doc.png"} (só com --raiz, e o
+                  caminho real, com links resolvidos, precisa estar dentro dela); ?prioridade=lote
+                  para trabalho em massa (padrão: interativa, passa na frente dos lotes)
+                  -> {"arquivo", "texto", "confianca", "tempo", "campos", "metadados"}
+  GET  /saude     -> {"status": "ok", ...}
+  GET  /metricas  -> contadores, fila, latências (p50/p95) e espera por prioridade no pool
+
+Uso:
+  python servico_ocr.py [--host 127.0.0.1] [--porta 8765] [--workers N] [--fila N] [--limite-mb 50] [--raiz DIR]
+
+  curl --data-binary @doc.png "http://127.0.0.1:8765/ocr?nome=doc.png"
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+
+from ocr_funcoes import processar_imagem_detalhado, confianca_de, eh_imagem
+from processamento_lote import _processar_item, obter_pool, obter_agendador, encerrar_pool, numero_workers
+from agendador_ocr import PRIORIDADE_INTERATIVA, PRIORIDADE_LOTE, eh_falha_persistente
+from quarentena import motivo_da_falha
+from processador_dados import ProcessadorDados
+from pagina_branca import eh_branca
+from ocr_backends import obter_backend
+
+
+MOTIVOS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+           413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+class ServicoOCR:
+    """Servidor HTTP assíncrono que despacha OCR para o pool de processos."""
+
+    def __init__(self, host='127.0.0.1', porta=8765, workers=None, limite_fila=None, limite_mb=50, raiz=None):
+        self.host = host
+        self.porta = porta
+        self.workers = numero_workers(workers)
+        self.limite_fila = self.workers * 4 if limite_fila is None else limite_fila
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self.raiz = os.path.realpath(raiz) if raiz else None
+
+        self._pasta_envios = None
+        self._vagas = None
+        self._servidor = None
+        self._inicio = time.time()
+        self._aguardando = 0
+        self._em_andamento = 0
+        self._contadores = collections.Counter()
+        self._latencias = collections.deque(maxlen=1000)
+
+    # ---------- ciclo de vida ----------
+
+    async def iniciar(self):
+        """Abre o socket e aquece o pool; retorna a porta efetiva (útil com porta=0)."""
+        self._vagas = asyncio.Semaphore(self.workers)
+        self._pasta_envios = tempfile.mkdtemp(prefix="ocr_servico_")
+        self._inicio = time.time()
+        pool = obter_pool(self.workers)
+        # Sobe os processos agora: a primeira requisição não paga o carregamento do motor
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(pool, os.getpid) for _ in range(self.workers)])
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+        return self.porta
+
+    async def encerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        if self._pasta_envios:
+            shutil.rmtree(self._pasta_envios, ignore_errors=True)
+
+    async def servir(self):
+        """Inicia e atende até Ctrl-C ou SIGTERM (systemd, docker stop)."""
+        await self.iniciar()
+        print(f"🌐 Serviço OCR em http://{self.host}:{self.porta} ({self.workers} processo(s), "
+              f"fila até {self.limite_fila})")
+        parar = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sinal, parar.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows: o Ctrl-C chega como KeyboardInterrupt em main()
+                pass
+        try:
+            await parar.wait()
+        finally:
+            await self.encerrar()
+
+    # ---------- HTTP ----------
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha.strip():
+                    break
+                try:
+                    metodo, alvo, versao = linha.decode('latin-1').split()
+                    cabecalhos = await self._ler_cabecalhos(reader)
+                    corpo = await self._ler_corpo(reader, metodo, cabecalhos)
+                except (ValueError, UnicodeDecodeError):
+                    await self._responder(writer, 400, {'erro': "requisição HTTP inválida"}, manter=False)
+                    break
+                except ErroHTTP as e:
+                    await self._responder(writer, e.status, {'erro': e.mensagem}, manter=False)
+                    break
+
+                manter = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+                self._contadores['requisicoes'] += 1
+                try:
+                    status, resposta = await self._rotear(metodo, alvo, cabecalhos, corpo)
+                except ErroHTTP as e:
+                    status, resposta = e.status, {'erro': e.mensagem}
+                except Exception as e:
+                    print(f"❌ Erro no serviço OCR: {e}")
+                    status, resposta = 500, {'erro': str(e)}
+                extras = {'Retry-After': '1'} if status == 503 else None
+                await self._responder(writer, status, resposta, manter, extras)
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _ler_cabecalhos(self, reader):
+        cabecalhos = {}
+        while True:
+            linha = await reader.readline()
+            if linha in (b'\r\n', b'\n', b''):
+                return cabecalhos
+            if len(cabecalhos) >= 100:
+                raise ErroHTTP(400, "cabeçalhos demais")
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+    async def _ler_corpo(self, reader, metodo, cabecalhos):
+        if 'chunked' in cabecalhos.get('transfer-encoding', '').lower():
+            raise ErroHTTP(411, "envie Content-Length (chunked não é suportado)")
+        tamanho = int(cabecalhos.get('content-length') or 0)
+        if tamanho > self.limite_bytes:
+            raise ErroHTTP(413, f"arquivo maior que {self.limite_bytes // (1024 * 1024)} MB")
+        return await reader.readexactly(tamanho) if tamanho else b''
+
+    async def _responder(self, writer, status, corpo, manter=True, extras=None):
+        dados = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+        linhas = [f"HTTP/1.1 {status} {MOTIVOS.get(status, '')}",
+                  "Content-Type: application/json; charset=utf-8",
+                  f"Content-Length: {len(dados)}",
+                  f"Connection: {'keep-alive' if manter else 'close'}"]
+        for nome, valor in (extras or {}).items():
+            linhas.append(f"{nome}: {valor}")
+        writer.write(("\r\n".join(linhas) + "\r\n\r\n").encode('latin-1') + dados)
+        await writer.drain()
+
+    async def _rotear(self, metodo, alvo, cabecalhos, corpo):
+        url = urlsplit(alvo)
+        rota = url.path.rstrip('/') or '/'
+        if rota == '/saude':
+            return 200, self.saude()
+        if rota == '/metricas':
+            return 200, self.metricas()
+        if rota == '/ocr':
+            if metodo != 'POST':
+                raise ErroHTTP(405, "use POST em /ocr")
+            return 200, await self._ocr(cabecalhos, corpo, parse_qs(url.query))
+        raise ErroHTTP(404, f"rota desconhecida: {url.path}")
+
+    # ---------- OCR ----------
+
+    async def _ocr(self, cabecalhos, corpo, parametros):
+        if not corpo:
+            raise ErroHTTP(400, "corpo vazio: envie a imagem ou {\"caminho\": ...}")
+        tipo = cabecalhos.get('content-type', '').lower()
+        temporario = None
+        if tipo.startswith('application/json'):
+            caminho = self._caminho_permitido(corpo)
+        else:
+            nome, dados = self._extrair_envio(tipo, cabecalhos, corpo, parametros)
+            temporario = os.path.join(self._pasta_envios, uuid.uuid4().hex)
+            caminho = os.path.join(temporario, nome)
+            # Até limite_mb no disco: fora do laço de eventos, que continua atendendo os outros clientes
+            await asyncio.get_running_loop().run_in_executor(None, self._gravar_envio, caminho, dados)
+
+        # Fila limitada: quem não cabe recebe 503 na hora
+        if self._vagas.locked() and self._aguardando >= self.limite_fila:
+            if temporario:
+                shutil.rmtree(temporario, ignore_errors=True)
+            self._contadores['rejeitadas'] += 1
+            raise ErroHTTP(503, "fila cheia, tente de novo")
+
+        prioridade = PRIORIDADE_LOTE if (parametros.get('prioridade') or [''])[0] == 'lote' else PRIORIDADE_INTERATIVA
+        chegada = time.perf_counter()
+        self._aguardando += 1
+        try:
+            async with self._vagas:
+                self._aguardando -= 1
+                self._em_andamento += 1
+                try:
+                    futuro = obter_agendador(self.workers).submit(
+                        _processar_item, processar_imagem_detalhado, os.path.basename(caminho),
+                        os.path.dirname(caminho), prioridade=prioridade)
+                    try:
+                        resultado = await asyncio.wrap_future(futuro)
+                    except Exception as e:
+                        # Travou, derrubou ou estourou a memória em todas as tentativas do agendador
+                        if not eh_falha_persistente(e):
+                            raise
+                        self._contadores['falhas'] += 1
+                        raise ErroHTTP(422, motivo_da_falha(e, getattr(futuro, 'tentativas', 1)))
+                finally:
+                    self._em_andamento -= 1
+        finally:
+            if temporario:
+                shutil.rmtree(temporario, ignore_errors=True)
+
+        latencia = time.perf_counter() - chegada
+        self._latencias.append(latencia)
+        if not resultado['texto'] and not eh_branca(resultado):
+            self._contadores['falhas'] += 1
+            raise ErroHTTP(422, resultado['erro'] or "Nenhum texto extraído")
+        self._contadores['concluidas'] += 1
+
+        campos = ProcessadorDados.estruturar_dados(resultado['texto'])
+        campos.pop('texto_completo', None)
+        return {
+            'arquivo': os.path.basename(caminho),
+            'texto': resultado['texto'],
+            'confianca': confianca_de(resultado),
+            'branca': eh_branca(resultado),
+            'tempo': round(resultado['tempo'], 3),
+            'latencia': round(latencia, 3),
+            'campos': campos,
+            'metadados': resultado['metadados'],
+        }
+
+    def _caminho_permitido(self, corpo):
+        try:
+            caminho = json.loads(corpo.decode('utf-8')).get('caminho')
+        except (ValueError, AttributeError):
+            raise ErroHTTP(400, "JSON inválido: esperado {\"caminho\": ...}")
+        if not caminho:
+            raise ErroHTTP(400, "informe \"caminho\"")
+        # Sem --raiz qualquer cliente leria qualquer arquivo do usuário do serviço
+        if not self.raiz:
+            raise ErroHTTP(403, "caminhos só são aceitos com --raiz; envie os bytes da imagem")
+        # realpath: um link simbólico dentro da raiz não pode apontar para fora dela
+        caminho = os.path.realpath(caminho)
+        if os.path.commonpath([self.raiz, caminho]) != self.raiz:
+            raise ErroHTTP(403, "caminho fora da pasta permitida")
+        if not os.path.isfile(caminho):
+            raise ErroHTTP(404, f"arquivo não encontrado: {caminho}")
+        return caminho
+
+    @staticmethod
+    def _gravar_envio(caminho, dados):
+        os.makedirs(os.path.dirname(caminho))
+        with open(caminho, 'wb') as f:
+            f.write(dados)
+
+    @staticmethod
+    def _extrair_envio(tipo, cabecalhos, corpo, parametros):
+        """(nome, bytes) do envio: corpo bruto ou o primeiro arquivo de um multipart/form-data."""
+        nome = (parametros.get('nome') or ['imagem.png'])[0]
+        dados = corpo
+        if tipo.startswith('multipart/form-data'):
+            mensagem = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {cabecalhos['content-type']}\r\n\r\n".encode('latin-1') + corpo)
+            for parte in mensagem.iter_parts():
+                if parte.get_filename():
+                    nome, dados = parte.get_filename(), parte.get_payload(decode=True)
+                    break
+            else:
+                raise ErroHTTP(400, "multipart sem arquivo")
+        nome = os.path.basename(nome.replace('\\', '/'))
+        if not eh_imagem(nome):
+            raise ErroHTTP(400, f"extensão não suportada: {nome}")
+        return nome, dados
+
+    # ---------- saúde e métricas ----------
+
+    def saude(self):
+        try:
+            backend = obter_backend()
+            motor = f"{backend.nome} {backend.versao()}"
+        except Exception as e:
+            motor = f"indisponível: {e}"
+        return {'status': 'ok', 'workers': self.workers, 'motor': motor,
+                'tempo_no_ar': round(time.time() - self._inicio, 1)}
+
+    def metricas(self):
+        latencias = sorted(self._latencias)
+
+        def percentil(p):
+            return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))], 3) if latencias else None
+
+        return {
+            'requisicoes': self._contadores['requisicoes'],
+            'concluidas': self._contadores['concluidas'],
+            'falhas': self._contadores['falhas'],
+            'rejeitadas': self._contadores['rejeitadas'],
+            'em_andamento': self._em_andamento,
+            'na_fila': self._aguardando,
+            'workers': self.workers,
+            'limite_fila': self.limite_fila,
+            'latencia_p50': percentil(0.50),
+            'latencia_p95': percentil(0.95),
+            'tempo_no_ar': round(time.time() - self._inicio, 1),
+            'prioridades': obter_agendador(self.workers).metricas(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de OCR")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765, help="0 escolhe uma porta livre")
+    parser.add_argument('--workers', type=int, default=None, help="Processos de OCR (padrão: config.json ou núcleos)")
+    parser.add_argument('--fila', type=int, default=None, help="Requisições esperando além das em andamento (padrão: 4 por worker)")
+    parser.add_argument('--limite-mb', type=float, default=50, help="Tamanho máximo do envio")
+    parser.add_argument('--raiz', help="Aceita {\"caminho\": ...} só dentro desta pasta (sem ela, só envio de bytes)")
+    args = parser.parse_args(argv)
+
+    servico = ServicoOCR(args.host, args.porta, args.workers, args.fila, args.limite_mb, args.raiz)
+    try:
+        asyncio.run(servico.servir())
+    except KeyboardInterrupt:
+        print("\n👋 Serviço encerrado")
+    finally:
+        encerrar_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Testes do cache de OCR (cache_ocr.CacheOCR).
+
+Rodar com: python -m pytest -q
+"""
+import sqlite3
+
+import pytest
+
+from cache_ocr import CacheOCR
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / 'cache.db')
+
+
+def _contadores(caminho):
+    with sqlite3.connect(caminho) as conn:
+        return dict(conn.execute('SELECT nome, valor FROM contadores').fetchall())
+
+
+def test_consultas_nao_escrevem_ate_a_descarga(caminho):
+    cache = CacheOCR(caminho)
+    cache.guardar('a', 'texto')
+    assert cache.obter('a')['texto'] == 'texto'
+    assert cache.obter('b') is None
+    assert _contadores(caminho)['acertos'] == 0
+
+    cache.descarregar()
+    contadores = _contadores(caminho)
+    assert (contadores['acertos'], contadores['falhas']) == (1, 1)
+
+
+def test_tamanho_total_acompanha_substituicao_e_despejo(caminho):
+    cache = CacheOCR(caminho, limite_bytes=100)
+    cache.guardar('a', 'x' * 40)
+    cache.guardar('a', 'x' * 10)
+    cache.guardar('b', 'y' * 40)
+    cache.guardar('c', 'z' * 40)
+
+    with sqlite3.connect(caminho) as conn:
+        soma = conn.execute('SELECT SUM(tamanho) FROM resultados').fetchone()[0]
+    assert cache.estatisticas()['tamanho_bytes'] == soma <= 100
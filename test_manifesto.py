@@ -0,0 +1,37 @@
+"""
+Testes do manifesto incremental (manifesto.ManifestoOCR).
+
+Rodar com: python -m pytest -q
+"""
+import pytest
+
+from leitura_imagem import abrir_imagem
+from manifesto import ManifestoOCR
+
+
+@pytest.fixture
+def manifesto(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path / 'config'))
+    monkeypatch.setenv('APPDATA', str(tmp_path / 'config'))
+    monkeypatch.setattr('manifesto.assinatura_processamento', lambda: 'teste')
+    imagens = tmp_path / 'imagens'
+    imagens.mkdir()
+    (imagens / 'a.png').write_bytes(b'conteudo original')
+    m = ManifestoOCR(str(imagens), caminho=str(tmp_path / 'manifesto.db'))
+    yield m
+    m.fechar()
+
+
+def test_arquivo_registrado_nao_fica_pendente(manifesto):
+    manifesto.registrar('a.png')
+    assert manifesto.pendentes(['a.png']) == []
+
+
+def test_arquivo_trocado_durante_o_ocr_fica_pendente(manifesto, tmp_path):
+    with abrir_imagem(str(tmp_path / 'imagens' / 'a.png')) as arquivo:
+        versao = arquivo.versao()
+    # Trocado depois da leitura, antes de o resultado ser registrado
+    (tmp_path / 'imagens' / 'a.png').write_bytes(b'conteudo novo, outro tamanho')
+    manifesto.registrar('a.png', versao=versao)
+
+    assert manifesto.pendentes(['a.png']) == ['a.png']
@@ -0,0 +1,51 @@
+"""
+Testes da decodificação reduzida de JPEGs (preprocessamento.carregar_cinza).
+
+Rodar com: python -m pytest -q
+"""
+import cv2
+import numpy as np
+import pytest
+
+import preprocessamento
+
+
+@pytest.fixture(autouse=True)
+def config_isolado(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path / 'config'))
+    monkeypatch.setenv('APPDATA', str(tmp_path / 'config'))
+    monkeypatch.setattr(preprocessamento, '_perfil', None)
+
+
+def _jpeg(caminho, largura, altura, tamanho_letra):
+    imagem = np.full((altura, largura), 255, np.uint8)
+    for y in range(150, altura - 50, int(60 * tamanho_letra)):
+        cv2.putText(imagem, "Texto de teste " * 10, (50, y), cv2.FONT_HERSHEY_SIMPLEX, tamanho_letra, 0, 3)
+    cv2.imwrite(str(caminho), imagem)
+    return str(caminho)
+
+
+def test_fator_depende_so_do_tamanho():
+    assert preprocessamento.fator_decodificacao(6000, 4000, 3.0) == 2
+    assert preprocessamento.fator_decodificacao(12000, 8000, 3.0) == 4
+    assert preprocessamento.fator_decodificacao(2000, 1500, 3.0) == 1
+
+
+def test_mesmo_arquivo_mesma_escala_em_qualquer_ordem(tmp_path):
+    # Mesmo tamanho de cabeçalho, texto bem diferente: a primeira não pode mudar a escala da segunda
+    grande = _jpeg(tmp_path / 'grande.jpg', 6000, 4000, 6.0)
+    pequeno = _jpeg(tmp_path / 'pequeno.jpg', 6000, 4000, 1.0)
+
+    sozinho = {}
+    forma = preprocessamento.carregar_cinza(pequeno, sozinho).shape
+    preprocessamento.carregar_cinza(grande, {})
+    depois = {}
+    assert preprocessamento.carregar_cinza(pequeno, depois).shape == forma
+    assert sozinho['reducao_decodificacao'] == depois['reducao_decodificacao'] == 2
+
+
+def test_perfil_sem_resolucao_nao_reduz(tmp_path):
+    caminho = _jpeg(tmp_path / 'foto.jpg', 6000, 4000, 3.0)
+    metadados = {}
+    assert preprocessamento.carregar_cinza(caminho, metadados, perfil='recorte').shape == (4000, 6000)
+    assert 'reducao_decodificacao' not in metadados
@@ -0,0 +1,63 @@
+"""
+Testes do processamento em lote sem o Tesseract: `processar_fn` simula o OCR.
+
+Rodar com: python -m pytest -q
+"""
+import os
+
+import pytest
+
+import processamento_lote
+
+
+@pytest.fixture
+def pasta(tmp_path, monkeypatch):
+    """Pasta com uma imagem 'a.png' e config.json isolado (sem espera entre tentativas)."""
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path / 'config'))
+    monkeypatch.setenv('APPDATA', str(tmp_path / 'config'))
+    monkeypatch.setattr(processamento_lote, 'ESPERA_NOVA_TENTATIVA', 0.0)
+    imagens = tmp_path / 'imagens'
+    imagens.mkdir()
+    (imagens / 'a.png').write_bytes(b'')
+    return str(imagens)
+
+
+def _falha_vezes(vezes, erro=TimeoutError):
+    """processar_fn que levanta `erro` nas primeiras `vezes` chamadas e depois devolve texto."""
+    chamadas = []
+
+    def processar(nome, imagens_dir):
+        chamadas.append(nome)
+        if len(chamadas) <= vezes:
+            raise erro("excedeu 1s")
+        return "texto"
+    return processar, chamadas
+
+
+def test_imagem_unica_tenta_de_novo_apos_tempo_esgotado(pasta):
+    processar, chamadas = _falha_vezes(1)
+    resultados = list(processamento_lote.processar_lote(['a.png'], pasta, workers=4, processar_fn=processar))
+
+    assert len(chamadas) == 2
+    assert resultados[0]['texto'] == "texto"
+    assert 'quarentena' not in resultados[0]
+    assert os.path.exists(os.path.join(pasta, 'a.png'))
+
+
+def test_imagem_unica_vai_para_quarentena_so_depois_de_todas_as_tentativas(pasta):
+    processar, chamadas = _falha_vezes(99)
+    resultados = list(processamento_lote.processar_lote(['a.png'], pasta, workers=1, processar_fn=processar))
+
+    assert len(chamadas) == processamento_lote.TENTATIVAS_PADRAO
+    assert resultados[0]['texto'] is None
+    assert f"em {processamento_lote.TENTATIVAS_PADRAO} tentativa(s)" in resultados[0]['erro']
+    assert os.path.exists(os.path.join(pasta, 'quarentena', 'a.png'))
+
+
+def test_erro_comum_nao_tenta_de_novo(pasta):
+    processar, chamadas = _falha_vezes(1, erro=ValueError)
+    resultados = list(processamento_lote.processar_lote(['a.png'], pasta, workers=1, processar_fn=processar))
+
+    assert len(chamadas) == 1
+    assert resultados[0]['texto'] is None
+    assert os.path.exists(os.path.join(pasta, 'a.png'))
@@ -0,0 +1,51 @@
+"""
+Testes dos trabalhos em lote retomáveis (trabalhos.py).
+
+Rodar com: python -m pytest -q
+"""
+import pytest
+
+import trabalhos
+from history import GerenciadorDocumentos
+from trabalhos import CONCLUIDO, EXECUTANDO, FINALIZADO, JornalTrabalhos, executar_trabalho
+
+
+@pytest.fixture
+def jornal(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CONFIG_HOME', str(tmp_path / 'config'))
+    monkeypatch.setenv('APPDATA', str(tmp_path / 'config'))
+
+    def processar_em_fluxo(imagens, imagens_dir, resultados_dir=None, **kwargs):
+        for nome in imagens:
+            yield {'arquivo': nome, 'texto': 'texto', 'erro': None, 'tempo': 0.0, 'metadados': {}}
+
+    monkeypatch.setattr(trabalhos, 'processar_em_fluxo', processar_em_fluxo)
+    j = JornalTrabalhos(str(tmp_path / 'trabalhos.db'))
+    yield j
+    j.fechar()
+
+
+def test_retomada_nao_duplica_linha_ja_gravada(jornal, tmp_path):
+    gerenciador = GerenciadorDocumentos(str(tmp_path / 'resultados'))
+    trabalho_id = jornal.criar(['a.png', 'b.png'], str(tmp_path), str(tmp_path / 'resultados'))
+    # Caiu com a.png no histórico mas ainda 'executando' no diário
+    jornal.marcar(trabalho_id, 'a.png', EXECUTANDO)
+    gerenciador.adicionar_documento('a.png')
+
+    list(executar_trabalho(jornal, trabalho_id, gerenciador))
+
+    assert sorted(row[1] for row in gerenciador.buscar_documentos()) == ['a.png', 'b.png']
+    trabalho = jornal.obter(trabalho_id)
+    assert trabalho['estado'] == FINALIZADO
+    assert trabalho['itens'] == {CONCLUIDO: 2}
+
+
+def test_listar_so_inacabados(jornal, tmp_path):
+    aberto = jornal.criar(['a.png'], str(tmp_path), str(tmp_path))
+    fechado = jornal.criar(['b.png'], str(tmp_path / 'outra'), str(tmp_path))
+    jornal.definir_estado(fechado, FINALIZADO)
+
+    assert [t['id'] for t in jornal.listar()] == [aberto]
+    assert {t['id'] for t in jornal.listar(somente_inacabados=False)} == {aberto, fechado}
+    assert jornal.inacabado(str(tmp_path)) == aberto
+    assert jornal.inacabado(str(tmp_path / 'outra')) is None
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Trabalhos em lote retomáveis.
+
+Cada "Processar Tudo" vira um trabalho com ID e um diário (SQLite, ao lado do
+config.json) com o estado de cada imagem: na_fila -> executando -> concluido
+ou falhou. Se o programa cair ou a máquina reiniciar, o trabalho fica
+inacabado e pode ser retomado: só as imagens que não chegaram a 'concluido'
+voltam para o OCR. A linha do histórico é gravada antes do 'concluido' (nenhuma
+se perde se cair entre os dois); na retomada, uma imagem que estava
+'executando' e já tem linha no histórico gravada depois disso não ganha outra.
+
+O primeiro Ctrl-C para de enviar imagens novas e espera as que já estão em
+andamento terminarem (o trabalho fica 'interrompido'); o segundo sai na hora.
+
+Uso:
+  python trabalhos.py listar [--todos]
+  python trabalhos.py novo [imagens_dir] [resultados_dir] [--tipo T]
+  python trabalhos.py retomar ID [--refazer-falhas]
+
+API:
+  JornalTrabalhos() .criar / .adicionar / .pendentes / .em_execucao / .marcar / .listar / .inacabado
+  preparar_trabalho(jornal, imagens, imagens_dir, resultados_dir, tipo) -> id
+  executar_trabalho(jornal, trabalho_id, gerenciador=None, ...) -> gerador de resultados
+  interrupcao_suave(parar) -> context manager do Ctrl-C
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from ocr_funcoes import listar_imagens, confianca_de, observacao_historico
+from processamento_lote import processar_em_fluxo
+from pagina_branca import eh_branca
+
+try:
+    from cdigo.config import _appdata_config_path
+    from cdigo.history import GerenciadorDocumentos
+except Exception:
+    from config import _appdata_config_path
+    from history import GerenciadorDocumentos
+
+
+NA_FILA = 'na_fila'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+
+# Estados do trabalho
+EM_ANDAMENTO = 'em_andamento'
+INTERROMPIDO = 'interrompido'
+FINALIZADO = 'concluido'
+
+
+class JornalTrabalhos:
+    """Diário durável dos trabalhos em lote e do estado de cada imagem."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or os.path.join(os.path.dirname(_appdata_config_path()), 'trabalhos.db')
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        # Usado pelo gravador e pela thread que alimenta o pipeline
+        self._conn = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS trabalhos (
+                    id TEXT PRIMARY KEY,
+                    imagens_dir TEXT,
+                    resultados_dir TEXT,
+                    tipo_documento TEXT,
+                    estado TEXT,
+                    criado_em REAL,
+                    atualizado_em REAL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS itens (
+                    trabalho_id TEXT,
+                    nome TEXT,
+                    estado TEXT,
+                    erro TEXT,
+                    tentativas INTEGER DEFAULT 0,
+                    atualizado_em REAL,
+                    PRIMARY KEY (trabalho_id, nome)
+                )
+            ''')
+
+    def criar(self, imagens, imagens_dir, resultados_dir, tipo_documento="genérico"):
+        """Cria um trabalho com `imagens` na fila e retorna o ID."""
+        trabalho_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:4]
+        agora = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO trabalhos VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (trabalho_id, os.path.abspath(imagens_dir), os.path.abspath(resultados_dir),
+                                tipo_documento, EM_ANDAMENTO, agora, agora))
+        self.adicionar(trabalho_id, imagens)
+        return trabalho_id
+
+    def adicionar(self, trabalho_id, imagens):
+        """Põe mais imagens na fila do trabalho (as que já estão nele são ignoradas)."""
+        agora = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO itens (trabalho_id, nome, estado, atualizado_em) VALUES (?, ?, ?, ?)',
+                [(trabalho_id, nome, NA_FILA, agora) for nome in imagens])
+
+    def obter(self, trabalho_id):
+        with self._lock:
+            linha = self._conn.execute(
+                'SELECT id, imagens_dir, resultados_dir, tipo_documento, estado, criado_em, atualizado_em '
+                'FROM trabalhos WHERE id = ?', (trabalho_id,)).fetchone()
+            if linha is None:
+                return None
+            contagem = dict(self._conn.execute(
+                'SELECT estado, COUNT(*) FROM itens WHERE trabalho_id = ? GROUP BY estado', (trabalho_id,)).fetchall())
+        chaves = ('id', 'imagens_dir', 'resultados_dir', 'tipo_documento', 'estado', 'criado_em', 'atualizado_em')
+        trabalho = dict(zip(chaves, linha))
+        trabalho['itens'] = contagem
+        return trabalho
+
+    def listar(self, somente_inacabados=True):
+        with self._lock:
+            consulta, parametros = 'SELECT id FROM trabalhos', ()
+            if somente_inacabados:
+                consulta, parametros = consulta + ' WHERE estado != ?', (FINALIZADO,)
+            ids = [linha[0] for linha in self._conn.execute(consulta + ' ORDER BY criado_em', parametros)]
+        return [self.obter(trabalho_id) for trabalho_id in ids]
+
+    def inacabado(self, imagens_dir):
+        """ID do trabalho inacabado mais recente de `imagens_dir`, se houver."""
+        with self._lock:
+            linha = self._conn.execute(
+                'SELECT id FROM trabalhos WHERE imagens_dir = ? AND estado != ? '
+                'ORDER BY criado_em DESC LIMIT 1', (os.path.abspath(imagens_dir), FINALIZADO)).fetchone()
+        return linha[0] if linha else None
+
+    def pendentes(self, trabalho_id, refazer_falhas=False):
+        """Imagens que ainda não terminaram (inclui as que estavam 'executando' quando o programa caiu)."""
+        estados = (NA_FILA, EXECUTANDO, FALHOU) if refazer_falhas else (NA_FILA, EXECUTANDO)
+        marcadores = ', '.join('?' * len(estados))
+        with self._lock:
+            return [linha[0] for linha in self._conn.execute(
+                f'SELECT nome FROM itens WHERE trabalho_id = ? AND estado IN ({marcadores}) ORDER BY rowid',
+                (trabalho_id,) + estados)]
+
+    def em_execucao(self, trabalho_id):
+        """{nome: momento em que entrou no OCR} das imagens que ficaram 'executando' (o programa caiu)."""
+        with self._lock:
+            return dict(self._conn.execute(
+                'SELECT nome, atualizado_em FROM itens WHERE trabalho_id = ? AND estado = ?',
+                (trabalho_id, EXECUTANDO)).fetchall())
+
+    def marcar(self, trabalho_id, nome, estado, erro=None):
+        tentativa = 1 if estado == EXECUTANDO else 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE itens SET estado = ?, erro = ?, tentativas = tentativas + ?, atualizado_em = ? '
+                'WHERE trabalho_id = ? AND nome = ?',
+                (estado, erro, tentativa, time.time(), trabalho_id, nome))
+
+    def definir_estado(self, trabalho_id, estado):
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE trabalhos SET estado = ?, atualizado_em = ? WHERE id = ?',
+                               (estado, time.time(), trabalho_id))
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+
+def preparar_trabalho(jornal, imagens, imagens_dir, resultados_dir, tipo_documento="genérico"):
+    """
+    Reaproveita o trabalho inacabado da pasta (acrescentando `imagens` novas à
+    fila) ou cria um novo. Retorna o ID.
+    """
+    trabalho_id = jornal.inacabado(imagens_dir)
+    if trabalho_id is None:
+        return jornal.criar(imagens, imagens_dir, resultados_dir, tipo_documento)
+    jornal.adicionar(trabalho_id, imagens)
+    return trabalho_id
+
+
+def executar_trabalho(jornal, trabalho_id, gerenciador=None, workers=None, manifesto=None, parar=None,
+                      refazer_falhas=False):
+    """
+    Processa as imagens pendentes do trabalho e gera os resultados conforme
+    terminam. Com `parar` (threading.Event) ligado, não envia mais imagens e
+    termina quando as em andamento acabarem; o trabalho fica 'interrompido'.
+    """
+    trabalho = jornal.obter(trabalho_id)
+    if trabalho is None:
+        raise ValueError(f"Trabalho não encontrado: {trabalho_id}")
+    parar = parar or threading.Event()
+    pendentes = jornal.pendentes(trabalho_id, refazer_falhas)
+    # Caiu depois de gravar o histórico e antes do 'concluido': a linha já existe
+    ja_no_historico = set()
+    if gerenciador is not None:
+        interrompidas = jornal.em_execucao(trabalho_id)
+        if interrompidas:
+            ja_no_historico = gerenciador.registrados_desde(interrompidas)
+    jornal.definir_estado(trabalho_id, EM_ANDAMENTO)
+
+    def alimentar():
+        # Chamado pela thread que abastece o pipeline: marca só quando a imagem entra de fato
+        for nome in pendentes:
+            if parar.is_set():
+                return
+            jornal.marcar(trabalho_id, nome, EXECUTANDO)
+            yield nome
+
+    for resultado in processar_em_fluxo(alimentar(), trabalho['imagens_dir'], trabalho['resultados_dir'],
+                                        workers=workers, manifesto=manifesto):
+        if resultado['texto'] or eh_branca(resultado):
+            # Histórico primeiro: se cair entre os dois, a retomada acha a linha e não repete
+            if gerenciador is not None and resultado['arquivo'] not in ja_no_historico:
+                gerenciador.adicionar_documento(resultado['arquivo'], trabalho['tipo_documento'],
+                                                confianca_de(resultado), observacao_historico(resultado))
+            jornal.marcar(trabalho_id, resultado['arquivo'], CONCLUIDO)
+        else:
+            jornal.marcar(trabalho_id, resultado['arquivo'], FALHOU, resultado['erro'])
+        resultado['trabalho'] = trabalho_id
+        yield resultado
+
+    restantes = jornal.pendentes(trabalho_id)
+    jornal.definir_estado(trabalho_id, INTERROMPIDO if restantes else FINALIZADO)
+
+
+@contextmanager
+def interrupcao_suave(parar):
+    """
+    Enquanto ativo, o primeiro Ctrl-C só liga `parar` (drena o que está em
+    andamento); o segundo interrompe na hora. Fora da thread principal não faz nada.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield parar
+        return
+
+    anterior = signal.getsignal(signal.SIGINT)
+
+    def tratar(signum, frame):
+        if parar.is_set():
+            raise KeyboardInterrupt
+        parar.set()
+        print("\n⏸️  Interrompendo: aguardando as imagens em andamento (Ctrl-C de novo para sair já)...")
+
+    signal.signal(signal.SIGINT, tratar)
+    try:
+        yield parar
+    finally:
+        signal.signal(signal.SIGINT, anterior)
+
+
+def descrever(trabalho):
+    itens = trabalho['itens']
+    total = sum(itens.values())
+    criado = time.strftime('%d/%m/%Y %H:%M', time.localtime(trabalho['criado_em']))
+    return (f"{trabalho['id']}  {trabalho['estado']:<12} {criado}  "
+            f"{itens.get(CONCLUIDO, 0)}/{total} concluídas, {itens.get(FALHOU, 0)} falha(s)  {trabalho['imagens_dir']}")
+
+
+def rodar_no_terminal(jornal, trabalho_id, gerenciador=None, manifesto=None, refazer_falhas=False):
+    """Executa o trabalho imprimindo o progresso; retorna o estado final."""
+    parar = threading.Event()
+    with interrupcao_suave(parar):
+        for resultado in executar_trabalho(jornal, trabalho_id, gerenciador, manifesto=manifesto, parar=parar,
+                                           refazer_falhas=refazer_falhas):
+            if resultado['texto']:
+                print(f"✅ {resultado['arquivo']} ({resultado['tempo']:.1f}s)")
+            else:
+                print(f"❌ {resultado['arquivo']}: {resultado['erro']}")
+    trabalho = jornal.obter(trabalho_id)
+    print(f"📋 {descrever(trabalho)}")
+    if trabalho['estado'] == INTERROMPIDO:
+        print(f"▶️  Para continuar: python trabalhos.py retomar {trabalho_id}")
+    return trabalho['estado']
+
+
+def main(argv=None):
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Trabalhos de OCR em lote retomáveis")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_listar = sub.add_parser('listar', help="Lista os trabalhos inacabados")
+    p_listar.add_argument('--todos', action='store_true', help="Inclui os concluídos")
+    p_novo = sub.add_parser('novo', help="Cria e executa um trabalho com as imagens da pasta")
+    p_novo.add_argument('imagens_dir', nargs='?', default=os.path.join(project_root, "imagens"))
+    p_novo.add_argument('resultados_dir', nargs='?', default=os.path.join(project_root, "resultados", "textos_extraidos"))
+    p_novo.add_argument('--tipo', default="genérico")
+    p_retomar = sub.add_parser('retomar', help="Continua um trabalho interrompido")
+    p_retomar.add_argument('id')
+    p_retomar.add_argument('--refazer-falhas', action='store_true', help="Tenta de novo as imagens que falharam")
+    args = parser.parse_args(argv)
+
+    jornal = JornalTrabalhos()
+    try:
+        if args.comando == 'listar':
+            trabalhos = jornal.listar(somente_inacabados=not args.todos)
+            if not trabalhos:
+                print("Nenhum trabalho" + ("" if args.todos else " inacabado"))
+            for trabalho in trabalhos:
+                print(descrever(trabalho))
+            return 0
+
+        if args.comando == 'novo':
+            os.makedirs(args.resultados_dir, exist_ok=True)
+            imagens = listar_imagens(args.imagens_dir)
+            if not imagens:
+                print("❌ Nenhuma imagem encontrada")
+                return 1
+            trabalho_id = jornal.criar(imagens, args.imagens_dir, args.resultados_dir, args.tipo)
+            print(f"🆕 Trabalho {trabalho_id}: {len(imagens)} imagem(ns)")
+        else:
+            trabalho_id = args.id
+            if jornal.obter(trabalho_id) is None:
+                print(f"❌ Trabalho não encontrado: {trabalho_id}")
+                return 1
+
+        trabalho = jornal.obter(trabalho_id)
+        gerenciador = GerenciadorDocumentos(trabalho['resultados_dir'])
+        estado = rodar_no_terminal(jornal, trabalho_id, gerenciador,
+                                   refazer_falhas=getattr(args, 'refazer_falhas', False))
+        return 0 if estado == FINALIZADO else 3
+    finally:
+        jornal.fechar()
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())